@@ -7,10 +7,14 @@ Finds and deletes movies that have been watched once or less
 import argparse
 import logging
 from typing import List, Dict
-from datetime import datetime, timedelta
 import sys
+import os
 import asyncio
 
+# Shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cleanup_policy import CleanupPolicy, default_policy, movie_candidate
+
 try:
     from plexapi.server import PlexServer
     from plexapi.video import Movie
@@ -148,28 +152,40 @@ class PlexCleanup:
 
         return messages
 
-    def get_unwatched_movies(self, max_view_count: int = 1, days_since_watched: int = None) -> List[Dict]:
+    def get_unwatched_movies(self, max_view_count: int = None, days_since_watched: int = None,
+                             days_since_added: int = None, policy: CleanupPolicy = None,
+                             history: 'WatchHistory' = None) -> List[Dict]:
         """
-        Get movies that have been watched max_view_count times or less
-        Optionally filter by last watched date
+        Get movies that match the cleanup policy: watched max_view_count times
+        or less, optionally not watched / added within the last X days
 
         Args:
-            max_view_count: Maximum view count (default: 1)
+            max_view_count: Maximum view count (default: the policy's, 1)
             days_since_watched: Only include movies not watched in last X days (optional)
+            days_since_added: Only include movies added more than X days ago (optional)
+            policy: Cleanup policy (default: CLEANUP_POLICY_FILE or built-in); the
+                arguments above override its rules
+            history: WatchHistory to count every account's plays (updated first);
+                default: only the token owner's
 
         Returns:
             List of movie dictionaries with details
         """
         unwatched_movies = []
-        cutoff_date = None
-
-        if days_since_watched:
-            cutoff_date = datetime.now() - timedelta(days=days_since_watched)
-            logger.info(f"Filtering for movies not watched since {cutoff_date.strftime('%Y-%m-%d')}")
+        policy = (policy or default_policy()).merged(
+            max_views=max_view_count,
+            days_not_watched=days_since_watched,
+            days_since_added=days_since_added
+        )
+        if history is not None:
+            history.refresh_or_warn(self.plex)
+        compiled = policy.compile(history=history)
+        logger.info(f"Filtering for movies with {policy.describe()}"
+                    f"{' (plays by all accounts)' if history is not None else ''}")
 
         try:
             # Get all movie libraries
-            movie_sections = [s for s in self.plex.library.sections() if s.type == 'movie']
+            movie_sections = compiled.sections(self.plex.library)
 
             if not movie_sections:
                 logger.warning("No movie libraries found in Plex")
@@ -180,53 +196,12 @@ class PlexCleanup:
             for section in movie_sections:
                 logger.info(f"Scanning library: {section.title}")
                 movies = section.all()
-
-                for movie in movies:
-                    view_count = movie.viewCount if movie.viewCount else 0
-
-                    # Check view count first
-                    if view_count > max_view_count:
-                        continue
-
-                    # If time-based filtering is enabled
-                    if cutoff_date:
-                        last_viewed = movie.lastViewedAt if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt else None
-
-                        # If never watched, include it
-                        if last_viewed is None:
-                            pass  # Include it
-                        # If watched recently (within cutoff period), skip it
-                        elif last_viewed > cutoff_date:
-                            continue
-                        # If watched but before cutoff date, include it
-
-                    # Get file info
-                    file_paths = [media.parts[0].file for media in movie.media]
-                    file_size = sum(media.parts[0].size for media in movie.media)
-
-                    last_viewed_str = 'Never'
-                    if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt:
-                        last_viewed_str = movie.lastViewedAt.strftime('%Y-%m-%d')
-
-                    unwatched_movies.append({
-                        'title': movie.title,
-                        'year': movie.year,
-                        'view_count': view_count,
-                        'added_date': movie.addedAt.strftime('%Y-%m-%d') if movie.addedAt else 'Unknown',
-                        'last_viewed': last_viewed_str,
-                        'file_paths': file_paths,
-                        'file_size_mb': file_size / (1024 * 1024),
-                        'rating': movie.rating if hasattr(movie, 'rating') else None,
-                        'plex_object': movie
-                    })
+                unwatched_movies.extend(movie_candidate(movie, history) for movie in movies if compiled.matches(movie))
 
             # Sort by view count, then by added date (oldest first)
             unwatched_movies.sort(key=lambda x: (x['view_count'], x['added_date']))
 
-            if days_since_watched:
-                logger.info(f"Found {len(unwatched_movies)} movies with {max_view_count} view(s) or less, not watched in {days_since_watched} days")
-            else:
-                logger.info(f"Found {len(unwatched_movies)} movies with {max_view_count} view(s) or less")
+            logger.info(f"Found {len(unwatched_movies)} movies with {policy.describe()}")
 
         except Exception as e:
             logger.error(f"Error scanning movies: {e}")
@@ -350,7 +325,7 @@ def main():
     parser = argparse.ArgumentParser(description="Plex Movie Cleanup Tool")
     parser.add_argument("--url", required=True, help="Plex server URL (e.g., http://192.168.1.100:32400)")
     parser.add_argument("--token", required=True, help="Plex authentication token")
-    parser.add_argument("--max-views", type=int, default=1, help="Maximum view count (default: 1)")
+    parser.add_argument("--max-views", type=int, help="Maximum view count (default: 1, or the policy's)")
     parser.add_argument("--days", type=int, help="Only include movies not watched in last X days")
     parser.add_argument("--dry-run", action="store_true", help="Preview only, don't delete")
     parser.add_argument("--auto-delete", action="store_true", help="Skip confirmation (use with caution!)")
@@ -4,44 +4,61 @@ Plex Manager Backend API
 Flask API for managing Plex, qBittorrent, and media requests
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+import importlib.util
+import json
+import threading
+import time
 import os
 import sys
 
+# Shared helpers (media_size, ...) live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Load environment variables from .env file
 load_dotenv()
 
-try:
-    from plex_cleanup import PlexCleanup
-    from plexapi.server import PlexServer
-except ImportError as e:
-    print(f"Error importing modules: {e}")
-    print("Make sure plexapi is installed: pip install plexapi flask flask-cors")
-
-try:
-    from auth import auth_manager
-    AUTH_ENABLED = True
-    print("✓ Authentication module loaded successfully")
-except ImportError as e:
-    print(f"Warning: Authentication module not available: {e}")
-    print(f"  Make sure all auth dependencies are installed:")
-    print(f"  pip install PyJWT pyotp qrcode Pillow bcrypt")
-    AUTH_ENABLED = False
-except Exception as e:
-    print(f"Error loading authentication module: {e}")
-    import traceback
-    traceback.print_exc()
-    AUTH_ENABLED = False
+# Stdlib-only; the auth stack itself (bcrypt, JWT, TOTP) loads on first use
+from auth_limits import login_throttle, hashing_pool, HashingBusyError
+from cleanup_scoring import GB, CleanupScorer, SOLVERS, parse_weights, select_for_target
+from media_size import media_total_bytes
+from plex_http_metrics import (
+    plex_http_stats, recent_operations, start_operation, finish_operation, instrumented_session
+)
+from prometheus_metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, CACHE_REQUESTS, HASHING_QUEUE_DEPTH, HTTP_REQUEST_SECONDS,
+    record_deletion, render as render_metrics
+)
+from profiling import install_flask_profiling
+from job_store import JobStore, JobRunner, FINISHED_STATUSES
+from request_matcher import LIBRARY_PRUNE_SECONDS, REQUEST_SYNC_SECONDS, LibraryIndex, RequestMatcher
+from watch_history import default_history
+from tv_cleanup import DEFAULT_ABANDONED_DAYS, DEFAULT_WATCHED_SEASON_DAYS, TVCleanup
+from request_store import (
+    RequestStore, RequestConflictError, FILTERS, REQUEST_STATUSES, REQUEST_TYPES,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
+
+# Modules required by the auth subsystem, checked without importing them
+AUTH_DEPENDENCIES = ('jwt', 'pyotp', 'bcrypt')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Reverse proxies in front of the app (Railway: 1). Only the X-Forwarded-* values
+# they append are trusted; anything further left was sent by the client.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '1'))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
 # Configuration - Set via environment variables
 PLEX_URL = os.getenv('PLEX_URL')
 PLEX_TOKEN = os.getenv('PLEX_TOKEN')
-MAX_VIEWS = int(os.getenv('MAX_VIEWS', '1'))
+# Override the cleanup policy (CLEANUP_POLICY_FILE, default: 1 view or less) when set
+MAX_VIEWS = int(os.getenv('MAX_VIEWS')) if os.getenv('MAX_VIEWS') else None
 DAYS_NOT_WATCHED = int(os.getenv('DAYS_NOT_WATCHED', '30')) if os.getenv('DAYS_NOT_WATCHED') else None
 
 # Validate required configuration
@@ -51,10 +68,142 @@ if not PLEX_URL or not PLEX_TOKEN:
     sys.exit(1)
 
 
+# =============================================================================
+# Lazily initialized subsystems
+# =============================================================================
+# plexapi (and requests/urllib3 behind it) and the auth stack are imported on
+# first use, so a cold start or health check doesn't pay for them.
+
+_auth_lock = threading.Lock()
+_auth_state = {}
+
+
+def get_auth_manager():
+    """
+    Import and initialize the authentication subsystem on first use
+
+    Returns:
+        The shared AuthManager, or None if authentication is unavailable
+    """
+    if 'manager' in _auth_state:
+        return _auth_state['manager']
+
+    with _auth_lock:
+        if 'manager' not in _auth_state:
+            try:
+                from auth import auth_manager
+                print("✓ Authentication module loaded successfully")
+            except ImportError as e:
+                print(f"Warning: Authentication module not available: {e}")
+                print(f"  Make sure all auth dependencies are installed:")
+                print(f"  pip install PyJWT pyotp qrcode Pillow bcrypt")
+                auth_manager = None
+            except Exception as e:
+                print(f"Error loading authentication module: {e}")
+                import traceback
+                traceback.print_exc()
+                auth_manager = None
+            _auth_state['manager'] = auth_manager
+
+    return _auth_state['manager']
+
+
+def auth_available():
+    """Whether authentication is (or can be) enabled, without loading it"""
+    if 'manager' in _auth_state:
+        return _auth_state['manager'] is not None
+    return all(importlib.util.find_spec(name) is not None for name in AUTH_DEPENDENCIES)
+
+
+def get_plex_server():
+    """Connect to the configured Plex server (imports plexapi on first use)"""
+    from plexapi.server import PlexServer
+    return PlexServer(PLEX_URL, PLEX_TOKEN, session=instrumented_session())
+
+
+def get_plex_cleanup():
+    """Create a PlexCleanup for the configured server (imports plexapi on first use)"""
+    from plex_cleanup import PlexCleanup
+    return PlexCleanup(PLEX_URL, PLEX_TOKEN)
+
+
+# =============================================================================
+# Instrumentation
+# =============================================================================
+# Every handler is an operation: Plex requests it makes are counted against it
+# and summarized in the log ("GET /api/plex/movies: 293 Plex requests, ...").
+# Handler latency and the rest of the Prometheus metrics are served at /metrics.
+# Requests sent with "X-Profile: $PROFILE_TOKEN" are profiled (see profiling.py).
+
+@app.before_request
+def start_plex_operation():
+    g.request_started = time.perf_counter()
+    rule = request.url_rule.rule if request.url_rule else request.path
+    g.plex_operation = start_operation(f"{request.method} {rule}")
+
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            app='backend',
+            method=request.method,
+            # The route pattern, never the raw path, keeps label cardinality bounded
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            status=response.status_code
+        )
+    return response
+
+
+@app.teardown_request
+def finish_plex_operation(exc=None):
+    operation = g.pop('plex_operation', None)
+    if operation is not None:
+        finish_operation(operation, log=False)
+        if operation.requests:
+            print(f"📊 {operation.summary()}")
+
+
+install_flask_profiling(app)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Plex request statistics per endpoint, and the most recent operations"""
+    return jsonify({
+        'plex': plex_http_stats.snapshot(),
+        'operations': [operation.to_dict() for operation in reversed(recent_operations)]
+    })
+
+
+@HASHING_QUEUE_DEPTH.set_function
+def hashing_queue_depth():
+    return hashing_pool.queue_depth
+
+
+@CACHE_REQUESTS.set_function
+def token_cache_lookups():
+    auth_manager = _auth_state.get('manager')
+    if auth_manager is None:
+        return None
+    return {
+        ('token', 'hit'): auth_manager.token_cache.hits,
+        ('token', 'miss'): auth_manager.token_cache.misses,
+    }
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus exposition (this worker's metrics)"""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    auth_status = 'enabled' if AUTH_ENABLED else 'disabled'
+    auth_status = 'enabled' if auth_available() else 'disabled'
     return jsonify({
         'status': 'ok',
         'message': 'Plex Manager API is running',
@@ -91,10 +240,23 @@ def diagnostics():
 # Authentication Endpoints
 # =============================================================================
 
+def client_ip():
+    """Client IP address (as seen by the trusted proxy, see TRUSTED_PROXY_HOPS)"""
+    return request.remote_addr
+
+
+def hashing_busy_response(e):
+    """503 response when the password hashing pool is full"""
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     """Register new user with MFA"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     try:
@@ -110,7 +272,7 @@ def register():
         if error:
             return jsonify({'error': error}), 400
 
-        # Generate QR code for Microsoft Authenticator
+        # QR code for Microsoft Authenticator, inline so it never travels in a URL
         qr_code = auth_manager.generate_qr_code(username)
 
         return jsonify({
@@ -120,6 +282,8 @@ def register():
             'totp_secret': totp_secret
         }), 201
 
+    except HashingBusyError as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -127,7 +291,8 @@ def register():
 @app.route('/api/auth/verify-totp', methods=['POST'])
 def verify_totp():
     """Verify TOTP code and enable MFA"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     try:
@@ -154,7 +319,8 @@ def verify_totp():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """Login with username, password, and MFA token"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     try:
@@ -166,8 +332,17 @@ def login():
         if not username or not password:
             return jsonify({'error': 'Username and password required'}), 400
 
+        # Turn away throttled clients before doing any bcrypt work
+        ip = client_ip()
+        retry_after = login_throttle.check(ip, username)
+        if retry_after:
+            response = jsonify({'error': 'Too many failed login attempts. Try again later.'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+
         # Verify password
         if not auth_manager.verify_password(username, password):
+            login_throttle.record_failure(ip, username)
             return jsonify({'error': 'Invalid credentials'}), 401
 
         # Check if MFA is enabled
@@ -181,8 +356,11 @@ def login():
 
             # Verify MFA token
             if not auth_manager.verify_totp(username, token):
+                login_throttle.record_failure(ip, username)
                 return jsonify({'error': 'Invalid MFA token'}), 401
 
+        login_throttle.reset(username)
+
         # Generate JWT
         jwt_token = auth_manager.generate_jwt(username)
 
@@ -192,6 +370,8 @@ def login():
             'username': username
         })
 
+    except HashingBusyError as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -199,7 +379,8 @@ def login():
 @app.route('/api/auth/verify', methods=['GET'])
 def verify_token():
     """Verify JWT token"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     token = request.headers.get('Authorization')
@@ -216,10 +397,29 @@ def verify_token():
         return jsonify({'valid': False}), 401
 
 
+@app.route('/api/auth/logout', methods=['POST'])
+def logout():
+    """Revoke the current JWT"""
+    auth_manager = get_auth_manager()
+    if not auth_manager:
+        return jsonify({'error': 'Authentication not enabled'}), 503
+
+    token = request.headers.get('Authorization')
+    if not token:
+        return jsonify({'error': 'No token provided'}), 401
+
+    if token.startswith('Bearer '):
+        token = token[7:]
+
+    auth_manager.revoke_jwt(token)
+    return jsonify({'status': 'success'})
+
+
 @app.route('/api/auth/request-reset', methods=['POST'])
 def request_password_reset():
     """Request password reset - generates reset token"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     try:
@@ -258,7 +458,8 @@ def request_password_reset():
 @app.route('/api/auth/reset-password', methods=['POST'])
 def reset_password():
     """Reset password using valid reset token"""
-    if not AUTH_ENABLED:
+    auth_manager = get_auth_manager()
+    if not auth_manager:
         return jsonify({'error': 'Authentication not enabled'}), 503
 
     try:
@@ -282,6 +483,8 @@ def reset_password():
             'message': 'Password reset successfully. You can now login with your new password.'
         })
 
+    except HashingBusyError as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -290,7 +493,7 @@ def reset_password():
 def plex_status():
     """Get Plex server status"""
     try:
-        plex = PlexServer(PLEX_URL, PLEX_TOKEN)
+        plex = get_plex_server()
         return jsonify({
             'status': 'connected',
             'serverName': plex.friendlyName,
@@ -306,17 +509,32 @@ def plex_status():
 def get_movies():
     """Get list of movies matching cleanup criteria"""
     try:
-        max_views = int(request.args.get('max_views', MAX_VIEWS))
+        max_views = int(request.args['max_views']) if request.args.get('max_views') else MAX_VIEWS
         days = int(request.args.get('days', DAYS_NOT_WATCHED)) if request.args.get('days') else DAYS_NOT_WATCHED
         days_added = int(request.args.get('days_added')) if request.args.get('days_added') else None
-
-        cleanup = PlexCleanup(PLEX_URL, PLEX_TOKEN)
+        target_gb = float(request.args.get('target_gb')) if request.args.get('target_gb') else None
+        solver = request.args.get('solver', 'auto')
+        try:
+            weights = parse_weights(request.args.get('weights'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if solver not in SOLVERS:
+            return jsonify({'error': f"solver must be one of: {', '.join(SOLVERS)}"}), 400
+
+        cleanup = get_plex_cleanup()
         movies = cleanup.get_unwatched_movies(
             max_view_count=max_views,
             days_since_watched=days,
-            days_since_added=days_added
+            days_since_added=days_added,
+            history=default_history()
         )
 
+        # Narrow to the lowest-value movies that free target_gb, best candidates first
+        selection = None
+        if target_gb:
+            selection = select_for_target(movies, int(target_gb * GB), CleanupScorer(weights), solver=solver)
+            movies = selection['selected']
+
         # Clear previous cache
         movies_cache.clear()
 
@@ -333,20 +551,39 @@ def get_movies():
                 'title': movie['title'],
                 'year': movie['year'],
                 'viewCount': movie['view_count'],
+                'watchedBy': movie.get('watched_by'),
                 'addedDate': movie['added_date'],
                 'lastViewed': movie['last_viewed'],
                 'filePaths': movie['file_paths'],
                 'fileSizeMB': movie['file_size_mb'],
-                'rating': movie['rating']
+                'versions': [
+                    {
+                        'resolution': v['resolution'],
+                        'container': v['container'],
+                        'sizeMB': v['size_bytes'] / (1024 * 1024),
+                        'partCount': len(v['parts'])
+                    }
+                    for v in movie['versions']
+                ],
+                'rating': movie['rating'],
+                'score': movie.get('score')
             })
 
         total_size_gb = sum(m['file_size_mb'] for m in movies) / 1024
 
-        return jsonify({
+        response = {
             'movies': movies_data,
             'totalCount': len(movies),
             'totalSizeGB': round(total_size_gb, 2)
-        })
+        }
+        if selection:
+            response['selection'] = {
+                'targetGB': target_gb,
+                'freedGB': round(selection['bytes'] / GB, 2),
+                'met': selection['met'],
+                'solver': selection['solver']
+            }
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -354,7 +591,12 @@ def get_movies():
 
 @app.route('/api/plex/movies/delete', methods=['POST'])
 def delete_movies():
-    """Delete selected movies from Plex"""
+    """
+    Queue deletion of selected movies as a background job
+
+    Returns 202 with the job ID right away; follow progress with
+    GET /api/jobs/<id> or the SSE stream at /api/jobs/<id>/events.
+    """
     try:
         data = request.json
         movie_keys = data.get('movieKeys', [])
@@ -362,55 +604,138 @@ def delete_movies():
         if not movie_keys:
             return jsonify({'error': 'No movies specified'}), 400
 
-        deleted_count = 0
-        failed_count = 0
-        deleted_size_mb = 0
-        errors = []
-
+        items = []
         for movie_key in movie_keys:
-            if movie_key not in movies_cache:
-                failed_count += 1
-                errors.append(f"Movie not found in cache: {movie_key}")
-                continue
+            item = {'key': movie_key}
+            plex_movie = movies_cache.get(movie_key)
+            if plex_movie is not None:
+                # Rating keys let any worker finish the job, even after a restart
+                item.update(
+                    rating_key=str(plex_movie.ratingKey),
+                    title=plex_movie.title,
+                    size_bytes=media_total_bytes(plex_movie)
+                )
+            items.append(item)
+
+        job_id = job_store.create('delete_movies', items)
+        job_runner.notify()
 
-            try:
-                plex_movie = movies_cache[movie_key]
-
-                # Get size before deletion
-                movie_size_mb = sum(media.parts[0].size for media in plex_movie.media) / (1024 * 1024)
+        return jsonify({
+            'status': 'queued',
+            'jobId': job_id,
+            'total': len(items),
+            'statusUrl': f"/api/jobs/{job_id}",
+            'eventsUrl': f"/api/jobs/{job_id}/events"
+        }), 202
 
-                # Delete the movie from Plex
-                plex_movie.delete()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-                deleted_count += 1
-                deleted_size_mb += movie_size_mb
 
-                # Remove from cache
-                del movies_cache[movie_key]
+@app.route('/api/plex/tv', methods=['GET'])
+def get_tv():
+    """
+    Get TV cleanup candidates: fully watched seasons, abandoned shows, old watched episodes
 
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"Failed to delete {movie_key}: {str(e)}")
+    Query params season_days, abandoned_days and episode_days enable each rule;
+    with none of them given, seasons (30 days) and abandoned shows (180 days) apply.
+    """
+    try:
+        rules = [int(request.args[name]) if request.args.get(name) else None
+                 for name in ('season_days', 'abandoned_days', 'episode_days')]
+    except ValueError:
+        return jsonify({'error': 'season_days, abandoned_days and episode_days must be whole days'}), 400
+    if not any(days is not None for days in rules):
+        rules = [DEFAULT_WATCHED_SEASON_DAYS, DEFAULT_ABANDONED_DAYS, None]
 
-        deleted_size_gb = deleted_size_mb / 1024
+    try:
+        groups = TVCleanup(get_plex_server()).find_candidates(*rules, history=default_history())
+
+        tv_cache.clear()
+        tv_groups.clear()
+
+        items = []
+        for group in groups:
+            item_key = '_'.join(str(part) for part in (group['kind'], group['show_key'], group['season'])
+                                if part is not None)
+            episodes = []
+            for episode in group['episodes']:
+                plex_episode = episode['plex_object']
+                episode_key = f"episode_{plex_episode.ratingKey}"
+                # Store plex object for later deletion
+                tv_cache[episode_key] = plex_episode
+                episodes.append({
+                    'key': episode_key,
+                    'rating_key': str(plex_episode.ratingKey),
+                    'title': episode['title'],
+                    'size_bytes': int(episode['file_size_mb'] * 1024 * 1024)
+                })
+            tv_groups[item_key] = episodes
+
+            items.append({
+                'itemKey': item_key,
+                'kind': group['kind'],
+                'title': group['title'],
+                'show': group['show'],
+                'season': group['season'],
+                'episodeCount': group['episode_count'],
+                'watchedCount': group['watched_count'],
+                'fileSizeMB': group['file_size_mb'],
+                'seasonSizesMB': group['season_sizes_mb'],
+                'lastViewed': group['last_viewed'],
+                'reason': group['reason']
+            })
 
         return jsonify({
-            'status': 'success',
-            'deletedCount': deleted_count,
-            'failedCount': failed_count,
-            'deletedSizeGB': round(deleted_size_gb, 2),
-            'errors': errors
+            'items': items,
+            'totalCount': len(items),
+            'totalEpisodes': sum(g['episode_count'] for g in groups),
+            'totalSizeGB': round(sum(g['file_size_mb'] for g in groups) / 1024, 2)
         })
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/plex/tv/delete', methods=['POST'])
+def delete_tv():
+    """
+    Queue deletion of selected TV candidates (itemKeys from GET /api/plex/tv)
+
+    Each show or season is deleted episode by episode, as one background job.
+    """
+    try:
+        data = request.json
+        item_keys = data.get('itemKeys', [])
+
+        if not item_keys:
+            return jsonify({'error': 'No TV items specified'}), 400
+
+        unknown = [key for key in item_keys if key not in tv_groups]
+        if unknown:
+            return jsonify({'error': f"Unknown TV items (reload the list): {', '.join(unknown)}"}), 404
+
+        items = [episode for key in item_keys for episode in tv_groups[key]]
+        job_id = job_store.create('delete_episodes', items)
+        job_runner.notify()
+
+        return jsonify({
+            'status': 'queued',
+            'jobId': job_id,
+            'total': len(items),
+            'statusUrl': f"/api/jobs/{job_id}",
+            'eventsUrl': f"/api/jobs/{job_id}/events"
+        }), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/plex/libraries', methods=['GET'])
 def get_libraries():
     """Get list of Plex libraries"""
     try:
-        plex = PlexServer(PLEX_URL, PLEX_TOKEN)
+        plex = get_plex_server()
         libraries = []
 
         for section in plex.library.sections():
@@ -434,7 +759,7 @@ def scan_library():
         data = request.json
         library_key = data.get('libraryKey')
 
-        plex = PlexServer(PLEX_URL, PLEX_TOKEN)
+        plex = get_plex_server()
 
         if library_key:
             # Scan specific library
@@ -457,7 +782,7 @@ def scan_library():
 def restart_plex():
     """Restart Plex server"""
     try:
-        plex = PlexServer(PLEX_URL, PLEX_TOKEN)
+        plex = get_plex_server()
 
         # Try different restart endpoints
         endpoints = ['/restart', '/:/restart']
@@ -480,35 +805,193 @@ def restart_plex():
         return jsonify({'error': str(e)}), 500
 
 
-# Media Request endpoints
-requests_db = []  # Simple in-memory storage (use database in production)
+# Media requests are persisted in SQLite (see request_store.py)
+request_store = RequestStore()
+library_index = LibraryIndex()
+request_matcher = RequestMatcher(request_store, library_index)
 
 # Movie cache for deletion (stores plex objects)
 movies_cache = {}  # Format: {movie_key: plex_movie_object}
+# TV candidates from the last GET /api/plex/tv
+tv_cache = {}  # Format: {episode_key: plex_episode_object}
+tv_groups = {}  # Format: {item_key: [job item for each episode]}
+
 
+# =============================================================================
+# Background jobs
+# =============================================================================
+
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+job_store = JobStore()
+job_runner = JobRunner(job_store)
+_job_plex = {}
+
+
+def _delete_cached_item(cache, item):
+    """
+    Delete one movie or episode
+
+    Uses the object cached by the listing when this worker has it, otherwise
+    fetches the item by rating key.
+
+    Returns:
+        Bytes freed
+    """
+    try:
+        plex_item = cache.get(item['item_key'])
+        if plex_item is None:
+            if not item['rating_key']:
+                raise LookupError(f"Item not found in cache: {item['item_key']}")
+            if 'server' not in _job_plex:
+                _job_plex['server'] = get_plex_server()
+            plex_item = _job_plex['server'].fetchItem(int(item['rating_key']))
+
+        size_bytes = media_total_bytes(plex_item)
+        plex_item.delete()
+    except Exception:
+        record_deletion('api', failed=True)
+        raise
+
+    record_deletion('api', size_bytes)
+    library_index.remove(plex_item.ratingKey)
+    cache.pop(item['item_key'], None)
+    return size_bytes
+
+
+def delete_movie_job_item(item):
+    """Job handler: delete one movie (cached by get_movies); returns bytes freed"""
+    return _delete_cached_item(movies_cache, item)
+
+
+def delete_episode_job_item(item):
+    """Job handler: delete one episode (cached by get_tv); returns bytes freed"""
+    return _delete_cached_item(tv_cache, item)
+
+
+def sync_requests_task(full=False):
+    """Scheduled: complete open requests with items added to Plex (full: also forget deleted items)"""
+    result = request_matcher.sync(get_plex_server(), full=full)
+    if result['fulfilled'] or result['removed']:
+        print(f"✓ Request sync: {len(result['fulfilled'])} requests fulfilled, "
+              f"{result['removed']} deleted items unindexed")
+
+
+job_runner.register('delete_movies', delete_movie_job_item)
+job_runner.register('delete_episodes', delete_episode_job_item)
+job_runner.schedule('sync_requests', REQUEST_SYNC_SECONDS, sync_requests_task)
+job_runner.schedule('prune_library_index', LIBRARY_PRUNE_SECONDS, lambda: sync_requests_task(full=True))
+job_runner.start()
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job progress with per-item status"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events: 'progress' on every change, then 'done' with per-item status"""
+    if job_store.get(job_id, include_items=False) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        last_progress = None
+        last_sent = time.monotonic()
+        while True:
+            job = job_store.get(job_id, include_items=False)
+            progress = (job['status'], job['succeeded'], job['failed'])
+
+            if progress != last_progress:
+                last_progress = progress
+                last_sent = time.monotonic()
+                yield f"event: progress\ndata: {json.dumps(job)}\n\n"
+            elif time.monotonic() - last_sent >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+
+            if job['status'] in FINISHED_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job_store.get(job_id))}\n\n"
+                return
+
+            time.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+# =============================================================================
+# Media Requests
+# =============================================================================
 
 @app.route('/api/requests', methods=['GET'])
 def get_requests():
-    """Get all media requests"""
-    return jsonify({'requests': requests_db})
+    """
+    List media requests, newest first
+
+    Query params: status, requestedBy, type (filters), limit, offset (paging)
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+        filters = {name: request.args.get(name) for name in FILTERS}
+
+        requests_page, total = request_store.list(filters, limit=limit, offset=offset)
+
+        return jsonify({
+            'requests': requests_page,
+            'total': total,
+            'limit': min(max(limit, 1), MAX_PAGE_SIZE),
+            'offset': max(offset, 0)
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/requests', methods=['POST'])
 def create_request():
     """Create a new media request"""
     try:
-        data = request.json
-        new_request = {
-            'id': len(requests_db) + 1,
-            'title': data.get('title'),
-            'type': data.get('type', 'movie'),  # movie or tv
-            'year': data.get('year'),
-            'status': 'pending',
-            'requestedBy': data.get('requestedBy', 'Anonymous'),
-            'requestedAt': data.get('requestedAt'),
-            'notes': data.get('notes', '')
-        }
-        requests_db.append(new_request)
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'JSON object required'}), 400
+
+        title = str(data.get('title') or '').strip()
+        media_type = data.get('type', 'movie')  # movie or tv
+
+        if not title:
+            return jsonify({'error': 'Title required'}), 400
+        if media_type not in REQUEST_TYPES:
+            return jsonify({'error': f"Type must be one of: {', '.join(REQUEST_TYPES)}"}), 400
+
+        year = data.get('year')
+        try:
+            year = int(year) if year not in (None, '') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Year must be a number'}), 400
+
+        new_request = request_store.create(
+            title,
+            media_type=media_type,
+            year=year,
+            requested_by=data.get('requestedBy'),
+            requested_at=data.get('requestedAt'),
+            notes=data.get('notes', '')
+        )
+
+        # Completed immediately if Plex already has the title
+        new_request = request_matcher.match(new_request)
 
         return jsonify({'status': 'success', 'request': new_request}), 201
 
@@ -516,18 +999,59 @@ def create_request():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/requests/sync', methods=['POST'])
+def sync_requests():
+    """
+    Index titles added to Plex since the last sync and complete open requests they satisfy
+
+    Body (optional): {"full": true} to re-list the whole library and drop deleted items
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = request_matcher.sync(get_plex_server(), full=bool(data.get('full')))
+
+        return jsonify({
+            'status': 'success',
+            'sectionsScanned': result['sections'],
+            'indexedItems': result['indexed'],
+            'removedItems': result['removed'],
+            'fulfilled': result['fulfilled']
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/requests/<int:request_id>', methods=['PATCH'])
 def update_request(request_id):
-    """Update request status"""
+    """
+    Update request status
+
+    Send the request's current 'version' to have the update rejected with
+    409 if someone else changed the request in the meantime.
+    """
     try:
-        data = request.json
-        for req in requests_db:
-            if req['id'] == request_id:
-                req['status'] = data.get('status', req['status'])
-                return jsonify({'status': 'success', 'request': req})
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'JSON object required'}), 400
+        status = data.get('status')
+
+        if status not in REQUEST_STATUSES:
+            return jsonify({'error': f"Status must be one of: {', '.join(REQUEST_STATUSES)}"}), 400
+
+        version = data.get('version')
+        # bool is an int subclass, but true is no version
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            return jsonify({'error': 'Version must be an integer'}), 400
+
+        updated = request_store.update_status(request_id, status, expected_version=version)
+        if updated is None:
+            return jsonify({'error': 'Request not found'}), 404
 
-        return jsonify({'error': 'Request not found'}), 404
+        return jsonify({'status': 'success', 'request': updated})
 
+    except RequestConflictError as e:
+        return jsonify({'error': str(e), 'request': e.current}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
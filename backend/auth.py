@@ -5,17 +5,22 @@ Works with Microsoft Authenticator, Google Authenticator, etc.
 """
 
 import os
-import json
 import jwt
 import bcrypt
 import pyotp
-import qrcode
 import io
 import base64
 import secrets
+import hashlib
+import hmac
+import math
+import time
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import wraps, lru_cache
 from flask import request, jsonify
+from user_store import UserStore
+from token_cache import TokenCache
+from auth_limits import hashing_pool, HashingBusyError
 
 # Configuration
 JWT_SECRET = os.getenv('JWT_SECRET', 'change-this-secret-key-in-production')
@@ -23,6 +28,17 @@ JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 RESET_TOKEN_EXPIRATION_HOURS = 1
 
+# How often each worker re-checks the shared revocation state
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', '1'))
+
+# bcrypt work factor: calibrated on startup to hit the target latency,
+# unless BCRYPT_ROUNDS pins it explicitly
+BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '100'))
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS')) if os.getenv('BCRYPT_ROUNDS') else None
+BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = 16
+BCRYPT_PROBE_ROUNDS = 6
+
 # Use environment variable for data directory, with fallback to current directory
 DATA_DIR = os.getenv('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
 
@@ -35,55 +51,128 @@ except (OSError, PermissionError) as e:
     DATA_DIR = os.path.dirname(os.path.abspath(__file__))
     os.makedirs(DATA_DIR, exist_ok=True)
 
+# Legacy JSON user file, imported into the SQLite store on first start
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
+USERS_DB_FILE = os.getenv('USERS_DB_FILE', os.path.join(DATA_DIR, 'users.db'))
+
+def calibrate_bcrypt_rounds(target_ms=BCRYPT_TARGET_MS, min_rounds=BCRYPT_MIN_ROUNDS, max_rounds=BCRYPT_MAX_ROUNDS):
+    """
+    Benchmark bcrypt on this host and pick the cost closest to target_ms
+
+    Each extra round doubles the work, so a cheap probe hash is timed and
+    extrapolated rather than timing the expensive costs directly.
+    """
+    salt = bcrypt.gensalt(rounds=BCRYPT_PROBE_ROUNDS)
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration-password', salt)
+        best = min(best, time.perf_counter() - start)
+
+    probe_ms = max(best * 1000, 0.001)
+    rounds = BCRYPT_PROBE_ROUNDS + round(math.log2(target_ms / probe_ms))
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+def _bcrypt_cost(password_hash):
+    """Cost factor of a stored bcrypt hash ($2b$<cost>$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=128)
+def _render_qr(data, fmt):
+    """Render a QR code as PNG or SVG bytes (cached per provisioning URI)"""
+    # Imported lazily: qrcode's PNG factory pulls in Pillow
+    import qrcode
+
+    if fmt == 'svg':
+        import qrcode.image.svg
+        img = qrcode.make(data, image_factory=qrcode.image.svg.SvgPathImage, box_size=10, border=5)
+    else:
+        img = qrcode.make(data, box_size=10, border=5)
+
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+QR_MIMETYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+
+def _hash_reset_token(token):
+    """SHA-256 digest of a reset token (only the digest is stored)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 
 class AuthManager:
-    def __init__(self):
-        self.users = self._load_users()
-    
-    def _load_users(self):
-        """Load users from JSON file"""
-        if os.path.exists(USERS_FILE):
-            try:
-                with open(USERS_FILE, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def _save_users(self):
-        """Save users to JSON file"""
-        with open(USERS_FILE, 'w') as f:
-            json.dump(self.users, f, indent=2)
+    def __init__(self, db_file=None):
+        self.users = UserStore(db_file or USERS_DB_FILE, legacy_json_file=USERS_FILE)
+
+        # Verified-token cache plus revocation state mirrored from the store
+        self.token_cache = TokenCache()
+        self._revoked_tokens = set()
+        self._tokens_valid_after = {}
+        self._revocation_generation = None
+        self._revocation_checked_at = 0.0
+
+        # Publish the cost through the store so every worker hashes with the same value
+        rounds = BCRYPT_ROUNDS or calibrate_bcrypt_rounds()
+        self.users.set_meta('bcrypt_rounds', rounds)
+        print(f"✓ bcrypt cost: {rounds} rounds (target {BCRYPT_TARGET_MS:.0f} ms)")
+
+    @property
+    def bcrypt_rounds(self):
+        """Current bcrypt cost shared by all workers"""
+        return int(self.users.get_meta('bcrypt_rounds', 12))
+
+    def _hash_password(self, password):
+        """Hash a password at the current cost on the bounded hashing pool"""
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        return hashing_pool.run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
     
     def create_user(self, username, password):
         """Create new user with hashed password and TOTP secret"""
         if username in self.users:
             return None, "User already exists"
         
-        # Hash password
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hash password on the bounded hashing pool
+        password_hash = self._hash_password(password)
         
         # Generate TOTP secret
         totp_secret = pyotp.random_base32()
         
-        self.users[username] = {
-            'password_hash': password_hash.decode('utf-8'),
+        created = self.users.create(username, {
+            'password_hash': password_hash,
             'totp_secret': totp_secret,
             'totp_enabled': False,
             'created_at': datetime.now().isoformat()
-        }
+        })
+        if not created:
+            return None, "User already exists"
         
-        self._save_users()
         return totp_secret, None
     
     def verify_password(self, username, password):
         """Verify username and password"""
-        if username not in self.users:
+        user = self.users.get(username)
+        if not user:
             return False
         
-        stored_hash = self.users[username]['password_hash'].encode('utf-8')
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
+        stored_hash = user['password_hash'].encode('utf-8')
+        if not hashing_pool.run(bcrypt.checkpw, password.encode('utf-8'), stored_hash):
+            return False
+
+        # Transparently rehash at the current cost while we have the plaintext
+        if _bcrypt_cost(user['password_hash']) != self.bcrypt_rounds:
+            try:
+                self.users.update(username, password_hash=self._hash_password(password))
+            except HashingBusyError:
+                pass  # Try again on a later login
+
+        return True
     
     def verify_totp(self, username, token):
         """Verify TOTP token"""
@@ -117,40 +206,50 @@ class AuthManager:
     
     def enable_totp(self, username):
         """Enable TOTP for user after successful verification"""
-        if username in self.users:
-            self.users[username]['totp_enabled'] = True
-            self._save_users()
-            return True
-        return False
+        return self.users.update(username, totp_enabled=True)
 
     def generate_reset_token(self, username):
         """Generate a password reset token"""
         if username not in self.users:
             return None, "User not found"
 
+        # Lazily drop expired tokens
+        self.users.clear_expired_reset_tokens(datetime.now().isoformat())
+
         # Generate secure random token
         reset_token = secrets.token_urlsafe(32)
+        expires = datetime.now() + timedelta(hours=RESET_TOKEN_EXPIRATION_HOURS)
 
-        # Store token with expiration
-        self.users[username]['reset_token'] = reset_token
-        self.users[username]['reset_token_expires'] = (
-            datetime.now() + timedelta(hours=RESET_TOKEN_EXPIRATION_HOURS)
-        ).isoformat()
-
-        self._save_users()
+        # Store only the token digest with expiration (replaces any previous token)
+        self.users.update(
+            username,
+            reset_token_hash=_hash_reset_token(reset_token),
+            reset_token_expires=expires.isoformat()
+        )
         return reset_token, None
 
     def verify_reset_token(self, token):
         """Verify reset token and return username if valid"""
-        for username, user_data in self.users.items():
-            if user_data.get('reset_token') == token:
-                # Check if token has expired
-                expires_str = user_data.get('reset_token_expires')
-                if expires_str:
-                    expires = datetime.fromisoformat(expires_str)
-                    if datetime.now() < expires:
-                        return username
-        return None
+        if not token:
+            return None
+
+        # Indexed lookup by digest, confirmed with a constant-time compare
+        token_hash = _hash_reset_token(token)
+        match = self.users.find_by_reset_token(token_hash)
+        if not match:
+            return None
+
+        username, user_data = match
+        if not hmac.compare_digest(user_data.get('reset_token_hash', ''), token_hash):
+            return None
+
+        # Expired tokens are removed when they are next looked up
+        expires = datetime.fromisoformat(user_data['reset_token_expires'])
+        if datetime.now() >= expires:
+            self.users.update(username, reset_token_hash=None, reset_token_expires=None)
+            return None
+
+        return username
 
     def reset_password(self, token, new_password):
         """Reset password using valid token"""
@@ -158,44 +257,48 @@ class AuthManager:
         if not username:
             return False, "Invalid or expired reset token"
 
-        # Hash new password
-        password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        # Hash new password on the bounded hashing pool
+        password_hash = self._hash_password(new_password)
 
-        # Update password and clear reset token
-        self.users[username]['password_hash'] = password_hash.decode('utf-8')
-        self.users[username].pop('reset_token', None)
-        self.users[username].pop('reset_token_expires', None)
+        # Update password and clear reset token in one row update
+        self.users.update(
+            username,
+            password_hash=password_hash,
+            reset_token_hash=None,
+            reset_token_expires=None
+        )
 
-        self._save_users()
+        # Invalidate every JWT issued before the reset
+        self.users.invalidate_tokens(username, int(time.time()))
+        self._sync_revocations(force=True)
         return True, None
     
-    def generate_qr_code(self, username):
-        """Generate QR code for TOTP setup"""
+    def provisioning_uri(self, username):
+        """TOTP provisioning URI for Microsoft Authenticator"""
         if username not in self.users:
             return None
-        
+
         totp_secret = self.users[username]['totp_secret']
-        
-        # Create provisioning URI for Microsoft Authenticator
-        totp_uri = pyotp.totp.TOTP(totp_secret).provisioning_uri(
+        return pyotp.totp.TOTP(totp_secret).provisioning_uri(
             name=username,
             issuer_name='Plex Manager'
         )
-        
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(totp_uri)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_base64}"
+
+    def get_qr_code(self, username, fmt='svg'):
+        """QR code image bytes for TOTP setup ('svg' or 'png')"""
+        totp_uri = self.provisioning_uri(username)
+        if not totp_uri:
+            return None
+        return _render_qr(totp_uri, fmt)
+
+    def generate_qr_code(self, username, fmt='svg'):
+        """Generate QR code for TOTP setup as a data URI (returned inline, never behind a URL)"""
+        image = self.get_qr_code(username, fmt)
+        if image is None:
+            return None
+
+        img_base64 = base64.b64encode(image).decode()
+        return f"data:{QR_MIMETYPES[fmt]};base64,{img_base64}"
     
     def generate_jwt(self, username):
         """Generate JWT token"""
@@ -206,15 +309,70 @@ class AuthManager:
         }
         return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
     
+    def _sync_revocations(self, force=False):
+        """Reload revocations from the store if another worker changed them"""
+        now = time.monotonic()
+        if not force and now - self._revocation_checked_at < REVOCATION_SYNC_SECONDS:
+            return
+        self._revocation_checked_at = now
+
+        generation = self.users.revocation_generation()
+        if force or generation != self._revocation_generation:
+            self._revoked_tokens, self._tokens_valid_after = self.users.load_revocations(int(time.time()))
+            self._revocation_generation = generation
+
+    def _is_revoked(self, token_hash, username, iat):
+        """Check a token against the revocation list and the user's reset cutoff"""
+        if token_hash in self._revoked_tokens:
+            return True
+        valid_after = self._tokens_valid_after.get(username)
+        # iat has one-second resolution: a token from the second of the reset may predate it
+        return valid_after is not None and iat <= valid_after
+
     def verify_jwt(self, token):
         """Verify JWT token and return username"""
+        if not token:
+            return None
+
+        token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        self._sync_revocations()
+
+        # Cached tokens already passed signature verification
+        cached = self.token_cache.get(token_hash)
+        if cached:
+            username, exp, iat = cached
+            if exp <= time.time():
+                self.token_cache.discard(token_hash)
+                return None
+        else:
+            try:
+                payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            except jwt.ExpiredSignatureError:
+                return None
+            except jwt.InvalidTokenError:
+                return None
+            # Only session tokens are accepted (earlier releases signed purpose-scoped QR tokens too)
+            if 'purpose' in payload:
+                return None
+            username, exp, iat = payload['username'], payload['exp'], payload.get('iat', 0)
+            self.token_cache.put(token_hash, username, exp, iat)
+
+        if self._is_revoked(token_hash, username, iat):
+            return None
+        return username
+
+    def revoke_jwt(self, token):
+        """Revoke a JWT (logout); returns True if the token was valid"""
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            return payload['username']
-        except jwt.ExpiredSignatureError:
-            return None
         except jwt.InvalidTokenError:
-            return None
+            return False
+
+        token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        self.users.revoke_token(token_hash, payload['exp'], int(time.time()))
+        self.token_cache.discard(token_hash)
+        self._sync_revocations(force=True)
+        return True
     
     def requires_auth(self, f):
         """Decorator to protect routes with authentication"""
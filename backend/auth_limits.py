@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Admission control for authentication
+Bounded bcrypt worker pool and failed-login throttling
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Configuration
+HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv('AUTH_HASH_QUEUE_LIMIT', str(HASH_WORKERS * 4)))
+HASH_TIMEOUT_SECONDS = float(os.getenv('AUTH_HASH_TIMEOUT_SECONDS', '10'))
+
+LOGIN_WINDOW_SECONDS = int(os.getenv('LOGIN_WINDOW_SECONDS', '900'))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '20'))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv('LOGIN_MAX_FAILURES_PER_USER', '5'))
+LOGIN_TRACKED_KEYS = 10000
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool queue is full"""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Authentication service busy, try again shortly")
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    """
+    Dedicated thread pool for bcrypt work
+
+    bcrypt releases the GIL while hashing, so CPU-count threads use every core
+    without tying up the Flask request threads beyond the wait. At most
+    workers + queue_limit jobs are admitted; anything beyond that is rejected
+    immediately with HashingBusyError instead of piling up.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, timeout=HASH_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Jobs admitted but not yet finished"""
+        return self._in_flight
+
+    def run(self, fn, *args):
+        """
+        Run fn(*args) on the pool and wait for the result
+
+        Raises:
+            HashingBusyError: if the pool is at capacity or the job timed out
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError()
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        # The slot is freed when the job finishes, even if the caller gave up waiting
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusyError()
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+class LoginThrottle:
+    """
+    Sliding-window failed-login counters per client IP and per username
+
+    Checked before any bcrypt work, so brute-force traffic is turned away
+    without burning CPU. Counters are kept per worker process.
+    """
+
+    def __init__(self, window=LOGIN_WINDOW_SECONDS, max_per_ip=LOGIN_MAX_FAILURES_PER_IP,
+                 max_per_user=LOGIN_MAX_FAILURES_PER_USER, max_keys=LOGIN_TRACKED_KEYS):
+        self.window = window
+        self.limits = {'ip': max_per_ip, 'user': max_per_user}
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        """Failure timestamps for key within the window (caller holds the lock)"""
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def check(self, ip, username):
+        """
+        Check whether a login attempt is allowed
+
+        Returns:
+            Seconds until the next attempt is allowed, or 0 if allowed now
+        """
+        now = time.monotonic()
+        retry_after = 0
+        with self._lock:
+            for kind, value in (('ip', ip), ('user', username)):
+                failures = self._recent((kind, value), now)
+                if failures and len(failures) >= self.limits[kind]:
+                    retry_after = max(retry_after, int(failures[0] + self.window - now) + 1)
+        return retry_after
+
+    def record_failure(self, ip, username):
+        """Record a failed login for both the client IP and the username"""
+        now = time.monotonic()
+        with self._lock:
+            for key in (('ip', ip), ('user', username)):
+                failures = self._failures.get(key)
+                if failures is None:
+                    failures = self._failures[key] = deque()
+                failures.append(now)
+                self._failures.move_to_end(key)
+
+            # Bound memory: forget the least recently failing keys
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, username):
+        """Clear the username's failures after a successful login"""
+        with self._lock:
+            self._failures.pop(('user', username), None)
+
+
+# Global instances
+hashing_pool = HashingPool()
+login_throttle = LoginThrottle()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Persistent background jobs
+SQLite job queue shared by every worker, plus the thread that runs it
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DATA_DIR = os.getenv('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+JOBS_DB_FILE = os.getenv('JOBS_DB_FILE', os.path.join(DATA_DIR, 'jobs.db'))
+
+# A running job whose worker hasn't checked in for this long is requeued
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '120'))
+# Running jobs check in this often, also while a single item takes long
+JOB_HEARTBEAT_SECONDS = max(1.0, JOB_STALE_SECONDS / 4)
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '2'))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    total        INTEGER NOT NULL DEFAULT 0,
+    succeeded    INTEGER NOT NULL DEFAULT 0,
+    failed       INTEGER NOT NULL DEFAULT 0,
+    bytes_freed  INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    worker       TEXT,
+    heartbeat_at REAL,
+    created_at   TEXT NOT NULL,
+    started_at   TEXT,
+    finished_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id     TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    item_key   TEXT NOT NULL,
+    rating_key TEXT,
+    title      TEXT,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    status     TEXT NOT NULL DEFAULT 'pending',
+    error      TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    name     TEXT PRIMARY KEY,
+    next_run REAL NOT NULL
+);
+"""
+
+
+class JobStore:
+    """
+    Job queue persisted in SQLite (WAL mode)
+
+    Jobs are claimed atomically, so with several Gunicorn workers each job
+    runs exactly once; progress is written per item, so a job interrupted by
+    a restart resumes with the items it hadn't finished.
+    """
+
+    def __init__(self, db_file=JOBS_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(db_dir, exist_ok=True)
+
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind, items):
+        """
+        Queue a job
+
+        Args:
+            kind: Job type, used to pick the handler
+            items: List of dicts with key, and optionally rating_key, title, size_bytes
+
+        Returns:
+            The new job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, total, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, kind, len(items), now.isoformat())
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, seq, item_key, rating_key, title, size_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, seq, item['key'], item.get('rating_key'), item.get('title'), item.get('size_bytes', 0))
+                 for seq, item in enumerate(items)]
+            )
+
+            # Prune finished jobs past retention
+            cutoff = (now - timedelta(days=JOB_RETENTION_DAYS)).isoformat()
+            old = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED_STATUSES, cutoff)
+            )]
+            for old_id in old:
+                conn.execute("DELETE FROM job_items WHERE job_id = ?", (old_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (old_id,))
+        return job_id
+
+    def claim_next(self, worker, stale_after=JOB_STALE_SECONDS):
+        """
+        Claim the oldest queued job, requeueing jobs whose worker stopped checking in
+
+        Returns:
+            Job dict (without items), or None if nothing is queued
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (now - stale_after,)
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, heartbeat_at = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker, now, datetime.now().isoformat(), row['id'])
+            )
+        return self.get(row['id'], include_items=False)
+
+    def claim_schedule(self, name, interval):
+        """
+        Claim a periodic task if it is due, so only one worker runs it per interval
+
+        Returns:
+            True if the caller should run the task now
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO schedules (name, next_run) VALUES (?, 0)", (name,))
+            cursor = conn.execute(
+                "UPDATE schedules SET next_run = ? WHERE name = ? AND next_run <= ?", (now + interval, name, now)
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id, worker):
+        """Check in for a running job so it isn't requeued as stale"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker)
+            )
+
+    def pending_items(self, job_id):
+        """Items of a job not processed yet, in submission order"""
+        rows = self._conn().execute(
+            "SELECT * FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY seq", (job_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finish_item(self, job_id, seq, status, size_bytes=0, error=None):
+        """Record one item's outcome and update the job's counters and heartbeat"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE job_items SET status = ?, error = ?, size_bytes = CASE WHEN ? > 0 THEN ? ELSE size_bytes END "
+                "WHERE job_id = ? AND seq = ?",
+                (status, error, size_bytes, size_bytes, job_id, seq)
+            )
+            if status == 'failed':
+                conn.execute(
+                    "UPDATE jobs SET failed = failed + 1, heartbeat_at = ? WHERE id = ?", (time.time(), job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET succeeded = succeeded + 1, bytes_freed = bytes_freed + ?, heartbeat_at = ? "
+                    "WHERE id = ?",
+                    (size_bytes, time.time(), job_id)
+                )
+
+    def finish_job(self, job_id, error=None):
+        """Mark a job completed (or failed, if error is given)"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                ('failed' if error else 'completed', error, datetime.now().isoformat(), job_id)
+            )
+
+    def get(self, job_id, include_items=True):
+        """
+        Job status in the JSON shape used by the API
+
+        Returns:
+            Job dict, or None if the job doesn't exist
+        """
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'total': row['total'],
+            'succeeded': row['succeeded'],
+            'failed': row['failed'],
+            'bytesFreed': row['bytes_freed'],
+            'error': row['error'],
+            'createdAt': row['created_at'],
+            'startedAt': row['started_at'],
+            'finishedAt': row['finished_at'],
+        }
+        if include_items:
+            job['items'] = [
+                {
+                    'key': item['item_key'],
+                    'title': item['title'],
+                    'status': item['status'],
+                    'sizeBytes': item['size_bytes'],
+                    'error': item['error'],
+                }
+                for item in conn.execute("SELECT * FROM job_items WHERE job_id = ? ORDER BY seq", (job_id,))
+            ]
+        return job
+
+
+class JobRunner:
+    """
+    Background thread that claims and runs queued jobs
+
+    Handlers are registered per job kind and called once per pending item;
+    they return the bytes freed, or raise to mark the item failed. Periodic
+    tasks (schedule) run between jobs, each by one worker per interval.
+    """
+
+    def __init__(self, store, poll_seconds=JOB_POLL_SECONDS, heartbeat_seconds=JOB_HEARTBEAT_SECONDS):
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._schedules = []
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register(self, kind, handler):
+        """Register handler(item_dict) -> bytes freed for a job kind"""
+        self._handlers[kind] = handler
+
+    def schedule(self, name, interval, task):
+        """Run task() every interval seconds (interval 0: never)"""
+        if interval > 0:
+            self._schedules.append((name, interval, task))
+
+    def run_due_schedules(self):
+        """Run the periodic tasks that are due and not claimed by another worker"""
+        for name, interval, task in self._schedules:
+            try:
+                if self.store.claim_schedule(name, interval):
+                    task()
+            except Exception as e:
+                print(f"⚠️  Scheduled task {name} failed: {e}")
+
+    def start(self):
+        """Start the runner thread (once per process)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='job-runner', daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the runner after queueing a job"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                job = self.store.claim_next(self.worker)
+            except sqlite3.Error as e:
+                print(f"⚠️  Job queue unavailable: {e}")
+                job = None
+
+            if job is None:
+                self.run_due_schedules()
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+
+            self.run_job(job)
+
+    def run_job(self, job):
+        """Process every pending item of a claimed job"""
+        handler = self._handlers.get(job['kind'])
+        if handler is None:
+            self.store.finish_job(job['id'], error=f"No handler for job kind: {job['kind']}")
+            return
+
+        # Keep checking in while handlers run: one slow deletion must not get the job requeued
+        done = threading.Event()
+        ticker = threading.Thread(target=self._heartbeat, args=(job['id'], done), name='job-heartbeat', daemon=True)
+        ticker.start()
+        try:
+            for item in self.store.pending_items(job['id']):
+                try:
+                    size_bytes = handler(item)
+                    self.store.finish_item(job['id'], item['seq'], 'succeeded', size_bytes or 0)
+                except Exception as e:
+                    self.store.finish_item(job['id'], item['seq'], 'failed', error=str(e))
+            self.store.finish_job(job['id'])
+        except sqlite3.Error as e:
+            # Left 'running'; requeued once its heartbeat goes stale
+            print(f"⚠️  Job {job['id']} interrupted: {e}")
+        finally:
+            done.set()
+            ticker.join()
+
+    def _heartbeat(self, job_id, done):
+        while not done.wait(self.heartbeat_seconds):
+            try:
+                self.store.heartbeat(job_id, self.worker)
+            except sqlite3.Error as e:
+                print(f"⚠️  Job {job_id} heartbeat failed: {e}")
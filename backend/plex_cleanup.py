@@ -7,10 +7,17 @@ Finds and deletes movies that have been watched once or less
 import argparse
 import logging
 from typing import List, Dict
-from datetime import datetime, timedelta
 import sys
+import os
 import asyncio
 
+# Shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cleanup_policy import CleanupPolicy, default_policy, movie_candidate
+from plex_http_metrics import instrumented_session, plex_operation
+from prometheus_metrics import SCAN_SECONDS, CLEANUP_CANDIDATES, CLEANUP_CANDIDATE_BYTES
+from tracing import span, traced
+
 try:
     from plexapi.server import PlexServer
     from plexapi.video import Movie
@@ -52,7 +59,7 @@ class PlexCleanup:
         """
         try:
             logger.info(f"Connecting to Plex server at {plex_url}")
-            self.plex = PlexServer(plex_url, plex_token)
+            self.plex = PlexServer(plex_url, plex_token, session=instrumented_session())
             logger.info(f"✓ Connected to Plex server: {self.plex.friendlyName}")
         except Exception as e:
             logger.error(f"Failed to connect to Plex: {e}")
@@ -149,34 +156,45 @@ class PlexCleanup:
 
         return messages
 
-    def get_unwatched_movies(self, max_view_count: int = 1, days_since_watched: int = None, days_since_added: int = None) -> List[Dict]:
+    @plex_operation('get_unwatched_movies')
+    @SCAN_SECONDS.time(scan='get_unwatched_movies')
+    @traced('get_unwatched_movies')
+    def get_unwatched_movies(self, max_view_count: int = None, days_since_watched: int = None,
+                             days_since_added: int = None, policy: CleanupPolicy = None,
+                             history: 'WatchHistory' = None) -> List[Dict]:
         """
-        Get movies that have been watched max_view_count times or less
-        Optionally filter by last watched date and date added
+        Get movies that match the cleanup policy: watched max_view_count times
+        or less, optionally not watched / added within the last X days
 
         Args:
-            max_view_count: Maximum view count (default: 1)
+            max_view_count: Maximum view count (default: the policy's, 1)
             days_since_watched: Only include movies not watched in last X days (optional)
             days_since_added: Only include movies added more than X days ago (optional)
+            policy: Cleanup policy (default: CLEANUP_POLICY_FILE or built-in); the
+                arguments above override its rules
+            history: WatchHistory to count every account's plays (updated first);
+                default: only the token owner's
 
         Returns:
             List of movie dictionaries with details
         """
         unwatched_movies = []
-        watched_cutoff_date = None
-        added_cutoff_date = None
-
-        if days_since_watched:
-            watched_cutoff_date = datetime.now() - timedelta(days=days_since_watched)
-            logger.info(f"Filtering for movies not watched since {watched_cutoff_date.strftime('%Y-%m-%d')}")
-
-        if days_since_added:
-            added_cutoff_date = datetime.now() - timedelta(days=days_since_added)
-            logger.info(f"Filtering for movies added before {added_cutoff_date.strftime('%Y-%m-%d')}")
+        policy = (policy or default_policy()).merged(
+            max_views=max_view_count,
+            days_not_watched=days_since_watched,
+            days_since_added=days_since_added
+        )
+        if history is not None:
+            history.refresh_or_warn(self.plex)
+        compiled = policy.compile(history=history)
+        logger.info(f"Filtering for movies with {policy.describe()}"
+                    f"{' (plays by all accounts)' if history is not None else ''}")
 
         try:
             # Get all movie libraries
-            movie_sections = [s for s in self.plex.library.sections() if s.type == 'movie']
+            with span('sections.fetch') as fetch:
+                movie_sections = compiled.sections(self.plex.library)
+                fetch.set('sections', len(movie_sections))
 
             if not movie_sections:
                 logger.warning("No movie libraries found in Plex")
@@ -186,68 +204,21 @@ class PlexCleanup:
 
             for section in movie_sections:
                 logger.info(f"Scanning library: {section.title}")
-                movies = section.all()
-
-                for movie in movies:
-                    view_count = movie.viewCount if movie.viewCount else 0
-
-                    # Check view count first
-                    if view_count > max_view_count:
-                        continue
-
-                    # Filter by date added if specified
-                    if added_cutoff_date:
-                        added_date = movie.addedAt if hasattr(movie, 'addedAt') and movie.addedAt else None
-
-                        # If no added date, skip it
-                        if added_date is None:
-                            continue
-                        # If added recently (within cutoff period), skip it
-                        elif added_date > added_cutoff_date:
-                            continue
-
-                    # If time-based filtering by last watched is enabled
-                    if watched_cutoff_date:
-                        last_viewed = movie.lastViewedAt if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt else None
-
-                        # If never watched, include it
-                        if last_viewed is None:
-                            pass  # Include it
-                        # If watched recently (within cutoff period), skip it
-                        elif last_viewed > watched_cutoff_date:
-                            continue
-                        # If watched but before cutoff date, include it
-
-                    # Get file info
-                    file_paths = [media.parts[0].file for media in movie.media]
-                    file_size = sum(media.parts[0].size for media in movie.media)
-
-                    last_viewed_str = 'Never'
-                    if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt:
-                        last_viewed_str = movie.lastViewedAt.strftime('%Y-%m-%d')
-
-                    unwatched_movies.append({
-                        'title': movie.title,
-                        'year': movie.year,
-                        'view_count': view_count,
-                        'added_date': movie.addedAt.strftime('%Y-%m-%d') if movie.addedAt else 'Unknown',
-                        'last_viewed': last_viewed_str,
-                        'file_paths': file_paths,
-                        'file_size_mb': file_size / (1024 * 1024),
-                        'rating': movie.rating if hasattr(movie, 'rating') else None,
-                        'plex_object': movie
-                    })
+                with span('section.fetch', section=section.title) as fetch:
+                    movies = section.all()
+                    fetch.set('items', len(movies))
+
+                with span('section.filter', section=section.title, items=len(movies)) as matching:
+                    candidates = [movie_candidate(movie, history) for movie in movies if compiled.matches(movie)]
+                    matching.set('candidates', len(candidates))
+                unwatched_movies.extend(candidates)
 
             # Sort by view count, then by added date (oldest first)
             unwatched_movies.sort(key=lambda x: (x['view_count'], x['added_date']))
+            CLEANUP_CANDIDATES.set(len(unwatched_movies))
+            CLEANUP_CANDIDATE_BYTES.set(int(sum(m['file_size_mb'] for m in unwatched_movies) * 1024 * 1024))
 
-            # Build log message based on filters
-            filter_msg = f"Found {len(unwatched_movies)} movies with {max_view_count} view(s) or less"
-            if days_since_added:
-                filter_msg += f", added more than {days_since_added} days ago"
-            if days_since_watched:
-                filter_msg += f", not watched in {days_since_watched} days"
-            logger.info(filter_msg)
+            logger.info(f"Found {len(unwatched_movies)} movies with {policy.describe()}")
 
         except Exception as e:
             logger.error(f"Error scanning movies: {e}")
@@ -282,6 +253,7 @@ class PlexCleanup:
         print("-" * 115)
         print(f"TOTAL: {len(movies)} movies, {total_size_gb:.2f} GB\n")
 
+    @plex_operation('delete_movies')
     def delete_movies(self, movies: List[Dict], dry_run: bool = False, days_filter: int = None, send_telegram: bool = False):
         """
         Delete movies from Plex and filesystem
@@ -371,7 +343,7 @@ def main():
     parser = argparse.ArgumentParser(description="Plex Movie Cleanup Tool")
     parser.add_argument("--url", required=True, help="Plex server URL (e.g., http://192.168.1.100:32400)")
     parser.add_argument("--token", required=True, help="Plex authentication token")
-    parser.add_argument("--max-views", type=int, default=1, help="Maximum view count (default: 1)")
+    parser.add_argument("--max-views", type=int, help="Maximum view count (default: 1, or the policy's)")
     parser.add_argument("--days", type=int, help="Only include movies not watched in last X days")
     parser.add_argument("--days-added", type=int, help="Only include movies added more than X days ago")
     parser.add_argument("--dry-run", action="store_true", help="Preview only, don't delete")
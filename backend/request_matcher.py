@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Media request fulfillment matching
+Looks requests up in a persistent title+year index of the Plex library
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+
+DATA_DIR = os.getenv('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+REQUESTS_DB_FILE = os.getenv('REQUESTS_DB_FILE', os.path.join(DATA_DIR, 'requests.db'))
+
+# Plex section type -> request type, and the libtype searched in that section
+SECTION_TYPES = {
+    'movie': ('movie', 'movie'),
+    'show': ('tv', 'show'),
+}
+
+# Items added this close to the last sync are fetched again; indexing is idempotent
+SYNC_OVERLAP_SECONDS = 60
+
+# How often the API syncs new items, and how often it re-lists the whole library
+# to drop items deleted outside the API (CLI, bot, Plex itself); 0 disables
+REQUEST_SYNC_SECONDS = int(os.getenv('REQUEST_SYNC_SECONDS', '900'))
+LIBRARY_PRUNE_SECONDS = int(os.getenv('LIBRARY_PRUNE_SECONDS', '3600'))
+
+ARTICLES = {'the', 'a', 'an'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS library_index (
+    rating_key TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    year       INTEGER,
+    title      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_library_index_title ON library_index(media_type, norm_title, year);
+CREATE TABLE IF NOT EXISTS library_sync (
+    section_key TEXT PRIMARY KEY,
+    added_at    INTEGER NOT NULL
+);
+"""
+
+
+def normalize_title(title):
+    """
+    Normalize a title for matching
+
+    Casefolds, strips accents and punctuation, and drops articles, so
+    "The Lord of the Rings: The Two Towers" and "lord of rings two towers"
+    compare equal.
+    """
+    if not title:
+        return ''
+
+    text = unicodedata.normalize('NFKD', str(title))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = text.replace('&', ' and ')
+    text = text.replace("'", '').replace('\u2019', '')
+    words = re.sub(r"[^\w\s]|_", ' ', text).split()
+
+    significant = [word for word in words if word not in ARTICLES]
+    # Titles made only of articles ("A", "The The") keep them
+    return ' '.join(significant or words)
+
+
+class LibraryIndex:
+    """
+    Normalized (type, title, year) -> Plex item index, persisted in SQLite
+
+    Synced incrementally: each section remembers the newest addedAt it has
+    indexed and later syncs only ask Plex for items added since then. Deleted
+    items are only noticed by a full sync, which lists every item and prunes
+    the rest.
+    """
+
+    def __init__(self, db_file=REQUESTS_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(db_dir, exist_ok=True)
+
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, media_type, norm_title, year=None):
+        """
+        Find an indexed item (single index probe)
+
+        Items without a year match any year (as in RequestStore.find_open_by_title);
+        an item with the exact year is preferred.
+
+        Returns:
+            Rating key of the matching item, or None
+        """
+        conn = self._conn()
+        if year:
+            row = conn.execute(
+                "SELECT rating_key FROM library_index WHERE media_type = ? AND norm_title = ? "
+                "AND (year IS NULL OR year = ?) ORDER BY year IS NULL LIMIT 1",
+                (media_type, norm_title, int(year))
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT rating_key FROM library_index WHERE media_type = ? AND norm_title = ? LIMIT 1",
+                (media_type, norm_title)
+            ).fetchone()
+        return row[0] if row else None
+
+    def add(self, entries):
+        """Insert or refresh index entries: (rating_key, media_type, norm_title, year, title)"""
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO library_index (rating_key, media_type, norm_title, year, title) "
+                "VALUES (?, ?, ?, ?, ?)",
+                entries
+            )
+
+    def remove(self, rating_key):
+        """Drop a deleted item from the index"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM library_index WHERE rating_key = ?", (str(rating_key),))
+
+    def prune(self, media_type, rating_keys):
+        """
+        Drop indexed items of a type that are not in rating_keys (the complete current listing)
+
+        Returns:
+            Number of items removed
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_keys (rating_key TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM live_keys")
+            conn.executemany("INSERT OR IGNORE INTO live_keys (rating_key) VALUES (?)",
+                             [(str(key),) for key in rating_keys])
+            cursor = conn.execute(
+                "DELETE FROM library_index WHERE media_type = ? "
+                "AND rating_key NOT IN (SELECT rating_key FROM live_keys)",
+                (media_type,)
+            )
+        return cursor.rowcount
+
+    def get_watermark(self, section_key):
+        """Newest addedAt (epoch seconds) indexed for a section, or None if never synced"""
+        row = self._conn().execute(
+            "SELECT added_at FROM library_sync WHERE section_key = ?", (str(section_key),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, section_key, added_at):
+        """Record the newest addedAt indexed for a section"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO library_sync (section_key, added_at) VALUES (?, ?)",
+                (str(section_key), int(added_at))
+            )
+
+
+class RequestMatcher:
+    """
+    Marks open media requests as completed once Plex has the title
+
+    New requests are checked against the library index when they are created;
+    sync() pulls items added to Plex since the last run and completes every
+    open request they satisfy. The API runs sync() every REQUEST_SYNC_SECONDS
+    and a full sync every LIBRARY_PRUNE_SECONDS.
+    """
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def match(self, media_request):
+        """
+        Complete a request right away if its title is already in the index
+
+        Returns:
+            The (possibly updated) request dict
+        """
+        rating_key = self.index.lookup(
+            media_request['type'], normalize_title(media_request['title']), media_request.get('year')
+        )
+        if rating_key is None:
+            return media_request
+        return self.store.mark_fulfilled(media_request['id'], rating_key) or media_request
+
+    def sync(self, plex, full=False):
+        """
+        Index items added to Plex since the last sync and complete matching requests
+
+        Args:
+            plex: Connected PlexServer
+            full: List every item instead of only new ones, and drop indexed
+                items that are no longer in Plex
+
+        Returns:
+            Dict with sections, indexed (items), removed (items) and fulfilled (request dicts)
+        """
+        indexed = 0
+        fulfilled = []
+        sections = 0
+        live_keys = {media_type: set() for media_type, _ in SECTION_TYPES.values()}
+
+        for section in plex.library.sections():
+            if section.type not in SECTION_TYPES:
+                continue
+            media_type, libtype = SECTION_TYPES[section.type]
+            sections += 1
+
+            watermark = self.index.get_watermark(section.key)
+            if full or watermark is None:
+                items = section.search(libtype=libtype)
+            else:
+                since = datetime.fromtimestamp(watermark - SYNC_OVERLAP_SECONDS)
+                items = section.search(libtype=libtype, filters={'addedAt>>': since})
+
+            entries = []
+            newest = watermark or 0
+            for item in items:
+                norm_title = normalize_title(item.title)
+                entries.append((str(item.ratingKey), media_type, norm_title, item.year, item.title))
+                if item.addedAt:
+                    newest = max(newest, int(item.addedAt.timestamp()))
+
+            self.index.add(entries)
+            self.index.set_watermark(section.key, newest)
+            indexed += len(entries)
+            live_keys[media_type].update(entry[0] for entry in entries)
+
+            for rating_key, _, norm_title, year, _ in entries:
+                for media_request in self.store.find_open_by_title(media_type, norm_title, year):
+                    updated = self.store.mark_fulfilled(media_request['id'], rating_key)
+                    if updated:
+                        fulfilled.append(updated)
+
+        # Every section listed completely: whatever else is indexed was deleted
+        removed = 0
+        if full:
+            for media_type, keys in live_keys.items():
+                removed += self.index.prune(media_type, keys)
+
+        return {'sections': sections, 'indexed': indexed, 'removed': removed, 'fulfilled': fulfilled}
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+SQLite media request store
+Persistent, indexed storage for /api/requests shared by every worker (WAL mode)
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from request_matcher import normalize_title
+
+DATA_DIR = os.getenv('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+REQUESTS_DB_FILE = os.getenv('REQUESTS_DB_FILE', os.path.join(DATA_DIR, 'requests.db'))
+
+REQUEST_STATUSES = ('pending', 'approved', 'rejected', 'completed')
+REQUEST_TYPES = ('movie', 'tv')
+
+# Requests still waiting for the title to show up in Plex
+OPEN_STATUSES = ('pending', 'approved')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media_requests (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    title        TEXT NOT NULL,
+    type         TEXT NOT NULL DEFAULT 'movie',
+    year         INTEGER,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    requested_by TEXT NOT NULL DEFAULT 'Anonymous',
+    requested_at TEXT,
+    notes        TEXT NOT NULL DEFAULT '',
+    version      INTEGER NOT NULL DEFAULT 1,
+    updated_at   TEXT,
+    norm_title   TEXT,
+    plex_rating_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_media_requests_status ON media_requests(status, id);
+CREATE INDEX IF NOT EXISTS idx_media_requests_requested_by ON media_requests(requested_by, id);
+"""
+
+# Columns added after the first release of the store, applied to existing databases
+MIGRATIONS = {
+    'norm_title': "ALTER TABLE media_requests ADD COLUMN norm_title TEXT",
+    'plex_rating_key': "ALTER TABLE media_requests ADD COLUMN plex_rating_key TEXT",
+}
+
+# Created after MIGRATIONS so the indexed columns exist
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_media_requests_norm_title ON media_requests(type, norm_title);
+"""
+
+# Filterable columns, keyed by API query parameter
+FILTERS = {
+    'status': 'status',
+    'requestedBy': 'requested_by',
+    'type': 'type',
+}
+
+
+class RequestConflictError(Exception):
+    """Raised when a status update was based on a stale version of the request"""
+
+    def __init__(self, current):
+        super().__init__("Request was modified by someone else")
+        self.current = current
+
+
+class RequestStore:
+    """
+    Media requests backed by SQLite
+
+    Every change bumps the row's version; update_status can be given the
+    version the client last saw, and refuses the write if the row has moved
+    on since (optimistic concurrency, no locks held between requests).
+    """
+
+    def __init__(self, db_file=REQUESTS_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(db_dir, exist_ok=True)
+
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(media_requests)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+            conn.executescript(INDEXES)
+
+            # Requests stored before titles were normalized
+            rows = conn.execute("SELECT id, title FROM media_requests WHERE norm_title IS NULL").fetchall()
+            conn.executemany(
+                "UPDATE media_requests SET norm_title = ? WHERE id = ?",
+                [(normalize_title(row['title']), row['id']) for row in rows]
+            )
+
+    def _conn(self):
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        """Convert a database row to the JSON shape used by the API"""
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'type': row['type'],
+            'year': row['year'],
+            'status': row['status'],
+            'requestedBy': row['requested_by'],
+            'requestedAt': row['requested_at'],
+            'notes': row['notes'],
+            'version': row['version'],
+            'updatedAt': row['updated_at'],
+            'plexRatingKey': row['plex_rating_key'],
+        }
+
+    def get(self, request_id):
+        """Return one request as a dict, or None"""
+        row = self._conn().execute("SELECT * FROM media_requests WHERE id = ?", (request_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def create(self, title, media_type='movie', year=None, requested_by='Anonymous', requested_at=None, notes=''):
+        """
+        Insert a new pending request
+
+        Returns:
+            The stored request dict
+        """
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO media_requests (title, type, year, requested_by, requested_at, notes, updated_at, norm_title) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, media_type, year, requested_by or 'Anonymous', requested_at or now, notes or '', now,
+                 normalize_title(title))
+            )
+        return self.get(cursor.lastrowid)
+
+    def list(self, filters=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        List requests, newest first
+
+        Args:
+            filters: Dict of API filter name (see FILTERS) -> value
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            offset: Number of matching requests to skip
+
+        Returns:
+            (list of request dicts, total number of matching requests)
+        """
+        clauses = []
+        params = []
+        for name, value in (filters or {}).items():
+            if value in (None, ''):
+                continue
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name}")
+            clauses.append(f"{FILTERS[name]} = ?")
+            params.append(value)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM media_requests {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM media_requests {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows], total
+
+    def update_status(self, request_id, status, expected_version=None):
+        """
+        Change a request's status
+
+        Args:
+            request_id: Request ID
+            status: New status (one of REQUEST_STATUSES)
+            expected_version: Version the caller based the change on, or None to
+                overwrite unconditionally
+
+        Returns:
+            The updated request dict, or None if the request doesn't exist
+
+        Raises:
+            RequestConflictError: if expected_version no longer matches
+        """
+        if status not in REQUEST_STATUSES:
+            raise ValueError(f"Invalid status: {status}")
+
+        sql = "UPDATE media_requests SET status = ?, version = version + 1, updated_at = ? WHERE id = ?"
+        params = [status, datetime.now().isoformat(), request_id]
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(int(expected_version))
+
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(sql, params)
+
+        current = self.get(request_id)
+        if cursor.rowcount == 0 and current is not None:
+            raise RequestConflictError(current)
+        return current
+
+    def find_open_by_title(self, media_type, norm_title, year=None):
+        """
+        Open requests for a normalized title (indexed lookup)
+
+        Requests without a year match any year; items without a year match any request.
+        """
+        sql = (f"SELECT * FROM media_requests WHERE type = ? AND norm_title = ? "
+               f"AND status IN ({', '.join('?' * len(OPEN_STATUSES))})")
+        params = [media_type, norm_title, *OPEN_STATUSES]
+        if year:
+            sql += " AND (year IS NULL OR year = ?)"
+            params.append(int(year))
+        return [self._to_dict(row) for row in self._conn().execute(sql, params)]
+
+    def mark_fulfilled(self, request_id, rating_key):
+        """
+        Complete an open request with the Plex item that satisfies it
+
+        Returns:
+            The updated request dict, or None if the request isn't open
+        """
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE media_requests SET status = 'completed', plex_rating_key = ?, version = version + 1, "
+                f"updated_at = ? WHERE id = ? AND status IN ({', '.join('?' * len(OPEN_STATUSES))})",
+                (str(rating_key), datetime.now().isoformat(), request_id, *OPEN_STATUSES)
+            )
+        return self.get(request_id) if cursor.rowcount else None
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Verified JWT cache
+Small LRU of token digests whose signature has already been checked
+"""
+
+import threading
+from collections import OrderedDict
+
+TOKEN_CACHE_SIZE = 1024
+
+
+class TokenCache:
+    """
+    LRU map of SHA-256(token) -> (username, exp, iat)
+
+    Only tokens that passed full signature verification are stored, so a hit
+    lets the caller skip HS256 verification; expiry and revocation are still
+    checked on every lookup.
+    """
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token_hash):
+        """Return (username, exp, iat) for a cached digest, or None"""
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token_hash)
+            self.hits += 1
+            return entry
+
+    def put(self, token_hash, username, exp, iat):
+        """Cache a verified token"""
+        with self._lock:
+            self._entries[token_hash] = (username, exp, iat)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token_hash):
+        """Drop a digest from the cache"""
+        with self._lock:
+            self._entries.pop(token_hash, None)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+SQLite user store for AuthManager
+Row-level, atomic updates shared by every worker process (WAL mode)
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+USER_FIELDS = (
+    'password_hash',
+    'totp_secret',
+    'totp_enabled',
+    'created_at',
+    'reset_token_hash',
+    'reset_token_expires',
+    'tokens_valid_after',
+)
+
+# Optional fields left out of user records while unset
+OPTIONAL_FIELDS = ('reset_token_hash', 'reset_token_expires', 'tokens_valid_after')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username            TEXT PRIMARY KEY,
+    password_hash       TEXT NOT NULL,
+    totp_secret         TEXT NOT NULL,
+    totp_enabled        INTEGER NOT NULL DEFAULT 0,
+    created_at          TEXT,
+    reset_token_hash    TEXT,
+    reset_token_expires TEXT,
+    tokens_valid_after  INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_reset_token_hash ON users(reset_token_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    token_hash TEXT PRIMARY KEY,
+    expires_at INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release of the store, applied to existing databases
+MIGRATIONS = {
+    'tokens_valid_after': "ALTER TABLE users ADD COLUMN tokens_valid_after INTEGER",
+}
+
+
+class UserStore(Mapping):
+    """
+    Read-through mapping of username -> user record backed by SQLite
+
+    Reads always hit the database, so a change made by one Gunicorn worker is
+    visible to the others immediately. Records returned are plain dict copies;
+    use create/update to change them.
+    """
+
+    def __init__(self, db_file, legacy_json_file=None):
+        self.db_file = db_file
+        self._local = threading.local()
+
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+        if legacy_json_file:
+            self._import_json(legacy_json_file)
+
+    def _conn(self):
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _import_json(self, json_file):
+        """Import users.json once, on the first start with the SQLite store"""
+        conn = self._conn()
+        with conn:
+            # BEGIN IMMEDIATE so only one worker performs the import
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return
+
+            if os.path.exists(json_file):
+                try:
+                    with open(json_file, 'r') as f:
+                        legacy_users = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Could not import {json_file}: {e}")
+                    legacy_users = {}
+
+                for username, record in legacy_users.items():
+                    record = dict(record)
+                    # Convert raw reset tokens from older files to digests
+                    if 'reset_token' in record:
+                        record['reset_token_hash'] = hashlib.sha256(record.pop('reset_token').encode('utf-8')).hexdigest()
+                    conn.execute(
+                        "INSERT OR IGNORE INTO users (username, password_hash, totp_secret, totp_enabled, "
+                        "created_at, reset_token_hash, reset_token_expires) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (username, record['password_hash'], record['totp_secret'],
+                         int(bool(record.get('totp_enabled'))), record.get('created_at'),
+                         record.get('reset_token_hash'), record.get('reset_token_expires'))
+                    )
+                print(f"✓ Imported {len(legacy_users)} users from {json_file}")
+
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', '1')")
+
+    @staticmethod
+    def _to_record(row):
+        """Convert a database row to the user record dict AuthManager expects"""
+        record = {field: row[field] for field in USER_FIELDS}
+        record['totp_enabled'] = bool(record['totp_enabled'])
+        for field in OPTIONAL_FIELDS:
+            if record[field] is None:
+                del record[field]
+        return record
+
+    def __getitem__(self, username):
+        row = self._conn().execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return self._to_record(row)
+
+    def __contains__(self, username):
+        return self._conn().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def __iter__(self):
+        return iter([row[0] for row in self._conn().execute("SELECT username FROM users")])
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def create(self, username, record):
+        """
+        Insert a new user atomically
+
+        Returns:
+            True if created, False if the username already exists
+        """
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (username, password_hash, totp_secret, totp_enabled, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (username, record['password_hash'], record['totp_secret'],
+                     int(bool(record.get('totp_enabled'))), record.get('created_at'))
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update(self, username, **fields):
+        """
+        Update individual fields of one user
+
+        Returns:
+            True if the user exists and was updated
+        """
+        unknown = set(fields) - set(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown))}")
+
+        if 'totp_enabled' in fields:
+            fields['totp_enabled'] = int(bool(fields['totp_enabled']))
+
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE users SET {assignments} WHERE username = ?",
+                (*fields.values(), username)
+            )
+        return cursor.rowcount == 1
+
+    def find_by_reset_token(self, token_hash):
+        """
+        Look up a user by reset token digest (indexed)
+
+        Returns:
+            (username, record) or None
+        """
+        row = self._conn().execute(
+            "SELECT * FROM users WHERE reset_token_hash = ?", (token_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row['username'], self._to_record(row)
+
+    def clear_expired_reset_tokens(self, now_iso):
+        """Remove every reset token that expired before now_iso"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE users SET reset_token_hash = NULL, reset_token_expires = NULL "
+                "WHERE reset_token_expires IS NOT NULL AND reset_token_expires <= ?",
+                (now_iso,)
+            )
+
+    def get_meta(self, key, default=None):
+        """Read a store-wide setting"""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """Write a store-wide setting"""
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _bump_revocation_generation(self, conn):
+        """Signal other workers to reload revocations (caller holds a transaction)"""
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revocation_generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def revocation_generation(self):
+        """Counter bumped whenever a token is revoked or a user's tokens are invalidated"""
+        return self.get_meta('revocation_generation', '0')
+
+    def revoke_token(self, token_hash, expires_at, now):
+        """Add a token digest to the revocation list, pruning entries that have expired anyway"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (token_hash, expires_at) VALUES (?, ?)",
+                (token_hash, expires_at)
+            )
+            self._bump_revocation_generation(conn)
+
+    def invalidate_tokens(self, username, valid_after):
+        """Reject every token for username issued before valid_after (epoch seconds)"""
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE users SET tokens_valid_after = ? WHERE username = ?", (valid_after, username))
+            self._bump_revocation_generation(conn)
+
+    def load_revocations(self, now):
+        """
+        Load the current revocation state
+
+        Returns:
+            (set of revoked token digests, {username: tokens_valid_after})
+        """
+        conn = self._conn()
+        revoked = {row[0] for row in conn.execute(
+            "SELECT token_hash FROM revoked_tokens WHERE expires_at > ?", (now,)
+        )}
+        valid_after = {row[0]: row[1] for row in conn.execute(
+            "SELECT username, tokens_valid_after FROM users WHERE tokens_valid_after IS NOT NULL"
+        )}
+        return revoked, valid_after
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Plex Cleanup Benchmarks
+Times the scan, aggregation, formatting and deletion paths against the mock
+Plex server (tests/mock_plex.py) at several library sizes
+
+Each benchmark runs in a fresh worker process, so peak RSS is its own. It
+records the best wall time over the repeats, the HTTP requests made to Plex,
+and peak RSS. With --baseline it reports (and exits non-zero on) regressions
+beyond --threshold; request counts are deterministic, so any increase counts.
+Wall time and RSS depend on the machine: re-record the baseline (--save) on
+the machine that runs the check.
+
+Usage:
+    python benchmarks/bench_cleanup.py                       # 1k and 10k items
+    python benchmarks/bench_cleanup.py --sizes 1000 50000 200000 --only analyze_storage
+    python benchmarks/bench_cleanup.py --save                # record a new baseline
+"""
+
+import os
+import re
+import sys
+import json
+import html
+import time
+import argparse
+import resource
+import subprocess
+from contextlib import redirect_stdout
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA = 0.005
+MIN_RSS_DELTA_MB = 5
+
+
+def _plex_cleanup(server):
+    from plex_cleanup import PlexCleanup
+    return PlexCleanup(server.url, server.token)
+
+
+def _analyzer(server):
+    from plexapi.server import PlexServer
+    from storage_analyzer import StorageAnalyzer
+
+    analyzer = StorageAnalyzer(PlexServer(server.url, server.token), total_capacity_gb=1_000_000)
+    # Keep df/ssh out of the measurement
+    analyzer.disk_checker = None
+    return analyzer
+
+
+def setup_get_unwatched_movies(server):
+    cleanup = _plex_cleanup(server)
+    return lambda: cleanup.get_unwatched_movies(max_view_count=1, days_since_watched=30)
+
+
+def setup_analyze_storage(server):
+    analyzer = _analyzer(server)
+    return analyzer.analyze_storage
+
+
+def setup_categorize_path(server):
+    from storage_analyzer import StorageAnalyzer
+
+    library = server.library
+    keys = library.movie_keys() + library.episode_keys() + library.track_keys()
+    paths = [html.unescape(path) for key in keys for path in re.findall(r'file="([^"]*)"', library.item_xml(key))]
+    analyzer = StorageAnalyzer(None)
+    return lambda: [analyzer.categorize_path(path) for path in paths]
+
+
+def setup_format_telegram_summary(server):
+    cleanup = _plex_cleanup(server)
+    movies = cleanup.get_unwatched_movies(max_view_count=1)
+    return lambda: cleanup.format_telegram_summary(movies, days_filter=30)
+
+
+def setup_format_cli_report(server):
+    analyzer = _analyzer(server)
+    stats = analyzer.analyze_storage()
+    return lambda: analyzer.format_cli_report(stats)
+
+
+def setup_delete_movies(server):
+    cleanup = _plex_cleanup(server)
+    movies = cleanup.get_unwatched_movies(max_view_count=1)
+
+    def run():
+        # Both confirmations answered; the movie list print goes nowhere
+        with mock.patch('builtins.input', side_effect=['DELETE', 'YES']), open(os.devnull, 'w') as devnull, \
+                redirect_stdout(devnull):
+            cleanup.delete_movies(movies)
+
+    return run
+
+
+BENCHMARKS = {
+    'get_unwatched_movies': setup_get_unwatched_movies,
+    'analyze_storage': setup_analyze_storage,
+    'categorize_path': setup_categorize_path,
+    'format_telegram_summary': setup_format_telegram_summary,
+    'format_cli_report': setup_format_cli_report,
+    'delete_movies': setup_delete_movies,
+}
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process in MB (since the last reset, where supported)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_benchmark(name, size, seed=0, latency_ms=0):
+    """
+    Run one benchmark once, in this process
+
+    Returns:
+        Dict with wall_s, requests and peak_rss_mb
+    """
+    import logging
+    from mock_plex import MockPlexServer, SyntheticLibrary
+
+    logging.disable(logging.INFO)
+
+    library = SyntheticLibrary.scaled(size, seed=seed)
+    with MockPlexServer(library, latency_ms=latency_ms, process=True) as server:
+        # The child process serves a copy; setup_categorize_path reads this one
+        server.library = library
+        func = BENCHMARKS[name](server)
+
+        server.reset_stats()
+        _reset_peak_rss()
+        start = time.perf_counter()
+        func()
+        wall = time.perf_counter() - start
+        peak_rss = _peak_rss_mb()
+        requests = server.stats()['requests']
+
+    return {'wall_s': round(wall, 4), 'requests': requests, 'peak_rss_mb': round(peak_rss, 1)}
+
+
+def run_in_worker(name, size, seed=0, latency_ms=0):
+    """Run one benchmark in a fresh interpreter, so earlier runs don't inflate its RSS"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', name, str(size),
+         '--seed', str(seed), '--latency-ms', str(latency_ms)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against a baseline
+
+    Args:
+        results: {"name@size": {wall_s, requests, peak_rss_mb}}
+        baseline: Same shape, from a previous --save
+        threshold: Allowed relative slowdown/growth (0.25 = 25%)
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+
+        if (result['wall_s'] > base['wall_s'] * (1 + threshold)
+                and result['wall_s'] - base['wall_s'] > MIN_TIME_DELTA):
+            regressions.append(f"{key}: wall time {base['wall_s']:.3f}s -> {result['wall_s']:.3f}s")
+        if result['requests'] > base['requests']:
+            regressions.append(f"{key}: requests {base['requests']} -> {result['requests']}")
+        if (result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold)
+                and result['peak_rss_mb'] - base['peak_rss_mb'] > MIN_RSS_DELTA_MB):
+            regressions.append(f"{key}: peak RSS {base['peak_rss_mb']:.1f}MB -> {result['peak_rss_mb']:.1f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Plex cleanup against a synthetic library")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Library sizes in items (default: 1000 10000)")
+    parser.add_argument("--only", nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best is kept (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic library seed (default: 0)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every Plex request")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed regression before failing (default: 0.25 = 25%%)")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--worker", nargs=2, metavar=('NAME', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        name, size = args.worker
+        print(json.dumps(run_benchmark(name, int(size), args.seed, args.latency_ms)))
+        return
+
+    results = {}
+    print(f"{'Benchmark':<28} {'Items':>8} {'Wall (s)':>10} {'Requests':>10} {'Peak RSS (MB)':>14}")
+    print("-" * 74)
+    for size in args.sizes:
+        for name in args.only or BENCHMARKS:
+            runs = [run_in_worker(name, size, args.seed, args.latency_ms) for _ in range(args.repeat)]
+            result = {
+                'wall_s': min(run['wall_s'] for run in runs),
+                'requests': max(run['requests'] for run in runs),
+                'peak_rss_mb': min(run['peak_rss_mb'] for run in runs),
+            }
+            results[f"{name}@{size}"] = result
+            print(f"{name:<28} {size:>8} {result['wall_s']:>10.3f} {result['requests']:>10} "
+                  f"{result['peak_rss_mb']:>14.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\n✓ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Cleanup Policy
+Declarative cleanup rules, compiled once into predicate closures
+
+A policy is a flat YAML (or JSON) document:
+
+    max_views: 1                  # watched this many times or less
+    days_not_watched: 30          # not watched in the last 30 days
+    days_since_added: 60          # added more than 60 days ago
+    min_size_gb: 2
+    max_size_gb: 100
+    resolutions: [sd, 480, 720]   # only these video resolutions
+    libraries: [Movies]           # only these libraries
+    exclude_libraries: [Kids]
+    exclude_labels: [keep]
+    exclude_collections: [Criterion]
+
+Unset rules don't apply. compile() turns the active rules into a list of
+closures over precomputed cutoffs, so evaluating a movie is a handful of
+comparisons. Fields are read as Plex returned them in the library listing;
+that skips plexapi's reload-on-missing-attribute, which otherwise costs one
+extra request for every never-watched movie.
+
+TV cleanup (tv_cleanup.py) has its own watch rules but honours the library
+rules (list TV libraries in libraries too when setting it) and the label and
+collection exclusions, on the show as well as on the episode.
+
+CLEANUP_POLICY_FILE names the policy used by default in the CLI, bot, API and
+web dashboard; without it they all start from the built-in default (1 view or
+less, no day limit). Explicit options (--max-views, ?days=...) override its
+rules.
+
+Given a WatchHistory (see watch_history.py), max_views and days_not_watched
+count every account's plays, not just the token owner's.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from media_size import media_size_breakdown
+
+CLEANUP_POLICY_FILE = os.getenv('CLEANUP_POLICY_FILE')
+
+INT_RULES = ('max_views', 'days_not_watched', 'days_since_added')
+FLOAT_RULES = ('min_size_gb', 'max_size_gb')
+LIST_RULES = ('resolutions', 'libraries', 'exclude_libraries', 'exclude_labels', 'exclude_collections')
+RULES = INT_RULES + FLOAT_RULES + LIST_RULES
+
+GB = 1024 ** 3
+
+
+class PolicyError(ValueError):
+    """Invalid policy document or rule"""
+
+
+def _raw(item, attr):
+    """An attribute as Plex sent it, without plexapi reloading the item when it is missing"""
+    return item.__dict__.get(attr)
+
+
+def _tags(item, attr):
+    """Lower-cased tag names (labels, collections) from the listing"""
+    return {tag.tag.lower() for tag in (_raw(item, attr) or [])}
+
+
+def _resolution(value):
+    """Normalize '1080p', '4K', 'SD' to Plex's videoResolution values ('1080', '4k', 'sd')"""
+    value = str(value).strip().lower()
+    return value[:-1] if value.endswith('p') and value[:-1].isdigit() else value
+
+
+def view_state(item, history=None):
+    """
+    (plays, last played) of an item: the token owner's, or with a WatchHistory
+    the server-wide figures (whichever is higher / more recent)
+    """
+    views = _raw(item, 'viewCount') or 0
+    last_viewed = _raw(item, 'lastViewedAt')
+    if history is not None:
+        stats = history.get(_raw(item, 'ratingKey'))
+        if stats is not None:
+            views = max(views, stats.plays)
+            if last_viewed is None or (stats.last_viewed and stats.last_viewed > last_viewed):
+                last_viewed = stats.last_viewed
+    return views, last_viewed
+
+
+def _item_bytes(item):
+    return sum(getattr(part, 'size', None) or 0 for media in (_raw(item, 'media') or []) for part in media.parts)
+
+
+class CleanupPolicy:
+    """Which movies are cleanup candidates"""
+
+    def __init__(self, max_views: Optional[int] = 1, days_not_watched: Optional[int] = None,
+                 days_since_added: Optional[int] = None, min_size_gb: Optional[float] = None,
+                 max_size_gb: Optional[float] = None, resolutions: Optional[List[str]] = None,
+                 libraries: Optional[List[str]] = None, exclude_libraries: Optional[List[str]] = None,
+                 exclude_labels: Optional[List[str]] = None, exclude_collections: Optional[List[str]] = None):
+        self.max_views = max_views
+        self.days_not_watched = days_not_watched
+        self.days_since_added = days_since_added
+        self.min_size_gb = min_size_gb
+        self.max_size_gb = max_size_gb
+        self.resolutions = resolutions
+        self.libraries = libraries
+        self.exclude_libraries = exclude_libraries
+        self.exclude_labels = exclude_labels
+        self.exclude_collections = exclude_collections
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CleanupPolicy':
+        """
+        Build a policy from a parsed document
+
+        Raises:
+            PolicyError: Unknown rule or a value of the wrong type
+        """
+        if not isinstance(data, dict):
+            raise PolicyError("A policy must be a mapping of rule: value")
+
+        unknown = set(data) - set(RULES)
+        if unknown:
+            raise PolicyError(f"Unknown policy rule(s): {', '.join(sorted(unknown))}")
+
+        rules = {}
+        for name, value in data.items():
+            if value is None:
+                rules[name] = None
+                continue
+            try:
+                if name in INT_RULES:
+                    rules[name] = int(value)
+                elif name in FLOAT_RULES:
+                    rules[name] = float(value)
+                else:
+                    values = [value] if isinstance(value, (str, int, float)) else list(value)
+                    rules[name] = [str(v) for v in values]
+            except (TypeError, ValueError):
+                raise PolicyError(f"Invalid value for {name}: {value!r}")
+
+        # Defaults apply only to rules the document leaves out
+        return cls(**rules)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in RULES}
+
+    def merged(self, **overrides) -> 'CleanupPolicy':
+        """A copy with the given rules replaced; None means keep this policy's value"""
+        rules = self.to_dict()
+        rules.update({name: value for name, value in overrides.items() if value is not None})
+        return CleanupPolicy.from_dict(rules)
+
+    def describe(self) -> str:
+        """Human-readable summary for logs"""
+        parts = []
+        if self.max_views is not None:
+            parts.append(f"{self.max_views} view(s) or less")
+        if self.days_not_watched:
+            parts.append(f"not watched in {self.days_not_watched} days")
+        if self.days_since_added:
+            parts.append(f"added over {self.days_since_added} days ago")
+        if self.min_size_gb is not None:
+            parts.append(f"at least {self.min_size_gb:g} GB")
+        if self.max_size_gb is not None:
+            parts.append(f"at most {self.max_size_gb:g} GB")
+        if self.resolutions:
+            parts.append(f"resolution in {', '.join(self.resolutions)}")
+        if self.libraries:
+            parts.append(f"in {', '.join(self.libraries)}")
+        if self.exclude_libraries:
+            parts.append(f"not in {', '.join(self.exclude_libraries)}")
+        if self.exclude_labels:
+            parts.append(f"not labelled {', '.join(self.exclude_labels)}")
+        if self.exclude_collections:
+            parts.append(f"not in collection {', '.join(self.exclude_collections)}")
+        return ', '.join(parts) or 'every movie'
+
+    def compile(self, now: Optional[datetime] = None, history=None) -> 'CompiledPolicy':
+        """
+        Turn the active rules into predicates
+
+        Args:
+            now: Reference time for the day-based rules (default: now)
+            history: WatchHistory for server-wide plays (default: the token owner's only)
+        """
+        now = now or datetime.now()
+        predicates = []
+
+        # Cheapest checks first
+        if self.max_views is not None:
+            max_views = self.max_views
+            if history is None:
+                predicates.append(lambda item: (_raw(item, 'viewCount') or 0) <= max_views)
+            else:
+                predicates.append(lambda item: view_state(item, history)[0] <= max_views)
+
+        if self.days_not_watched:
+            watched_cutoff = now - timedelta(days=self.days_not_watched)
+
+            def not_watched_recently(item):
+                last_viewed = view_state(item, history)[1]
+                return last_viewed is None or last_viewed <= watched_cutoff
+            predicates.append(not_watched_recently)
+
+        if self.days_since_added:
+            added_cutoff = now - timedelta(days=self.days_since_added)
+
+            def added_long_ago(item):
+                added = _raw(item, 'addedAt')
+                return added is not None and added <= added_cutoff
+            predicates.append(added_long_ago)
+
+        # Label and collection exclusions also apply to TV shows and episodes (see tv_cleanup.py)
+        exclusions = []
+        if self.exclude_labels:
+            labels = {label.lower() for label in self.exclude_labels}
+            exclusions.append(lambda item: not (_tags(item, 'labels') & labels))
+
+        if self.exclude_collections:
+            collections = {collection.lower() for collection in self.exclude_collections}
+            exclusions.append(lambda item: not (_tags(item, 'collections') & collections))
+        predicates.extend(exclusions)
+
+        if self.resolutions:
+            resolutions = {_resolution(r) for r in self.resolutions}
+            predicates.append(lambda item: any(
+                _resolution(media.videoResolution) in resolutions
+                for media in (_raw(item, 'media') or []) if getattr(media, 'videoResolution', None)
+            ))
+
+        if self.min_size_gb is not None or self.max_size_gb is not None:
+            low = self.min_size_gb * GB if self.min_size_gb is not None else 0
+            high = self.max_size_gb * GB if self.max_size_gb is not None else float('inf')
+            predicates.append(lambda item: low <= _item_bytes(item) <= high)
+
+        include = {name.lower() for name in self.libraries} if self.libraries else None
+        exclude = {name.lower() for name in self.exclude_libraries or []}
+
+        def section_matches(section, libtype='movie'):
+            title = section.title.lower()
+            return section.type == libtype and (include is None or title in include) and title not in exclude
+
+        return CompiledPolicy(self, predicates, section_matches, exclusions)
+
+
+class CompiledPolicy:
+    """A policy ready to evaluate: sections(library), matches(movie) and excluded(show or episode)"""
+
+    def __init__(self, policy: CleanupPolicy, predicates: List[Callable], section_matches: Callable,
+                 exclusions: List[Callable] = ()):
+        self.policy = policy
+        self.predicates = tuple(predicates)
+        self.section_matches = section_matches
+        self.exclusions = tuple(exclusions)
+
+    def sections(self, library, libtype: str = 'movie') -> List:
+        """Sections of a plexapi Library of this type ('movie', 'show') the policy applies to"""
+        return [section for section in library.sections() if self.section_matches(section, libtype)]
+
+    def matches(self, item) -> bool:
+        for predicate in self.predicates:
+            if not predicate(item):
+                return False
+        return True
+
+    def excluded(self, item) -> bool:
+        """Whether exclude_labels or exclude_collections protect an item"""
+        for exclusion in self.exclusions:
+            if not exclusion(item):
+                return True
+        return False
+
+    def filter(self, items) -> List:
+        return [item for item in items if self.matches(item)]
+
+
+def parse_policy(text: str) -> Dict:
+    """
+    Parse a policy document: JSON, or YAML
+
+    Uses PyYAML when installed; otherwise understands the flat subset policies
+    need (key: value, inline [a, b] lists, "- item" lists, # comments).
+    """
+    stripped = text.strip()
+    if stripped.startswith('{'):
+        try:
+            return json.loads(stripped)
+        except json.JSONDecodeError as e:
+            raise PolicyError(f"Invalid JSON policy: {e}")
+
+    if yaml is not None:
+        try:
+            return yaml.safe_load(text) or {}
+        except yaml.YAMLError as e:
+            raise PolicyError(f"Invalid YAML policy: {e}")
+
+    def scalar(value):
+        value = value.strip().strip('"\'')
+        if value.lower() in ('', 'null', '~'):
+            return None
+        return value
+
+    data = {}
+    current_list = None
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].rstrip()
+        if not line.strip():
+            continue
+        if line.lstrip().startswith('- ') and current_list is not None:
+            current_list.append(scalar(line.lstrip()[2:]))
+            continue
+        key, sep, value = line.partition(':')
+        if not sep or line[0].isspace():
+            raise PolicyError(f"Line {number}: expected 'rule: value', got {line.strip()!r}")
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            data[key.strip()] = [scalar(v) for v in value[1:-1].split(',') if v.strip()]
+            current_list = None
+        elif not value:
+            data[key.strip()] = current_list = []
+        else:
+            data[key.strip()] = scalar(value)
+            current_list = None
+    # "key:" with nothing under it means unset
+    return {key: (None if value == [] else value) for key, value in data.items()}
+
+
+def load_policy(path: str) -> CleanupPolicy:
+    """
+    Read a policy file
+
+    Raises:
+        PolicyError: Unreadable or invalid policy
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    except OSError as e:
+        raise PolicyError(f"Cannot read policy {path}: {e}")
+    return CleanupPolicy.from_dict(parse_policy(text))
+
+
+def default_policy() -> CleanupPolicy:
+    """The CLEANUP_POLICY_FILE policy, or the built-in default (1 view or less, no day limit)"""
+    if CLEANUP_POLICY_FILE:
+        return load_policy(CLEANUP_POLICY_FILE)
+    return CleanupPolicy()
+
+
+def movie_candidate(movie, history=None) -> Dict:
+    """
+    The candidate dictionary every cleanup path returns for a movie
+
+    Args:
+        movie: plexapi Movie (or Episode)
+        history: WatchHistory; view_count and last_viewed then cover every account
+
+    Returns:
+        Dictionary with title, year, view_count, watched_by (accounts that
+        played it, None without history), added_date, last_viewed, file_paths,
+        file_size_mb, versions, rating and plex_object
+    """
+    size_info = media_size_breakdown(movie)
+    added_at = _raw(movie, 'addedAt')
+    view_count, last_viewed_at = view_state(movie, history)
+    stats = history.get(_raw(movie, 'ratingKey')) if history is not None else None
+
+    return {
+        'title': _raw(movie, 'title'),
+        'year': _raw(movie, 'year'),
+        'view_count': view_count,
+        'watched_by': len(stats.users) if stats else (0 if history is not None else None),
+        'added_date': added_at.strftime('%Y-%m-%d') if added_at else 'Unknown',
+        'last_viewed': last_viewed_at.strftime('%Y-%m-%d') if last_viewed_at else 'Never',
+        'file_paths': size_info['file_paths'],
+        'file_size_mb': size_info['total_bytes'] / (1024 * 1024),
+        'versions': size_info['versions'],
+        'rating': _raw(movie, 'rating'),
+        'plex_object': movie
+    }
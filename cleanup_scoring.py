@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Cleanup Scoring
+Ranks cleanup candidates by bytes per unit of "keep value" and picks the
+cheapest set of movies that frees a space target
+
+A movie's value is a weighted mix of features in [0, 1]:
+
+    views    more plays are worth more           views / (views + views_half_value)
+    recency  recently watched is worth more      halves every recency_half_life_days
+    rating   better rated is worth more          rating / 10 (unrated: 0.5)
+    age      recently added is worth more        halves every age_half_life_days
+    size     small files are cheap to keep       1 / (1 + size_gb / size_half_value_gb)
+
+score = size_gb / value, so the best candidates free many GB for little value.
+"""
+
+import math
+from datetime import date
+from typing import Dict, List, Optional
+
+GB = 1024 ** 3
+
+DEFAULT_WEIGHTS = {'views': 1.0, 'recency': 2.0, 'rating': 0.5, 'age': 1.0, 'size': 0.0}
+FEATURES = tuple(DEFAULT_WEIGHTS)
+
+# Every movie keeps a little value, so a 0-value item never divides by zero
+BASE_VALUE = 0.05
+
+SOLVERS = ('auto', 'greedy', 'dp')
+# Largest DP table (items x size units) the solver will build; ~0.2 s in CPython
+DP_MAX_CELLS = 1_000_000
+# Size resolution of the DP: at most this many units between 0 and the target
+DP_MAX_UNITS = 2000
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Parse "views=1,recency=2" into a weights dict (unlisted features keep their default)
+
+    Raises:
+        ValueError: Unknown feature, malformed weight, or a negative or non-finite weight
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    if not spec:
+        return weights
+
+    for pair in spec.split(','):
+        if not pair.strip():
+            continue
+        name, sep, value = pair.partition('=')
+        name = name.strip()
+        if not sep or name not in weights:
+            raise ValueError(f"Invalid weight {pair.strip()!r}, expected one of {', '.join(FEATURES)} as name=value")
+        weight = float(value)
+        # A negative weight would make valuable movies the cheapest to delete; nan and inf break the ranking
+        if not math.isfinite(weight) or weight < 0:
+            raise ValueError(f"Invalid weight {pair.strip()!r}, weights must be finite and not negative")
+        weights[name] = weight
+    return weights
+
+
+def _days_since(value, today: date) -> Optional[int]:
+    """Days since a 'YYYY-MM-DD' string (as in movie dicts), None for 'Never'/'Unknown'"""
+    if not value or value in ('Never', 'Unknown'):
+        return None
+    try:
+        return (today - date.fromisoformat(value[:10])).days
+    except ValueError:
+        return None
+
+
+class CleanupScorer:
+    """Computes keep value and deletion score for movie dicts from get_unwatched_movies"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, views_half_value: float = 2,
+                 recency_half_life_days: float = 90, age_half_life_days: float = 180,
+                 size_half_value_gb: float = 20, today: Optional[date] = None):
+        """
+        Args:
+            weights: Feature weights (missing features use DEFAULT_WEIGHTS)
+            views_half_value: View count at which the views feature reaches 0.5
+            recency_half_life_days: Days after a play at which recency halves
+            age_half_life_days: Days after being added at which age halves
+            size_half_value_gb: Size at which the size feature reaches 0.5
+            today: Reference date (default: today)
+        """
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(FEATURES)
+            if unknown:
+                raise ValueError(f"Unknown weight(s): {', '.join(sorted(unknown))}")
+            self.weights.update(weights)
+        self.views_half_value = views_half_value
+        self.recency_half_life_days = recency_half_life_days
+        self.age_half_life_days = age_half_life_days
+        self.size_half_value_gb = size_half_value_gb
+        self.today = today or date.today()
+
+    def features(self, movie: Dict) -> Dict[str, float]:
+        """Feature values in [0, 1] for one movie"""
+        views = movie.get('view_count') or 0
+        watched_days = _days_since(movie.get('last_viewed'), self.today)
+        added_days = _days_since(movie.get('added_date'), self.today)
+        rating = movie.get('rating')
+        size_gb = (movie.get('file_size_mb') or 0) / 1024
+
+        return {
+            'views': views / (views + self.views_half_value) if views > 0 else 0.0,
+            'recency': 0.5 ** (max(watched_days, 0) / self.recency_half_life_days) if watched_days is not None else 0.0,
+            'rating': min(max(rating / 10, 0.0), 1.0) if rating is not None else 0.5,
+            'age': 0.5 ** (max(added_days, 0) / self.age_half_life_days) if added_days is not None else 0.0,
+            'size': 1 / (1 + size_gb / self.size_half_value_gb),
+        }
+
+    def value(self, movie: Dict) -> float:
+        """Keep value of a movie (> 0)"""
+        features = self.features(movie)
+        return BASE_VALUE + sum(self.weights[name] * features[name] for name in FEATURES)
+
+    def score(self, movies: List[Dict]) -> List[Dict]:
+        """
+        Rank movies for deletion
+
+        Adds 'value' and 'score' (GB freed per unit of value) to each movie
+        dict, in place.
+
+        Returns:
+            The movies, best deletion candidates first
+        """
+        for movie in movies:
+            movie['value'] = value = self.value(movie)
+            movie['score'] = (movie.get('file_size_mb') or 0) / 1024 / value
+
+        return sorted(movies, key=lambda m: m['score'], reverse=True)
+
+
+def _movie_bytes(movie: Dict) -> int:
+    return int((movie.get('file_size_mb') or 0) * 1024 * 1024)
+
+
+def _greedy(ranked: List[Dict], target_bytes: int) -> List[Dict]:
+    """Take the best-scored movies until the target is met, then drop any that aren't needed"""
+    selected = []
+    freed = 0
+    for movie in ranked:
+        if freed >= target_bytes:
+            break
+        selected.append(movie)
+        freed += _movie_bytes(movie)
+
+    if freed < target_bytes:
+        return selected
+
+    # The last picks can overshoot; shed the most valuable items the target doesn't need
+    for movie in sorted(selected, key=lambda m: m['value'], reverse=True):
+        if freed - _movie_bytes(movie) >= target_bytes:
+            selected.remove(movie)
+            freed -= _movie_bytes(movie)
+
+    # A single big, low-value movie can beat a greedy pile
+    total_value = sum(m['value'] for m in selected)
+    single = min((m for m in ranked if _movie_bytes(m) >= target_bytes), key=lambda m: m['value'], default=None)
+    if single is not None and single['value'] < total_value:
+        return [single]
+
+    return selected
+
+
+def _dp(pool: List[Dict], target_bytes: int, unit: int) -> Optional[List[Dict]]:
+    """
+    Minimum total value that frees at least target_bytes, exact at `unit` resolution
+
+    Item sizes are rounded down and the target up, so a DP solution always
+    meets the real target. Returns None if the pool can't reach it.
+    """
+    units = -(-target_bytes // unit)
+    inf = math.inf
+    # best[u] = least value that frees at least u units
+    best = [0.0] + [inf] * units
+    taken = []
+
+    for movie in pool:
+        weight = _movie_bytes(movie) // unit
+        value = movie['value']
+        if weight == 0:
+            taken.append(None)
+            continue
+
+        head = min(weight, units + 1)
+        candidates = [value] * head + [b + value for b in best[:units + 1 - head]]
+        take = [c < b for c, b in zip(candidates, best)]
+        best = [c if t else b for c, b, t in zip(candidates, best, take)]
+        taken.append((weight, take))
+
+    if best[units] == inf:
+        return None
+
+    selected = []
+    u = units
+    for movie, choice in zip(reversed(pool), reversed(taken)):
+        if u <= 0:
+            break
+        if choice is not None and choice[1][u]:
+            selected.append(movie)
+            u = max(0, u - choice[0])
+    return selected
+
+
+def select_for_target(movies: List[Dict], target_bytes: int, scorer: Optional[CleanupScorer] = None,
+                      solver: str = 'auto') -> Dict:
+    """
+    Pick the lowest-value set of movies that frees at least target_bytes
+
+    'greedy' takes movies in score order (then prunes overshoot); 'dp' solves
+    the covering knapsack exactly over the best-scored movies, at a size
+    resolution of target/DP_MAX_UNITS; 'auto' runs both when the DP table is
+    small enough and keeps the cheaper answer.
+
+    Args:
+        movies: Movie dicts from get_unwatched_movies
+        target_bytes: Space to free
+        scorer: CleanupScorer (default weights if None)
+        solver: 'auto', 'greedy' or 'dp'
+
+    Returns:
+        Dictionary with selected (best candidates first), bytes, value,
+        target_bytes, met and solver
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {', '.join(SOLVERS)}")
+
+    ranked = (scorer or CleanupScorer()).score(movies)
+    selected = _greedy(ranked, target_bytes) if target_bytes > 0 else []
+    used = 'greedy'
+
+    if solver != 'greedy' and target_bytes > 0:
+        unit = max(1, -(-target_bytes // DP_MAX_UNITS))
+        units = -(-target_bytes // unit)
+        # Items beyond a few times the greedy answer in score order can't be worth it in practice
+        pool_size = min(len(ranked), max(4 * len(selected), 200), DP_MAX_CELLS // (units + 1))
+        if solver == 'dp' or pool_size >= len(selected):
+            exact = _dp(ranked[:pool_size], target_bytes, unit)
+            greedy_met = sum(_movie_bytes(m) for m in selected) >= target_bytes
+            if exact is not None and (not greedy_met or
+                                      sum(m['value'] for m in exact) < sum(m['value'] for m in selected)):
+                selected = exact
+                used = 'dp'
+
+    selected.sort(key=lambda m: m['score'], reverse=True)
+    freed = sum(_movie_bytes(m) for m in selected)
+    return {
+        'selected': selected,
+        'bytes': freed,
+        'value': sum(m['value'] for m in selected),
+        'target_bytes': target_bytes,
+        'met': freed >= target_bytes,
+        'solver': used,
+    }
@@ -27,3 +27,21 @@ TELEGRAM_BOT_TOKEN=""
 TELEGRAM_CHAT_ID=""
 # Set to "yes" to enable Telegram notifications
 ENABLE_TELEGRAM="no"
+
+# Prometheus metrics for the Telegram bot (optional)
+# Set a port to serve /metrics from the bot process, e.g. 9108
+METRICS_PORT=""
+
+# Cleanup policy (optional)
+# YAML/JSON rules shared by the CLI, bot, API and web dashboard; see cleanup_policy.example.yaml
+CLEANUP_POLICY_FILE=""
+
+# TV cleanup (--tv, /tv): fully watched seasons last played over X days ago,
+# partly watched shows not played in X days, and (if set) watched episodes
+TV_SEASON_DAYS=30
+TV_ABANDONED_DAYS=180
+TV_EPISODE_DAYS=""
+
+# Count plays by every account on the server (not just the token owner's) when
+# picking candidates. Set to 0 to use the token owner's plays only
+WATCH_HISTORY=1
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Deletion Journal
+Append-only JSONL record of deletion runs, so an interrupted run can be resumed
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Journal location, next to the module unless overridden
+DEFAULT_JOURNAL_FILE = os.getenv(
+    'DELETION_JOURNAL_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deletion_journal.jsonl')
+)
+
+# Outcomes are fsync'ed in batches: every FSYNC_EVERY records or FSYNC_INTERVAL seconds
+FSYNC_EVERY = 20
+FSYNC_INTERVAL = 1.0
+
+
+class DeletionJournal:
+    """
+    Append-only deletion journal
+
+    Each run writes one 'intent' record per item (rating key, title, expected
+    size) before anything is deleted, then a 'deleted' or 'failed' record per
+    item as it is processed. Every record is written through to the OS right
+    away, so a crash of the process loses nothing; fsync is batched, so at
+    most FSYNC_EVERY outcomes can be lost to a power failure, and those items
+    are simply checked again on resume.
+    """
+
+    def __init__(self, journal_file: str = DEFAULT_JOURNAL_FILE, fsync_every: int = FSYNC_EVERY,
+                 fsync_interval: float = FSYNC_INTERVAL):
+        """
+        Initialize deletion journal
+
+        Args:
+            journal_file: Path to the JSONL journal
+            fsync_every: Outcome records per fsync
+            fsync_interval: Maximum seconds between fsyncs while records are pending
+        """
+        self.journal_file = journal_file
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _append(self, record: Dict):
+        """Write one record through to the OS"""
+        if self._file is None:
+            self._file = open(self.journal_file, 'a', encoding='utf-8')
+        record['ts'] = datetime.now().isoformat()
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+
+    def sync(self):
+        """fsync everything written so far"""
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _maybe_sync(self):
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def close(self):
+        """Sync and close the journal file"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def start_run(self, movies: List[Dict], source: str = 'cli') -> str:
+        """
+        Record intent to delete a list of movies
+
+        Args:
+            movies: Movie dicts as returned by PlexCleanup.get_unwatched_movies
+            source: Where the run was started from (cli, telegram)
+
+        Returns:
+            Run ID to pass to record_deleted/record_failed
+        """
+        run_id = uuid.uuid4().hex[:12]
+        for movie in movies:
+            self._append({
+                'event': 'intent',
+                'run': run_id,
+                'source': source,
+                'rating_key': str(movie['plex_object'].ratingKey),
+                'title': movie['title'],
+                'year': movie.get('year'),
+                'size_bytes': int(movie.get('file_size_mb', 0) * 1024 * 1024),
+            })
+        # Intents are durable before the first delete
+        self.sync()
+        return run_id
+
+    def record_deleted(self, run_id: str, rating_key, bytes_freed: int, already_gone: bool = False):
+        """Record a completed deletion"""
+        record = {'event': 'deleted', 'run': run_id, 'rating_key': str(rating_key), 'bytes_freed': int(bytes_freed)}
+        if already_gone:
+            record['already_gone'] = True
+        self._append(record)
+        self._maybe_sync()
+
+    def record_failed(self, run_id: str, rating_key, error: str):
+        """Record a failed deletion"""
+        self._append({'event': 'failed', 'run': run_id, 'rating_key': str(rating_key), 'error': str(error)})
+        self._maybe_sync()
+
+    def read(self) -> List[Dict]:
+        """
+        Read every record in the journal
+
+        A partially written last line (crash mid-write) is ignored.
+        """
+        if self._file is not None:
+            self._file.flush()
+        if not os.path.exists(self.journal_file):
+            return []
+
+        records = []
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"⚠️  Skipping unreadable journal line {line_no} in {self.journal_file}")
+        return records
+
+    def last_run_id(self, source: str = None) -> Optional[str]:
+        """ID of the most recently started run (optionally only runs from one source)"""
+        run_id = None
+        for record in self.read():
+            if record['event'] == 'intent' and (source is None or record.get('source') == source):
+                run_id = record['run']
+        return run_id
+
+    def run_state(self, run_id: str) -> Dict[str, Dict]:
+        """
+        Latest state of every item in a run
+
+        Returns:
+            Dict of rating_key -> intent record plus 'status' (pending, deleted,
+            failed), 'bytes_freed' and 'error'
+        """
+        items = {}
+        for record in self.read():
+            if record.get('run') != run_id:
+                continue
+            key = record['rating_key']
+            if record['event'] == 'intent':
+                items[key] = dict(record, status='pending', bytes_freed=0, error=None)
+            elif key in items:
+                items[key]['status'] = record['event']
+                items[key]['bytes_freed'] = record.get('bytes_freed', 0)
+                items[key]['error'] = record.get('error')
+        return items
+
+    def pending(self, run_id: str) -> List[Dict]:
+        """Items of a run that still need deleting (never finished, or failed)"""
+        return [item for item in self.run_state(run_id).values() if item['status'] != 'deleted']
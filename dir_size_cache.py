@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Directory Size Cache
+Persistent per-folder size cache that only re-lists directories whose mtime changed
+"""
+
+import os
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Cache file location, next to the module unless overridden
+DEFAULT_CACHE_FILE = os.getenv(
+    'DIR_SIZE_CACHE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dir_size_cache.db')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path        TEXT PRIMARY KEY,
+    parent      TEXT,
+    mtime_ns    INTEGER NOT NULL,
+    ctime_ns    INTEGER NOT NULL,
+    own_size    INTEGER NOT NULL,
+    own_files   INTEGER NOT NULL,
+    total_size  INTEGER NOT NULL,
+    total_files INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_directories_parent ON directories(parent);
+"""
+
+
+class DirectorySizeCache:
+    """
+    Incremental directory size cache
+
+    Each directory row stores its own mtime/ctime, the size and count of the
+    files directly inside it, and the rolled-up totals for its whole subtree.
+    A directory's mtime only changes when entries are added, removed or renamed
+    in it, so unchanged directories are not re-listed; their subdirectories are
+    still stat'ed so changes deeper in the tree are picked up and rolled up.
+
+    Files that grow in place (e.g. an in-progress download) do not touch the
+    directory mtime; use scan(root, full=True) to force a complete re-walk.
+    """
+
+    def __init__(self, cache_file: str = DEFAULT_CACHE_FILE):
+        """
+        Initialize directory size cache
+
+        Args:
+            cache_file: Path to the SQLite cache file (':memory:' for a throwaway cache)
+        """
+        self.cache_file = cache_file
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.executescript(SCHEMA)
+        self.last_scan = {'listed': 0, 'reused': 0, 'removed': 0}
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def scan(self, root: str, full: bool = False, quiet: bool = False) -> Dict:
+        """
+        Bring the cache up to date for a directory tree
+
+        Args:
+            root: Directory to scan
+            full: If True, re-list every directory regardless of mtime
+            quiet: If True, log the scan summary at debug level (for many small subtree scans)
+
+        Returns:
+            Dictionary with path, size_bytes and file_count for root
+        """
+        root = os.path.abspath(root)
+        self.last_scan = {'listed': 0, 'reused': 0, 'removed': 0}
+
+        with self.conn:
+            total_size, total_files = self._scan_dir(root, os.path.dirname(root), full)
+
+        # A reused directory is a cache hit, a re-listed one a miss
+        CACHE_REQUESTS.inc(self.last_scan['reused'], cache='dir_size', result='hit')
+        CACHE_REQUESTS.inc(self.last_scan['listed'], cache='dir_size', result='miss')
+
+        (logger.debug if quiet else logger.info)(
+            f"Directory cache: {root} - listed {self.last_scan['listed']}, "
+            f"reused {self.last_scan['reused']}, removed {self.last_scan['removed']} directories"
+        )
+
+        return {'path': root, 'size_bytes': total_size, 'file_count': total_files}
+
+    def _scan_dir(self, path: str, parent: str, full: bool) -> Tuple[int, int]:
+        """Refresh one directory and its subtree, returning (total_size, total_files)"""
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            logger.warning(f"Cannot stat {path}: {e}")
+            self._forget(path)
+            return 0, 0
+
+        row = self.conn.execute(
+            "SELECT mtime_ns, ctime_ns, own_size, own_files FROM directories WHERE path = ?",
+            (path,)
+        ).fetchone()
+        cached_subdirs = [r[0] for r in self.conn.execute(
+            "SELECT path FROM directories WHERE parent = ?", (path,)
+        )]
+
+        if not full and row and row[0] == st.st_mtime_ns and row[1] == st.st_ctime_ns:
+            # Directory entries unchanged - reuse its own file totals and child list
+            own_size, own_files = row[2], row[3]
+            subdirs = cached_subdirs
+            self.last_scan['reused'] += 1
+        else:
+            own_size, own_files, subdirs = self._list_dir(path)
+            self.last_scan['listed'] += 1
+
+            # Drop cached subtrees that no longer exist
+            for stale in set(cached_subdirs) - set(subdirs):
+                self._forget(stale)
+
+        total_size = own_size
+        total_files = own_files
+        for subdir in subdirs:
+            sub_size, sub_files = self._scan_dir(subdir, path, full)
+            total_size += sub_size
+            total_files += sub_files
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO directories "
+            "(path, parent, mtime_ns, ctime_ns, own_size, own_files, total_size, total_files) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, parent, st.st_mtime_ns, st.st_ctime_ns, own_size, own_files, total_size, total_files)
+        )
+
+        return total_size, total_files
+
+    def _list_dir(self, path: str) -> Tuple[int, int, List[str]]:
+        """List a directory, returning (own_size, own_files, subdirectories)"""
+        own_size = 0
+        own_files = 0
+        subdirs = []
+
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            own_size += entry.stat(follow_symlinks=False).st_size
+                            own_files += 1
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot list {path}: {e}")
+
+        return own_size, own_files, subdirs
+
+    def _forget(self, path: str):
+        """Remove a directory and everything below it from the cache"""
+        prefix = path.rstrip(os.sep) + os.sep
+        cursor = self.conn.execute(
+            "DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?",
+            (path, len(prefix), prefix)
+        )
+        self.last_scan['removed'] += cursor.rowcount
+
+    def get(self, path: str) -> Optional[Dict]:
+        """
+        Get cached totals for a directory
+
+        Args:
+            path: Directory path
+
+        Returns:
+            Dictionary with path, size_bytes and file_count, or None if not cached
+        """
+        row = self.conn.execute(
+            "SELECT path, total_size, total_files FROM directories WHERE path = ?",
+            (os.path.abspath(path),)
+        ).fetchone()
+        if not row:
+            return None
+        return {'path': row[0], 'size_bytes': row[1], 'file_count': row[2]}
+
+    def children(self, path: str) -> List[Dict]:
+        """
+        Get cached totals for the direct subdirectories of a directory, largest first
+
+        Args:
+            path: Directory path
+
+        Returns:
+            List of dictionaries with path, size_bytes and file_count
+        """
+        rows = self.conn.execute(
+            "SELECT path, total_size, total_files FROM directories WHERE parent = ? ORDER BY total_size DESC",
+            (os.path.abspath(path),)
+        )
+        return [{'path': r[0], 'size_bytes': r[1], 'file_count': r[2]} for r in rows]
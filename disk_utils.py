@@ -7,8 +7,12 @@ Get disk usage information from local or remote systems
 import subprocess
 import shutil
 import logging
+import time
 from typing import Dict, Optional
 
+from prometheus_metrics import DISK_PROBE_SECONDS, record_disk_usage
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,8 +41,9 @@ class DiskUsage:
             Dictionary with total, used, free, and percent
         """
         try:
-            usage = shutil.disk_usage(path)
-            return {
+            with span('disk.local', path=path):
+                usage = shutil.disk_usage(path)
+            result = {
                 'total_gb': usage.total / (1024**3),
                 'used_gb': usage.used / (1024**3),
                 'free_gb': usage.free / (1024**3),
@@ -46,6 +51,8 @@ class DiskUsage:
                 'path': path,
                 'source': 'local'
             }
+            record_disk_usage(result)
+            return result
         except Exception as e:
             logger.error(f"Error getting local disk usage: {e}")
             return None
@@ -64,12 +71,23 @@ class DiskUsage:
             logger.warning("No SSH host configured")
             return None
 
+        start = time.perf_counter()
+        with span('disk.remote', host=self.ssh_host, path=remote_path) as probe:
+            usage = self._probe_remote_disk_usage(remote_path)
+            probe.set('ok', bool(usage))
+        DISK_PROBE_SECONDS.observe(time.perf_counter() - start, source='ssh', result='ok' if usage else 'error')
+        record_disk_usage(usage)
+        return usage
+
+    def _probe_remote_disk_usage(self, remote_path: str) -> Optional[Dict]:
+        """Run df over SSH (key-based auth check first); None on any failure"""
         ssh_target = f"{self.ssh_user}@{self.ssh_host}" if self.ssh_user else self.ssh_host
 
         try:
             # Check if SSH is available and key-based auth is set up
             test_cmd = ['ssh', '-o', 'BatchMode=yes', '-o', 'ConnectTimeout=5', ssh_target, 'echo ok']
-            result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
+            with span('ssh.auth_check'):
+                result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
 
             if result.returncode != 0:
                 logger.info("SSH key-based authentication not set up")
@@ -77,7 +95,8 @@ class DiskUsage:
 
             # Get disk usage via df command
             cmd = ['ssh', ssh_target, f'df -B1 {remote_path}']
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            with span('ssh.df'):
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
 
             if result.returncode == 0:
                 # Parse df output
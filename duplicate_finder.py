@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Duplicate Media Finder
+Finds redundant copies of movies and episodes across editions, versions and libraries
+"""
+
+import os
+import mmap
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed from each end of a file for the partial content hash
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Leaf item type scanned for each library section type
+DUPLICATE_LIBTYPES = {
+    'movie': 'movie',
+    'show': 'episode',
+}
+
+RESOLUTION_RANK = {'4k': 4, '1080': 3, '720': 2, '576': 1, '480': 1, 'sd': 0}
+
+
+def partial_hash(path: str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """
+    Hash the head and tail blocks of a file through a memory map
+
+    Args:
+        path: File path
+        block_size: Bytes read from each end
+
+    Returns:
+        Hex digest of size + head block + tail block
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        digest = hashlib.sha256(str(size).encode())
+        if size == 0:
+            return digest.hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            digest.update(mapped[:block_size])
+            if size > block_size:
+                digest.update(mapped[max(block_size, size - block_size):])
+
+    return digest.hexdigest()
+
+
+class DuplicateFinder:
+    """Group Plex media by GUID and by file content to find redundant versions"""
+
+    def __init__(self, plex_server, plex_path_prefix: Optional[str] = None, local_path_prefix: Optional[str] = None):
+        """
+        Initialize duplicate finder
+
+        Args:
+            plex_server: PlexServer instance
+            plex_path_prefix: Path prefix as Plex reports it (optional, for path mapping)
+            local_path_prefix: Local path the Plex prefix is mounted at (optional)
+        """
+        self.plex = plex_server
+        self.plex_path_prefix = plex_path_prefix
+        self.local_path_prefix = local_path_prefix
+
+    def map_path(self, plex_path: str) -> str:
+        """Translate a Plex part path to the local filesystem"""
+        if self.plex_path_prefix and self.local_path_prefix and plex_path.startswith(self.plex_path_prefix):
+            plex_path = self.local_path_prefix + plex_path[len(self.plex_path_prefix):]
+        return os.path.normpath(plex_path)
+
+    def collect_versions(self) -> List[Dict]:
+        """
+        Collect one entry per media version of every movie and episode
+
+        Returns:
+            List of version dictionaries
+        """
+        versions = []
+
+        for section in self.plex.library.sections():
+            libtype = DUPLICATE_LIBTYPES.get(section.type)
+            if not libtype:
+                continue
+
+            logger.info(f"Collecting versions: {section.title}")
+            try:
+                for item in section.search(libtype=libtype):
+                    for media in item.media:
+                        parts = [p for p in media.parts if getattr(p, 'file', None)]
+                        versions.append({
+                            'title': self._display_title(item),
+                            'year': getattr(item, 'year', None),
+                            'guid': getattr(item, 'guid', None),
+                            'rating_key': item.ratingKey,
+                            'library': section.title,
+                            'media_id': getattr(media, 'id', None),
+                            'resolution': getattr(media, 'videoResolution', None),
+                            'bitrate': getattr(media, 'bitrate', None),
+                            'files': [p.file for p in parts],
+                            'part_sizes': [p.size or 0 for p in parts],
+                            'size_bytes': sum(p.size or 0 for p in parts),
+                            'plex_object': item,
+                            'plex_media': media
+                        })
+            except Exception as e:
+                logger.error(f"Error collecting versions from {section.title}: {e}")
+
+        logger.info(f"Collected {len(versions)} media versions")
+        return versions
+
+    @staticmethod
+    def _display_title(item) -> str:
+        """Title including show and episode numbering for episodes"""
+        if getattr(item, 'type', None) == 'episode':
+            return f"{item.grandparentTitle} - S{item.parentIndex or 0:02d}E{item.index or 0:02d} - {item.title}"
+        return item.title
+
+    @staticmethod
+    def _version_rank(version: Dict):
+        """Sort key for the version worth keeping (best first when reversed)"""
+        resolution = str(version['resolution'] or '').lower()
+        return (RESOLUTION_RANK.get(resolution, 0), version['bitrate'] or 0, version['size_bytes'])
+
+    def _build_group(self, key: str, match: str, versions: List[Dict]) -> Dict:
+        """Pick the version to keep and report the rest as redundant"""
+        ranked = sorted(versions, key=self._version_rank, reverse=True)
+        redundant = ranked[1:]
+        return {
+            'key': key,
+            'match': match,
+            'title': ranked[0]['title'],
+            'year': ranked[0]['year'],
+            'keep': ranked[0],
+            'redundant': redundant,
+            'reclaimable_bytes': sum(v['size_bytes'] for v in redundant)
+        }
+
+    def collapse_shared_files(self, versions: List[Dict]) -> List[Dict]:
+        """
+        Drop versions whose files are already listed by another version
+
+        Two libraries pointing at the same folder, or the same file added
+        twice, list one file as several versions. They are one copy on disk,
+        so only the first is kept; deleting the other would delete that file.
+
+        Args:
+            versions: Version list from collect_versions
+
+        Returns:
+            Versions with no mapped file path in common
+        """
+        seen = set()
+        unique = []
+        for version in versions:
+            paths = {self.map_path(f) for f in version['files']}
+            if paths & seen:
+                logger.debug(f"{version['title']} in {version['library']} shares its files with another version")
+                continue
+            seen |= paths
+            unique.append(version)
+        return unique
+
+    def group_by_guid(self, versions: List[Dict]) -> List[Dict]:
+        """
+        Group versions sharing a Plex GUID (multiple versions of one item, or the same title in several libraries)
+
+        Versions that list the same file (see collapse_shared_files) count once.
+
+        Args:
+            versions: Version list from collect_versions
+
+        Returns:
+            List of duplicate groups
+        """
+        by_guid = defaultdict(list)
+        for version in self.collapse_shared_files(versions):
+            if version['guid'] and version['size_bytes']:
+                by_guid[version['guid']].append(version)
+
+        return [self._build_group(guid, 'guid', group) for guid, group in by_guid.items() if len(group) > 1]
+
+    def group_by_content(self, versions: List[Dict]) -> List[Dict]:
+        """
+        Group identical files by size, then by partial content hash
+
+        Only files whose size collides with another file are hashed, and only
+        the head and tail blocks are read, so the pass stays cheap on large
+        libraries. Files not reachable on the local filesystem are skipped, and
+        a file listed by several versions is one file, not a duplicate.
+
+        Args:
+            versions: Version list from collect_versions
+
+        Returns:
+            List of duplicate groups (one entry per duplicated file)
+        """
+        by_size = defaultdict(list)
+        for version in self.collapse_shared_files(versions):
+            for file_path, size in zip(version['files'], version['part_sizes']):
+                if size:
+                    by_size[size].append((file_path, version))
+
+        groups = []
+        hashed = 0
+        for size, candidates in by_size.items():
+            if len(candidates) < 2:
+                continue
+
+            by_hash = defaultdict(list)
+            for file_path, version in candidates:
+                local_path = self.map_path(file_path)
+                try:
+                    by_hash[partial_hash(local_path)].append(dict(version, files=[file_path], size_bytes=size))
+                    hashed += 1
+                except OSError as e:
+                    logger.debug(f"Cannot hash {local_path}: {e}")
+
+            for digest, group in by_hash.items():
+                if len(group) > 1:
+                    groups.append(self._build_group(digest, 'content', group))
+
+        logger.info(f"Hashed {hashed} files with colliding sizes")
+        return groups
+
+    def find_duplicates(self, hash_content: bool = True) -> Dict:
+        """
+        Find redundant versions by GUID and, optionally, by file content
+
+        Args:
+            hash_content: Also compare files by size + partial content hash
+
+        Returns:
+            Dictionary with duplicate groups (most reclaimable first) and totals
+        """
+        versions = self.collect_versions()
+        groups = self.group_by_guid(versions)
+
+        if hash_content:
+            # Versions already marked redundant by GUID are not counted twice
+            redundant_media = {id(v['plex_media']) for g in groups for v in g['redundant']}
+            for group in self.group_by_content(versions):
+                group['redundant'] = [v for v in group['redundant'] if id(v['plex_media']) not in redundant_media]
+                if group['redundant']:
+                    group['reclaimable_bytes'] = sum(v['size_bytes'] for v in group['redundant'])
+                    groups.append(group)
+
+        groups.sort(key=lambda g: g['reclaimable_bytes'], reverse=True)
+        reclaimable = sum(g['reclaimable_bytes'] for g in groups)
+
+        logger.info(f"Found {len(groups)} duplicate groups, {reclaimable / (1024**3):.2f} GB reclaimable")
+
+        return {
+            'groups': groups,
+            'total_reclaimable_gb': reclaimable / (1024**3),
+            'versions_scanned': len(versions)
+        }
+
+    def format_cli_report(self, result: Dict, limit: int = 50) -> str:
+        """
+        Format duplicate report for CLI display
+
+        Args:
+            result: Result dictionary from find_duplicates
+            limit: Maximum number of groups to list
+
+        Returns:
+            Formatted string for CLI
+        """
+        lines = []
+        lines.append("=" * 100)
+        lines.append("DUPLICATE MEDIA")
+        lines.append("=" * 100)
+        lines.append(f"Versions scanned:            {result['versions_scanned']}")
+        lines.append(f"Duplicate groups:            {len(result['groups'])}")
+        lines.append(f"Reclaimable space:           {result['total_reclaimable_gb']:>10.2f} GB")
+        lines.append("-" * 100)
+
+        for group in result['groups'][:limit]:
+            keep = group['keep']
+            lines.append(f"{group['title']} ({group['year'] or 'N/A'}) [{group['match']}] - "
+                         f"{group['reclaimable_bytes'] / (1024**3):.2f} GB reclaimable")
+            lines.append(f"   keep:   {keep['resolution'] or '?':<6} {keep['size_bytes'] / (1024**3):>8.2f} GB  "
+                         f"{keep['library']}: {', '.join(keep['files'])}")
+            for version in group['redundant']:
+                lines.append(f"   remove: {version['resolution'] or '?':<6} {version['size_bytes'] / (1024**3):>8.2f} GB  "
+                             f"{version['library']}: {', '.join(version['files'])}")
+
+        if len(result['groups']) > limit:
+            lines.append(f"... and {len(result['groups']) - limit} more groups")
+
+        lines.append("=" * 100)
+        return "\n".join(lines)
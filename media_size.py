@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Media Size Accounting
+Sums every part of every media version of a Plex item
+"""
+
+from typing import Dict, List
+
+
+def _part_size(part) -> int:
+    """Size of a media part in bytes (0 when Plex doesn't report one)"""
+    return getattr(part, 'size', None) or 0
+
+
+def media_total_bytes(item) -> int:
+    """
+    Total size of an item across all versions and parts
+
+    Args:
+        item: plexapi Movie/Episode/Track (anything with .media[].parts[])
+
+    Returns:
+        Size in bytes
+    """
+    return sum(_part_size(part) for media in (getattr(item, 'media', None) or []) for part in media.parts)
+
+
+def media_file_paths(item) -> List[str]:
+    """
+    File paths of every part of every version of an item
+
+    Args:
+        item: plexapi Movie/Episode/Track
+
+    Returns:
+        List of file paths
+    """
+    return [part.file for media in (getattr(item, 'media', None) or []) for part in media.parts
+            if getattr(part, 'file', None)]
+
+
+def media_size_breakdown(item) -> Dict:
+    """
+    Size of an item with a per-version breakdown
+
+    Multi-part files (CD1/CD2 splits) are summed within their version, and
+    every version (e.g. 4K plus 1080p) counts towards the total.
+
+    Args:
+        item: plexapi Movie/Episode/Track
+
+    Returns:
+        Dictionary with total_bytes, file_paths and versions (media_id,
+        resolution, container, size_bytes, parts)
+    """
+    versions = []
+    file_paths = []
+
+    for media in getattr(item, 'media', None) or []:
+        parts = [{'file': getattr(part, 'file', None), 'size_bytes': _part_size(part)} for part in media.parts]
+        file_paths.extend(p['file'] for p in parts if p['file'])
+        versions.append({
+            'media_id': getattr(media, 'id', None),
+            'resolution': getattr(media, 'videoResolution', None),
+            'container': getattr(media, 'container', None),
+            'size_bytes': sum(p['size_bytes'] for p in parts),
+            'parts': parts
+        })
+
+    return {
+        'total_bytes': sum(v['size_bytes'] for v in versions),
+        'file_paths': file_paths,
+        'versions': versions
+    }
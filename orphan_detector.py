@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Orphaned File Detector
+Finds files and folders in the download roots that no Plex media part references
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Leaf item type that carries media parts for each library section type
+LEAF_LIBTYPES = {
+    'movie': 'movie',
+    'show': 'episode',
+    'artist': 'track',
+}
+
+
+class OrphanDetector:
+    """Reconcile on-disk files against the media parts known to Plex"""
+
+    def __init__(self, plex_server, plex_path_prefix: Optional[str] = None, local_path_prefix: Optional[str] = None,
+                 dir_cache=None):
+        """
+        Initialize orphan detector
+
+        Args:
+            plex_server: PlexServer instance
+            plex_path_prefix: Path prefix as Plex reports it (optional, for path mapping)
+            local_path_prefix: Local path the Plex prefix is mounted at (optional)
+            dir_cache: DirectorySizeCache instance used to size orphaned folders (optional)
+        """
+        self.plex = plex_server
+        self.plex_path_prefix = plex_path_prefix
+        self.local_path_prefix = local_path_prefix
+        self.dir_cache = dir_cache
+        self.part_paths: Set[str] = set()
+        self.referenced_dirs: Set[str] = set()
+
+    def map_path(self, plex_path: str) -> str:
+        """
+        Translate a Plex part path to the local filesystem
+
+        Args:
+            plex_path: File path as reported by Plex
+
+        Returns:
+            Normalized local path
+        """
+        if self.plex_path_prefix and self.local_path_prefix and plex_path.startswith(self.plex_path_prefix):
+            plex_path = self.local_path_prefix + plex_path[len(self.plex_path_prefix):]
+        return os.path.normpath(plex_path)
+
+    def load_plex_parts(self) -> int:
+        """
+        Build the hash set of every part file known to Plex
+
+        Uses one bulk leaf-level search per library (movies, episodes, tracks)
+        instead of walking shows/albums item by item.
+
+        Returns:
+            Number of part paths collected
+        """
+        self.part_paths = set()
+        self.referenced_dirs = set()
+
+        for section in self.plex.library.sections():
+            libtype = LEAF_LIBTYPES.get(section.type)
+            if not libtype:
+                continue
+
+            logger.info(f"Collecting media parts: {section.title}")
+            try:
+                for item in section.search(libtype=libtype):
+                    for media in item.media:
+                        for part in media.parts:
+                            if getattr(part, 'file', None):
+                                self._add_part(self.map_path(part.file))
+            except Exception as e:
+                logger.error(f"Error collecting parts from {section.title}: {e}")
+
+        logger.info(f"Collected {len(self.part_paths)} Plex media parts")
+        return len(self.part_paths)
+
+    def _add_part(self, path: str):
+        """Record a part path and all of its ancestor directories"""
+        self.part_paths.add(path)
+
+        parent = os.path.dirname(path)
+        while parent and parent not in self.referenced_dirs:
+            self.referenced_dirs.add(parent)
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                break
+            parent = next_parent
+
+    def find_orphans(self, roots: List[str]) -> Dict:
+        """
+        Stream the download roots and report everything Plex does not reference
+
+        Folders that contain no referenced part at any depth are reported as a
+        single entry and not descended into; their size comes from the
+        directory size cache when one is available. Either way every directory
+        is listed at most once: the walk covers the referenced folders and the
+        sizing covers the orphaned ones.
+
+        Args:
+            roots: Local download folders to check
+
+        Returns:
+            Dictionary with orphans (largest first), totals and matched part count
+        """
+        if not self.part_paths:
+            self.load_plex_parts()
+
+        orphans = []
+        matched_parts = 0
+
+        for root in roots:
+            root = os.path.normpath(os.path.abspath(root))
+            stack = [root]
+            while stack:
+                directory = stack.pop()
+                try:
+                    entries = os.scandir(directory)
+                except OSError as e:
+                    logger.warning(f"Cannot list {directory}: {e}")
+                    continue
+
+                with entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.path in self.referenced_dirs:
+                                    stack.append(entry.path)
+                                else:
+                                    size, count = self._folder_size(entry.path)
+                                    orphans.append({
+                                        'path': entry.path,
+                                        'type': 'folder',
+                                        'size_bytes': size,
+                                        'file_count': count
+                                    })
+                            elif entry.is_file(follow_symlinks=False):
+                                if entry.path in self.part_paths:
+                                    matched_parts += 1
+                                else:
+                                    orphans.append({
+                                        'path': entry.path,
+                                        'type': 'file',
+                                        'size_bytes': entry.stat(follow_symlinks=False).st_size,
+                                        'file_count': 1
+                                    })
+                        except OSError:
+                            continue
+
+        orphans.sort(key=lambda o: o['size_bytes'], reverse=True)
+        total_bytes = sum(o['size_bytes'] for o in orphans)
+
+        logger.info(f"Found {len(orphans)} orphaned entries, {total_bytes / (1024**3):.2f} GB")
+
+        return {
+            'orphans': orphans,
+            'total_size_gb': total_bytes / (1024**3),
+            'total_files': sum(o['file_count'] for o in orphans),
+            'plex_parts': len(self.part_paths),
+            'matched_parts': matched_parts
+        }
+
+    def _folder_size(self, path: str):
+        """Total size and file count of a folder, from the cache when possible"""
+        if self.dir_cache is not None:
+            # Only re-lists the directories of this subtree that changed since the last run
+            cached = self.dir_cache.scan(path, quiet=True)
+            return cached['size_bytes'], cached['file_count']
+
+        size = 0
+        count = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    size += os.lstat(os.path.join(dirpath, filename)).st_size
+                    count += 1
+                except OSError:
+                    continue
+        return size, count
+
+    def format_cli_report(self, result: Dict, limit: int = 50) -> str:
+        """
+        Format orphan report for CLI display
+
+        Args:
+            result: Result dictionary from find_orphans
+            limit: Maximum number of entries to list
+
+        Returns:
+            Formatted string for CLI
+        """
+        lines = []
+        lines.append("=" * 100)
+        lines.append("ORPHANED FILES (on disk, not referenced by Plex)")
+        lines.append("=" * 100)
+        lines.append(f"Plex media parts:            {result['plex_parts']}")
+        lines.append(f"Parts found on disk:         {result['matched_parts']}")
+        lines.append(f"Orphaned entries:            {len(result['orphans'])} ({result['total_files']} files)")
+        lines.append(f"Orphaned size:               {result['total_size_gb']:>10.2f} GB")
+        lines.append("-" * 100)
+        lines.append(f"{'Type':<8} {'Size (GB)':<12} {'Files':<8} {'Path'}")
+        lines.append("-" * 100)
+
+        for orphan in result['orphans'][:limit]:
+            lines.append(f"{orphan['type']:<8} {orphan['size_bytes'] / (1024**3):<12.2f} {orphan['file_count']:<8} {orphan['path']}")
+
+        if len(result['orphans']) > limit:
+            lines.append(f"... and {len(result['orphans']) - limit} more")
+
+        lines.append("=" * 100)
+        return "\n".join(lines)
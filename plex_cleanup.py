@@ -7,18 +7,30 @@ Finds and deletes movies that have been watched once or less
 import argparse
 import logging
 from typing import List, Dict
-from datetime import datetime, timedelta
 import sys
+import os
 import asyncio
 
 try:
     from plexapi.server import PlexServer
     from plexapi.video import Movie
+    from plexapi.exceptions import NotFound
 except ImportError:
     print("Error: plexapi library not installed")
     print("Install with: pip install plexapi")
     sys.exit(1)
 
+from cleanup_policy import CleanupPolicy, default_policy, load_policy, movie_candidate
+from cleanup_scoring import GB, CleanupScorer, SOLVERS, parse_weights, select_for_target
+from media_size import media_size_breakdown
+from plex_http_metrics import instrumented_session, plex_operation
+from prometheus_metrics import SCAN_SECONDS, CLEANUP_CANDIDATES, CLEANUP_CANDIDATE_BYTES, record_deletion
+from profiling import PROFILE_OUT, Profiler, profile_path
+from tv_cleanup import (DEFAULT_ABANDONED_DAYS, DEFAULT_WATCHED_SEASON_DAYS, TVCleanup, flatten_episodes,
+                        format_telegram_tv_summary, format_tv_report)
+from watch_history import DEFAULT_CACHE_FILE as WATCH_HISTORY_CACHE_FILE, WATCH_HISTORY_ENABLED, WatchHistory
+from tracing import JSONLogExporter, OTLPFileExporter, ProfileCollector, add_exporter, span, traced
+
 try:
     from storage_analyzer import StorageAnalyzer
 except ImportError:
@@ -30,6 +42,27 @@ try:
 except ImportError:
     DiskUsage = None
 
+try:
+    from orphan_detector import OrphanDetector
+except ImportError:
+    OrphanDetector = None
+
+try:
+    from dir_size_cache import DirectorySizeCache
+except ImportError:
+    DirectorySizeCache = None
+
+try:
+    from duplicate_finder import DuplicateFinder
+except ImportError:
+    DuplicateFinder = None
+
+try:
+    from deletion_journal import DeletionJournal, DEFAULT_JOURNAL_FILE
+except ImportError:
+    DeletionJournal = None
+    DEFAULT_JOURNAL_FILE = None
+
 try:
     from telegram import Bot
     from telegram.error import TelegramError
@@ -62,7 +95,8 @@ class PlexCleanup:
         """
         try:
             logger.info(f"Connecting to Plex server at {plex_url}")
-            self.plex = PlexServer(plex_url, plex_token)
+            with span('connect'):
+                self.plex = PlexServer(plex_url, plex_token, session=instrumented_session())
             logger.info(f"✓ Connected to Plex server: {self.plex.friendlyName}")
         except Exception as e:
             logger.error(f"Failed to connect to Plex: {e}")
@@ -101,6 +135,7 @@ class PlexCleanup:
             logger.error(f"Failed to send Telegram message: {e}")
             return False
 
+    @traced('format_telegram_summary')
     def format_telegram_summary(self, movies: List[Dict], days_filter: int = None, max_movies: int = None) -> List[str]:
         """
         Format movie list as Telegram messages (may return multiple messages if needed)
@@ -159,28 +194,45 @@ class PlexCleanup:
 
         return messages
 
-    def get_unwatched_movies(self, max_view_count: int = 1, days_since_watched: int = None) -> List[Dict]:
+    @plex_operation('get_unwatched_movies')
+    @SCAN_SECONDS.time(scan='get_unwatched_movies')
+    @traced('get_unwatched_movies')
+    def get_unwatched_movies(self, max_view_count: int = None, days_since_watched: int = None,
+                             days_since_added: int = None, policy: CleanupPolicy = None,
+                             history: 'WatchHistory' = None) -> List[Dict]:
         """
-        Get movies that have been watched max_view_count times or less
-        Optionally filter by last watched date
+        Get movies that match the cleanup policy: watched max_view_count times
+        or less, optionally not watched / added within the last X days
 
         Args:
-            max_view_count: Maximum view count (default: 1)
+            max_view_count: Maximum view count (default: the policy's, 1)
             days_since_watched: Only include movies not watched in last X days (optional)
+            days_since_added: Only include movies added more than X days ago (optional)
+            policy: Cleanup policy (default: CLEANUP_POLICY_FILE or built-in); the
+                arguments above override its rules
+            history: WatchHistory to count every account's plays (updated first);
+                default: only the token owner's
 
         Returns:
             List of movie dictionaries with details
         """
         unwatched_movies = []
-        cutoff_date = None
-
-        if days_since_watched:
-            cutoff_date = datetime.now() - timedelta(days=days_since_watched)
-            logger.info(f"Filtering for movies not watched since {cutoff_date.strftime('%Y-%m-%d')}")
+        policy = (policy or default_policy()).merged(
+            max_views=max_view_count,
+            days_not_watched=days_since_watched,
+            days_since_added=days_since_added
+        )
+        if history is not None:
+            history.refresh_or_warn(self.plex)
+        compiled = policy.compile(history=history)
+        logger.info(f"Filtering for movies with {policy.describe()}"
+                    f"{' (plays by all accounts)' if history is not None else ''}")
 
         try:
             # Get all movie libraries
-            movie_sections = [s for s in self.plex.library.sections() if s.type == 'movie']
+            with span('sections.fetch') as fetch:
+                movie_sections = compiled.sections(self.plex.library)
+                fetch.set('sections', len(movie_sections))
 
             if not movie_sections:
                 logger.warning("No movie libraries found in Plex")
@@ -190,54 +242,22 @@ class PlexCleanup:
 
             for section in movie_sections:
                 logger.info(f"Scanning library: {section.title}")
-                movies = section.all()
-
-                for movie in movies:
-                    view_count = movie.viewCount if movie.viewCount else 0
-
-                    # Check view count first
-                    if view_count > max_view_count:
-                        continue
-
-                    # If time-based filtering is enabled
-                    if cutoff_date:
-                        last_viewed = movie.lastViewedAt if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt else None
-
-                        # If never watched, include it
-                        if last_viewed is None:
-                            pass  # Include it
-                        # If watched recently (within cutoff period), skip it
-                        elif last_viewed > cutoff_date:
-                            continue
-                        # If watched but before cutoff date, include it
-
-                    # Get file info
-                    file_paths = [media.parts[0].file for media in movie.media]
-                    file_size = sum(media.parts[0].size for media in movie.media)
-
-                    last_viewed_str = 'Never'
-                    if hasattr(movie, 'lastViewedAt') and movie.lastViewedAt:
-                        last_viewed_str = movie.lastViewedAt.strftime('%Y-%m-%d')
-
-                    unwatched_movies.append({
-                        'title': movie.title,
-                        'year': movie.year,
-                        'view_count': view_count,
-                        'added_date': movie.addedAt.strftime('%Y-%m-%d') if movie.addedAt else 'Unknown',
-                        'last_viewed': last_viewed_str,
-                        'file_paths': file_paths,
-                        'file_size_mb': file_size / (1024 * 1024),
-                        'rating': movie.rating if hasattr(movie, 'rating') else None,
-                        'plex_object': movie
-                    })
+                with span('section.fetch', section=section.title) as fetch:
+                    movies = section.all()
+                    fetch.set('items', len(movies))
+
+                with span('section.filter', section=section.title, items=len(movies)) as matching:
+                    candidates = [movie_candidate(movie, history) for movie in movies if compiled.matches(movie)]
+                    matching.set('candidates', len(candidates))
+                unwatched_movies.extend(candidates)
 
             # Sort by view count, then by added date (oldest first)
-            unwatched_movies.sort(key=lambda x: (x['view_count'], x['added_date']))
+            with span('sort', candidates=len(unwatched_movies)):
+                unwatched_movies.sort(key=lambda x: (x['view_count'], x['added_date']))
+            CLEANUP_CANDIDATES.set(len(unwatched_movies))
+            CLEANUP_CANDIDATE_BYTES.set(int(sum(m['file_size_mb'] for m in unwatched_movies) * 1024 * 1024))
 
-            if days_since_watched:
-                logger.info(f"Found {len(unwatched_movies)} movies with {max_view_count} view(s) or less, not watched in {days_since_watched} days")
-            else:
-                logger.info(f"Found {len(unwatched_movies)} movies with {max_view_count} view(s) or less")
+            logger.info(f"Found {len(unwatched_movies)} movies with {policy.describe()}")
 
         except Exception as e:
             logger.error(f"Error scanning movies: {e}")
@@ -245,6 +265,32 @@ class PlexCleanup:
 
         return unwatched_movies
 
+    @traced('select_for_target')
+    def select_for_target(self, movies: List[Dict], target_gb: float, weights: Dict[str, float] = None,
+                          solver: str = 'auto') -> List[Dict]:
+        """
+        Narrow candidates to the lowest-value set that frees target_gb
+
+        Args:
+            movies: Candidates from get_unwatched_movies
+            target_gb: Space to free in GB
+            weights: Scoring weights (see cleanup_scoring.DEFAULT_WEIGHTS)
+            solver: 'auto', 'greedy' or 'dp'
+
+        Returns:
+            Selected movies, best deletion candidates first
+        """
+        result = select_for_target(movies, int(target_gb * GB), CleanupScorer(weights), solver=solver)
+
+        if result['met']:
+            logger.info(f"✓ Selected {len(result['selected'])} of {len(movies)} movies freeing "
+                        f"{result['bytes'] / GB:.2f} GB for a {target_gb:g} GB target ({result['solver']})")
+        else:
+            logger.warning(f"⚠️  All {len(movies)} candidates free only {result['bytes'] / GB:.2f} GB, "
+                           f"short of the {target_gb:g} GB target")
+        return result['selected']
+
+    @traced('print_movie_list')
     def print_movie_list(self, movies: List[Dict]):
         """
         Print formatted list of movies
@@ -272,7 +318,52 @@ class PlexCleanup:
         print("-" * 115)
         print(f"TOTAL: {len(movies)} movies, {total_size_gb:.2f} GB\n")
 
-    def delete_movies(self, movies: List[Dict], dry_run: bool = False, days_filter: int = None, send_telegram: bool = False):
+    def _delete_items(self, items: List[Dict], journal: 'DeletionJournal' = None, source: str = 'cli'):
+        """
+        Delete candidate items (movies or episodes) one by one, journaling each
+
+        Returns:
+            Tuple of (deleted count, failed count, deleted size in MB, journal run id)
+        """
+        deleted_count = 0
+        failed_count = 0
+        deleted_size_mb = 0
+
+        run_id = journal.start_run(items, source=source) if journal else None
+        if run_id:
+            logger.info(f"Journal run {run_id} ({journal.journal_file})")
+
+        for idx, item in enumerate(items, 1):
+            try:
+                label = f"{item['title']} ({item['year']})" if item.get('year') else item['title']
+                logger.info(f"[{idx}/{len(items)}] Deleting: {label}")
+
+                # Delete from Plex (this also deletes the file if configured)
+                item['plex_object'].delete()
+                deleted_count += 1
+                deleted_size_mb += item['file_size_mb']
+                record_deletion(source, item['file_size_mb'] * 1024 * 1024)
+                if journal:
+                    journal.record_deleted(run_id, item['plex_object'].ratingKey, item['file_size_mb'] * 1024 * 1024)
+
+                logger.info(f"  ✓ Deleted successfully")
+
+            except Exception as e:
+                logger.error(f"  ✗ Failed to delete: {e}")
+                failed_count += 1
+                record_deletion(source, failed=True)
+                if journal:
+                    journal.record_failed(run_id, item['plex_object'].ratingKey, e)
+
+        if journal:
+            journal.sync()
+
+        return deleted_count, failed_count, deleted_size_mb, run_id
+
+    @plex_operation('delete_movies')
+    @traced('delete_movies')
+    def delete_movies(self, movies: List[Dict], dry_run: bool = False, days_filter: int = None, send_telegram: bool = False,
+                      journal: 'DeletionJournal' = None):
         """
         Delete movies from Plex and filesystem
 
@@ -281,6 +372,7 @@ class PlexCleanup:
             dry_run: If True, only preview without deleting
             days_filter: Number of days used for filtering (for display purposes)
             send_telegram: If True, send summary to Telegram
+            journal: DeletionJournal to record the run in, so it can be resumed with resume_deletions
         """
         if not movies:
             logger.info("No movies to delete")
@@ -322,33 +414,20 @@ class PlexCleanup:
             return
 
         logger.info(f"Starting deletion of {len(movies)} movies...")
-        deleted_count = 0
-        failed_count = 0
-
-        for idx, movie in enumerate(movies, 1):
-            try:
-                logger.info(f"[{idx}/{len(movies)}] Deleting: {movie['title']} ({movie['year']})")
-
-                # Delete from Plex (this also deletes the file if configured)
-                movie['plex_object'].delete()
-                deleted_count += 1
-
-                logger.info(f"  ✓ Deleted successfully")
-
-            except Exception as e:
-                logger.error(f"  ✗ Failed to delete: {e}")
-                failed_count += 1
+        deleted_count, failed_count, deleted_size_mb, run_id = self._delete_items(movies, journal)
 
         print("\n" + "=" * 60)
         print(f"DELETION COMPLETE")
         print(f"✓ Successfully deleted: {deleted_count} movies")
         if failed_count > 0:
             print(f"✗ Failed to delete: {failed_count} movies")
+            if run_id:
+                print(f"  Retry the failures with: --resume {run_id}")
         print("=" * 60)
 
         # Send Telegram notification if requested
         if send_telegram:
-            deleted_size_gb = sum(m['file_size_mb'] for m in movies[:deleted_count]) / 1024
+            deleted_size_gb = deleted_size_mb / 1024
             completion_msg = f"🗑 <b>DELETION COMPLETED</b>\n\n"
             completion_msg += f"✅ Successfully deleted: {deleted_count} movies\n"
             completion_msg += f"💾 Space freed: {deleted_size_gb:.2f} GB\n"
@@ -356,7 +435,155 @@ class PlexCleanup:
                 completion_msg += f"❌ Failed: {failed_count} movies\n"
             asyncio.run(self.send_telegram_message(completion_msg))
 
-    def analyze_storage(self, send_telegram: bool = False, total_capacity_gb: float = 3700, ssh_host: str = None, ssh_user: str = None):
+    @plex_operation('delete_tv')
+    @traced('delete_tv')
+    def delete_tv(self, groups: List[Dict], dry_run: bool = False, send_telegram: bool = False,
+                  journal: 'DeletionJournal' = None):
+        """
+        Delete TV cleanup candidates (shows, seasons, episodes) episode by episode
+
+        Args:
+            groups: Candidate groups from TVCleanup.find_candidates
+            dry_run: If True, only preview without deleting
+            send_telegram: If True, send summary to Telegram
+            journal: DeletionJournal to record the run in, so it can be resumed with resume_deletions
+        """
+        print(format_tv_report(groups))
+        if not groups:
+            if send_telegram:
+                asyncio.run(self.send_telegram_message(format_telegram_tv_summary(groups)[0]))
+            return
+
+        if dry_run:
+            logger.info("DRY RUN MODE - No files will be deleted")
+            if send_telegram:
+                for message in format_telegram_tv_summary(groups):
+                    asyncio.run(self.send_telegram_message(message))
+            return
+
+        episodes = flatten_episodes(groups)
+
+        print("\n⚠️  WARNING: This will PERMANENTLY delete these episodes from your Plex server and filesystem!")
+        confirmation = input("\nType 'DELETE' to confirm deletion (anything else to cancel): ")
+
+        if confirmation != 'DELETE':
+            logger.info("Deletion cancelled by user")
+            return
+
+        print(f"\n⚠️  FINAL CONFIRMATION: Delete {len(episodes)} episodes?")
+        final_confirm = input("Type 'YES' to proceed: ")
+
+        if final_confirm != 'YES':
+            logger.info("Deletion cancelled by user")
+            return
+
+        logger.info(f"Starting deletion of {len(episodes)} episodes...")
+        deleted_count, failed_count, deleted_size_mb, run_id = self._delete_items(episodes, journal)
+
+        print("\n" + "=" * 60)
+        print(f"DELETION COMPLETE")
+        print(f"✓ Successfully deleted: {deleted_count} episodes ({deleted_size_mb / 1024:.2f} GB)")
+        if failed_count > 0:
+            print(f"✗ Failed to delete: {failed_count} episodes")
+            if run_id:
+                print(f"  Retry the failures with: --resume {run_id}")
+        print("=" * 60)
+
+        if send_telegram:
+            completion_msg = f"🗑 <b>TV DELETION COMPLETED</b>\n\n"
+            completion_msg += f"✅ Successfully deleted: {deleted_count} episodes\n"
+            completion_msg += f"💾 Space freed: {deleted_size_mb / 1024:.2f} GB\n"
+            if failed_count > 0:
+                completion_msg += f"❌ Failed: {failed_count} episodes\n"
+            asyncio.run(self.send_telegram_message(completion_msg))
+
+    @plex_operation('resume_deletions')
+    @traced('resume_deletions')
+    def resume_deletions(self, journal: 'DeletionJournal', run_id: str = None, confirm: bool = True,
+                         source: str = None) -> Dict:
+        """
+        Finish an interrupted or partly failed deletion run from the journal
+
+        Items already deleted are skipped, everything else is fetched by rating
+        key and deleted; items that no longer exist in Plex are recorded as
+        deleted. No library scan is needed.
+
+        Args:
+            journal: DeletionJournal the run was recorded in
+            run_id: Run to resume (default: the most recent run)
+            confirm: Ask for confirmation before deleting
+            source: With no run_id, only consider runs started from this source
+
+        Returns:
+            Dict with run, deleted, already_gone, failed and bytes_freed, or None if there was nothing to resume
+        """
+        run_id = run_id or journal.last_run_id(source=source)
+        if not run_id:
+            logger.info("No deletion runs in the journal")
+            return None
+
+        pending = journal.pending(run_id)
+        if not pending:
+            logger.info(f"Run {run_id} is already complete")
+            return None
+
+        logger.info(f"Resuming run {run_id}: {len(pending)} items still to delete")
+        if confirm:
+            for item in pending:
+                print(f"  {item['title']} ({item.get('year')})")
+            final_confirm = input(f"\nType 'YES' to delete these {len(pending)} items: ")
+            if final_confirm != 'YES':
+                logger.info("Resume cancelled by user")
+                return None
+
+        result = {'run': run_id, 'deleted': 0, 'already_gone': 0, 'failed': 0, 'bytes_freed': 0}
+        for idx, item in enumerate(pending, 1):
+            rating_key = item['rating_key']
+            logger.info(f"[{idx}/{len(pending)}] Deleting: {item['title']} ({item.get('year')})")
+            try:
+                plex_item = self.plex.fetchItem(int(rating_key))
+            except NotFound:
+                # Deleted before the interruption, or by someone else since
+                journal.record_deleted(run_id, rating_key, item['size_bytes'], already_gone=True)
+                result['already_gone'] += 1
+                result['bytes_freed'] += item['size_bytes']
+                logger.info(f"  ✓ Already gone")
+                continue
+            except Exception as e:
+                journal.record_failed(run_id, rating_key, e)
+                record_deletion(source or 'cli', failed=True)
+                result['failed'] += 1
+                logger.error(f"  ✗ Failed to fetch: {e}")
+                continue
+
+            try:
+                size_bytes = media_size_breakdown(plex_item)['total_bytes']
+                plex_item.delete()
+                journal.record_deleted(run_id, rating_key, size_bytes)
+                record_deletion(source or 'cli', size_bytes)
+                result['deleted'] += 1
+                result['bytes_freed'] += size_bytes
+                logger.info(f"  ✓ Deleted successfully")
+            except Exception as e:
+                journal.record_failed(run_id, rating_key, e)
+                record_deletion(source or 'cli', failed=True)
+                result['failed'] += 1
+                logger.error(f"  ✗ Failed to delete: {e}")
+
+        journal.sync()
+
+        print("\n" + "=" * 60)
+        print(f"RESUME COMPLETE (run {run_id})")
+        print(f"✓ Deleted: {result['deleted']} items, already gone: {result['already_gone']}")
+        print(f"💾 Space freed: {result['bytes_freed'] / (1024 ** 3):.2f} GB")
+        if result['failed']:
+            print(f"✗ Failed: {result['failed']} items")
+        print("=" * 60)
+
+        return result
+
+    def analyze_storage(self, send_telegram: bool = False, total_capacity_gb: float = 3700, ssh_host: str = None, ssh_user: str = None,
+                        download_root: str = None):
         """
         Analyze and display storage usage across Plex libraries
 
@@ -365,13 +592,14 @@ class PlexCleanup:
             total_capacity_gb: Total storage capacity in GB
             ssh_host: SSH hostname for remote disk usage
             ssh_user: SSH username for remote disk usage
+            download_root: Local download folder to include on-disk folder sizes for (optional)
         """
         if not StorageAnalyzer:
             logger.error("StorageAnalyzer module not available")
             return
 
         try:
-            analyzer = StorageAnalyzer(self.plex, total_capacity_gb, ssh_host, ssh_user)
+            analyzer = StorageAnalyzer(self.plex, total_capacity_gb, ssh_host, ssh_user, download_root=download_root)
             stats = analyzer.analyze_storage()
 
             # Print CLI report
@@ -387,6 +615,51 @@ class PlexCleanup:
             logger.error(f"Error analyzing storage: {e}")
             raise
 
+    def find_orphans(self, download_roots: List[str], plex_path_prefix: str = None, local_path_prefix: str = None):
+        """
+        Find and display files in the download folders that Plex does not reference
+
+        Args:
+            download_roots: Local download folders to check
+            plex_path_prefix: Path prefix as Plex reports it (optional)
+            local_path_prefix: Local path the Plex prefix maps to (optional)
+        """
+        if not OrphanDetector:
+            logger.error("OrphanDetector module not available")
+            return
+
+        try:
+            dir_cache = DirectorySizeCache() if DirectorySizeCache else None
+            detector = OrphanDetector(self.plex, plex_path_prefix, local_path_prefix, dir_cache=dir_cache)
+            result = detector.find_orphans(download_roots)
+            print(detector.format_cli_report(result))
+
+        except Exception as e:
+            logger.error(f"Error finding orphaned files: {e}")
+            raise
+
+    def find_duplicates(self, hash_content: bool = True, plex_path_prefix: str = None, local_path_prefix: str = None):
+        """
+        Find and display redundant versions of movies and episodes
+
+        Args:
+            hash_content: Also compare local files by size + partial content hash
+            plex_path_prefix: Path prefix as Plex reports it (optional)
+            local_path_prefix: Local path the Plex prefix maps to (optional)
+        """
+        if not DuplicateFinder:
+            logger.error("DuplicateFinder module not available")
+            return
+
+        try:
+            finder = DuplicateFinder(self.plex, plex_path_prefix, local_path_prefix)
+            result = finder.find_duplicates(hash_content=hash_content)
+            print(finder.format_cli_report(result))
+
+        except Exception as e:
+            logger.error(f"Error finding duplicates: {e}")
+            raise
+
     def check_disk_usage(self, send_telegram: bool = False, ssh_host: str = None, ssh_user: str = None, remote_path: str = "/home32"):
         """
         Check actual disk usage on the server
@@ -431,8 +704,26 @@ def main():
     parser = argparse.ArgumentParser(description="Plex Movie Cleanup Tool")
     parser.add_argument("--url", required=True, help="Plex server URL (e.g., http://192.168.1.100:32400)")
     parser.add_argument("--token", required=True, help="Plex authentication token")
-    parser.add_argument("--max-views", type=int, default=1, help="Maximum view count (default: 1)")
+    parser.add_argument("--max-views", type=int, help="Maximum view count (default: 1, or the policy's)")
     parser.add_argument("--days", type=int, help="Only include movies not watched in last X days")
+    parser.add_argument("--days-added", type=int, help="Only include movies added more than X days ago")
+    parser.add_argument("--policy", metavar="FILE", help="Cleanup policy (YAML or JSON, default: $CLEANUP_POLICY_FILE); "
+                                                        "--max-views/--days/--days-added override its rules")
+    parser.add_argument("--no-watch-history", action="store_true", default=not WATCH_HISTORY_ENABLED,
+                        help="Judge views by the token owner's plays only, not every account's play history")
+    parser.add_argument("--watch-history-cache", metavar="FILE", default=WATCH_HISTORY_CACHE_FILE,
+                        help="Play history cache (default: watch_history.db, or $WATCH_HISTORY_CACHE_FILE)")
+    parser.add_argument("--rebuild-watch-history", action="store_true",
+                        help="Re-read the whole play history instead of only new plays")
+    parser.add_argument("--tv", action="store_true",
+                        help="Clean up TV instead of movies: fully watched seasons, abandoned shows, old watched episodes")
+    parser.add_argument("--tv-season-days", type=int, metavar="DAYS",
+                        help=f"With --tv, fully watched seasons last played over DAYS ago (default: {DEFAULT_WATCHED_SEASON_DAYS})")
+    parser.add_argument("--tv-abandoned-days", type=int, metavar="DAYS",
+                        help=f"With --tv, partly watched shows not played in DAYS (default: {DEFAULT_ABANDONED_DAYS})")
+    parser.add_argument("--tv-episode-days", type=int, metavar="DAYS",
+                        help="With --tv, watched episodes last played over DAYS ago (default: off). "
+                             "Giving any --tv-*-days option turns off the rules not given")
     parser.add_argument("--dry-run", action="store_true", help="Preview only, don't delete")
     parser.add_argument("--auto-delete", action="store_true", help="Skip confirmation (use with caution!)")
     parser.add_argument("--analyze-storage", action="store_true", help="Analyze storage usage across libraries")
@@ -441,12 +732,51 @@ def main():
     parser.add_argument("--ssh-host", help="SSH hostname for remote disk usage (e.g., mirror.seedhost.eu)")
     parser.add_argument("--ssh-user", help="SSH username (e.g., desispeed)")
     parser.add_argument("--remote-path", default="/home32", help="Remote path to check disk usage (default: /home32)")
+    parser.add_argument("--download-root", help="Local download folder to report on-disk folder sizes for (uses incremental size cache)")
+    parser.add_argument("--find-orphans", action="store_true", help="List files under --download-root not referenced by any Plex media")
+    parser.add_argument("--find-duplicates", action="store_true", help="List redundant versions of movies and episodes")
+    parser.add_argument("--no-content-hash", action="store_true", help="With --find-duplicates, only group by Plex GUID")
+    parser.add_argument("--plex-path-prefix", help="Path prefix as Plex reports it, for mapping to --local-path-prefix")
+    parser.add_argument("--local-path-prefix", help="Local path where --plex-path-prefix is mounted")
+    parser.add_argument("--target-gb", type=float,
+                        help="Only delete the lowest-value movies needed to free this many GB")
+    parser.add_argument("--score-weights", metavar="SPEC",
+                        help="Scoring weights for --target-gb, e.g. views=1,recency=2,rating=0.5,age=1,size=0")
+    parser.add_argument("--solver", choices=SOLVERS, default="auto", help="Selection solver for --target-gb (default: auto)")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_FILE, help="Deletion journal file (default: deletion_journal.jsonl)")
+    parser.add_argument("--resume", nargs="?", const="last", metavar="RUN_ID",
+                        help="Resume the last (or given) deletion run from the journal without rescanning")
     parser.add_argument("--telegram-token", help="Telegram bot token")
     parser.add_argument("--telegram-chat-id", help="Telegram chat ID")
     parser.add_argument("--send-telegram", action="store_true", help="Send summary to Telegram")
+    parser.add_argument("--profile", action="store_true", help="Print a per-phase timing breakdown when the run ends")
+    parser.add_argument("--trace-file", metavar="PATH", help="Append timing spans to PATH as OpenTelemetry OTLP/JSON lines")
+    parser.add_argument("--trace-json", action="store_true", help="Log every timing span as a JSON line")
+    parser.add_argument("--profile-out", metavar="PATH", default=PROFILE_OUT,
+                        help="cProfile the run into PATH (pstats; *.json for speedscope; a directory for a "
+                             "timestamped file). Default: $PROFILE_OUT")
 
     args = parser.parse_args()
 
+    try:
+        weights = parse_weights(args.score_weights)
+        policy = load_policy(args.policy) if args.policy else default_policy()
+    except ValueError as e:
+        parser.error(str(e))
+
+    phases = add_exporter(ProfileCollector()) if args.profile else None
+    if args.trace_file:
+        add_exporter(OTLPFileExporter(args.trace_file))
+    if args.trace_json:
+        add_exporter(JSONLogExporter())
+
+    profiler = None
+    if args.profile_out:
+        profile_out = args.profile_out
+        if os.path.isdir(profile_out):
+            profile_out = profile_path('plex_cleanup', directory=profile_out)
+        profiler = Profiler(profile_out).start()
+
     try:
         # Initialize cleanup tool
         cleanup = PlexCleanup(
@@ -456,6 +786,20 @@ def main():
             telegram_chat_id=args.telegram_chat_id
         )
 
+        journal = DeletionJournal(args.journal) if DeletionJournal and args.journal else None
+
+        # If resuming an interrupted deletion run, do that and exit
+        if args.resume:
+            if not journal:
+                parser.error("--resume requires the deletion journal")
+            with journal:
+                cleanup.resume_deletions(
+                    journal,
+                    run_id=None if args.resume == "last" else args.resume,
+                    confirm=not args.auto_delete
+                )
+            return
+
         # If checking disk usage, do that and exit
         if args.check_disk:
             cleanup.check_disk_usage(
@@ -466,22 +810,68 @@ def main():
             )
             return
 
+        # If finding orphaned files, do that and exit
+        if args.find_orphans:
+            if not args.download_root:
+                parser.error("--find-orphans requires --download-root")
+            cleanup.find_orphans(
+                [args.download_root],
+                plex_path_prefix=args.plex_path_prefix,
+                local_path_prefix=args.local_path_prefix
+            )
+            return
+
+        # If finding duplicates, do that and exit
+        if args.find_duplicates:
+            cleanup.find_duplicates(
+                hash_content=not args.no_content_hash,
+                plex_path_prefix=args.plex_path_prefix,
+                local_path_prefix=args.local_path_prefix
+            )
+            return
+
         # If analyzing storage, do that and exit
         if args.analyze_storage:
             cleanup.analyze_storage(
                 send_telegram=args.send_telegram,
                 total_capacity_gb=args.total_capacity,
                 ssh_host=args.ssh_host,
-                ssh_user=args.ssh_user
+                ssh_user=args.ssh_user,
+                download_root=args.download_root
             )
             return
 
+        # Server-wide play history, so plays by other accounts keep items off the list
+        history = None
+        if not args.no_watch_history:
+            history = WatchHistory(args.watch_history_cache)
+            if args.rebuild_watch_history:
+                history.refresh(cleanup.plex, full=True)
+
+        # If cleaning up TV, do that and exit
+        if args.tv:
+            rules = (args.tv_season_days, args.tv_abandoned_days, args.tv_episode_days)
+            if not any(days is not None for days in rules):
+                rules = (DEFAULT_WATCHED_SEASON_DAYS, DEFAULT_ABANDONED_DAYS, None)
+            groups = TVCleanup(cleanup.plex).find_candidates(*rules, history=history, policy=policy)
+            cleanup.delete_tv(groups, dry_run=args.dry_run, send_telegram=args.send_telegram,
+                              journal=None if args.dry_run else journal)
+            if journal:
+                journal.close()
+            return
+
         # Get unwatched movies
         unwatched = cleanup.get_unwatched_movies(
             max_view_count=args.max_views,
-            days_since_watched=args.days
+            days_since_watched=args.days,
+            days_since_added=args.days_added,
+            policy=policy,
+            history=history
         )
 
+        if args.target_gb:
+            unwatched = cleanup.select_for_target(unwatched, args.target_gb, weights=weights, solver=args.solver)
+
         if args.dry_run:
             cleanup.delete_movies(
                 unwatched,
@@ -494,8 +884,11 @@ def main():
                 unwatched,
                 dry_run=False,
                 days_filter=args.days,
-                send_telegram=args.send_telegram
+                send_telegram=args.send_telegram,
+                journal=journal
             )
+            if journal:
+                journal.close()
 
     except KeyboardInterrupt:
         logger.info("\n\nOperation cancelled by user")
@@ -503,6 +896,11 @@ def main():
     except Exception as e:
         logger.error(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if profiler:
+            profiler.stop()
+        if phases:
+            print(phases.report())
 
 
 if __name__ == "__main__":
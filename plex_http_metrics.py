@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Plex HTTP Instrumentation
+Per-endpoint request counts, bytes and latency histograms for plexapi traffic
+
+Hooks the requests session plexapi uses, so every call to Plex is recorded
+process-wide and against the operations (scan, API handler, bot command)
+currently running in the caller's context:
+
+    plex = PlexServer(url, token, session=instrumented_session())
+    with plex_operation('analyze_storage'):
+        ...
+    # INFO analyze_storage: 1,482 Plex requests, 38.0 MB, 71.0 s (65.2 s waiting on Plex)
+
+Stdlib only; requests is imported when a session is first created.
+"""
+
+import re
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Finished operations kept for /api/metrics
+RECENT_OPERATIONS = 50
+
+_ID_SEGMENT = re.compile(r'^\d+$')
+
+
+def endpoint_pattern(url):
+    """
+    Collapse IDs out of a Plex URL path
+
+    "/library/metadata/12345/children?X-Plex-Token=..." -> "/library/metadata/{id}/children"
+    """
+    path = urlsplit(url).path or '/'
+    return '/'.join('{id}' if _ID_SEGMENT.match(part) else part for part in path.split('/'))
+
+
+class EndpointStats:
+    """Counters and latency histogram for one method + endpoint pattern"""
+
+    __slots__ = ('requests', 'errors', 'bytes', 'seconds', 'buckets')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        # One count per bucket plus +Inf (not cumulative)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, status, nbytes, seconds):
+        self.requests += 1
+        if status >= 400:
+            self.errors += 1
+        self.bytes += nbytes
+        self.seconds += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self):
+        cumulative = {}
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), self.buckets):
+            running += count
+            cumulative[str(bound)] = running
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'seconds': round(self.seconds, 4),
+            'latencyBuckets': cumulative,
+        }
+
+
+class PlexHTTPStats:
+    """Process-wide Plex request statistics, keyed by "METHOD /endpoint/pattern" """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, status, nbytes, seconds):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.add(status, nbytes, seconds)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """
+        Current statistics
+
+        Returns:
+            Dict with totals and endpoints (endpoint -> counters and cumulative latency buckets)
+        """
+        with self._lock:
+            endpoints = {endpoint: stats.to_dict() for endpoint, stats in sorted(self._endpoints.items())}
+        return {
+            'totals': {
+                'requests': sum(e['requests'] for e in endpoints.values()),
+                'errors': sum(e['errors'] for e in endpoints.values()),
+                'bytes': sum(e['bytes'] for e in endpoints.values()),
+                'seconds': round(sum(e['seconds'] for e in endpoints.values()), 4),
+            },
+            'endpoints': endpoints,
+        }
+
+
+plex_http_stats = PlexHTTPStats()
+
+
+class PlexOperation:
+    """Plex traffic of one scan, API handler or bot command"""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.plex_seconds = 0.0
+        self.wall_seconds = None
+        self.endpoints = {}
+        self._started = time.perf_counter()
+        self._token = None
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, status, nbytes, seconds):
+        with self._lock:
+            self.requests += 1
+            if status >= 400:
+                self.errors += 1
+            self.bytes += nbytes
+            self.plex_seconds += seconds
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+    def summary(self):
+        """One-line summary for the log"""
+        wall = self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self._started
+        text = (f"{self.name}: {self.requests:,} Plex requests, {self.bytes / (1024 * 1024):.1f} MB, "
+                f"{wall:.1f} s ({self.plex_seconds:.1f} s waiting on Plex)")
+        if self.errors:
+            text += f", {self.errors} errors"
+        return text
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'plexSeconds': round(self.plex_seconds, 4),
+            'wallSeconds': round(self.wall_seconds, 4) if self.wall_seconds is not None else None,
+            'endpoints': dict(self.endpoints),
+        }
+
+
+_active_operations = contextvars.ContextVar('plex_operations', default=())
+recent_operations = deque(maxlen=RECENT_OPERATIONS)
+
+
+def start_operation(name):
+    """
+    Start attributing Plex requests made in this context to an operation
+
+    Operations nest: requests count towards every operation that is open.
+    Pair with finish_operation (or use plex_operation).
+    """
+    operation = PlexOperation(name)
+    operation._token = _active_operations.set(_active_operations.get() + (operation,))
+    return operation
+
+
+def finish_operation(operation, log=True):
+    """
+    Close an operation; if it talked to Plex, keep it in recent_operations and log its summary
+
+    Args:
+        operation: Operation returned by start_operation
+        log: Log the summary at INFO
+    """
+    operation.wall_seconds = time.perf_counter() - operation._started
+    if operation._token is not None:
+        try:
+            _active_operations.reset(operation._token)
+        except ValueError:
+            # Finished from a different context than it was started in
+            _active_operations.set(tuple(op for op in _active_operations.get() if op is not operation))
+        operation._token = None
+    if operation.requests:
+        recent_operations.append(operation)
+        if log:
+            logger.info(operation.summary())
+    return operation
+
+
+@contextmanager
+def plex_operation(name, log=True):
+    """Context manager (or decorator) around start_operation/finish_operation"""
+    operation = start_operation(name)
+    try:
+        yield operation
+    finally:
+        finish_operation(operation, log)
+
+
+def _on_response(response, *args, **kwargs):
+    """requests response hook: time the body read and record the request"""
+    seconds = response.elapsed.total_seconds()
+    if kwargs.get('stream'):
+        nbytes = int(response.headers.get('Content-Length') or 0)
+    else:
+        # Session.send reads the body right after the hooks anyway
+        start = time.perf_counter()
+        nbytes = len(response.content)
+        seconds += time.perf_counter() - start
+
+    endpoint = f"{response.request.method} {endpoint_pattern(response.url)}"
+    plex_http_stats.record(endpoint, response.status_code, nbytes, seconds)
+    for operation in _active_operations.get():
+        operation.add(endpoint, response.status_code, nbytes, seconds)
+    return response
+
+
+def instrument_session(session):
+    """Add the recording hook to a requests.Session (idempotent)"""
+    hooks = session.hooks.setdefault('response', [])
+    if _on_response not in hooks:
+        hooks.append(_on_response)
+    return session
+
+
+def instrumented_session():
+    """New requests.Session that records every Plex request"""
+    import requests
+    return instrument_session(requests.Session())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Profiling
+One profiling switch for the CLI, the Flask apps and the Telegram bot
+
+    with Profiler('scan.prof'):           # cProfile, open with snakeviz / python -m pstats
+        cleanup.get_unwatched_movies()
+
+    with Profiler('scan.speedscope.json'):  # wall-clock stack samples for speedscope.app
+        cleanup.get_unwatched_movies()
+
+The format follows the file extension: *.json is speedscope, anything else
+pstats. The speedscope profile comes from an in-process sampler (py-spy style,
+stdlib only), so time spent waiting on Plex shows up as well as CPU time.
+
+PROFILE_OUT names the output: a file for a one-shot CLI run, or the directory
+the web apps and the bot write per-request / per-command profiles into.
+PROFILE_TOKEN enables per-request profiling in the Flask apps for clients that
+send it in the X-Profile header.
+"""
+
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import logging
+import threading
+import cProfile
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_OUT = os.getenv('PROFILE_OUT')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+DEFAULT_PROFILE_DIR = 'profiles'
+FORMATS = ('pstats', 'speedscope')
+SAMPLE_INTERVAL = 0.001
+
+# cProfile cannot nest, and on newer Pythons only one profiler may be active per process
+_active_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another profile is already being recorded"""
+
+
+def output_format(path):
+    """'speedscope' for *.json, else 'pstats'"""
+    return 'speedscope' if path.lower().endswith('.json') else 'pstats'
+
+
+def profile_path(name, fmt='pstats', directory=None):
+    """
+    Timestamped output file for one request/command
+
+    Args:
+        name: What was profiled, e.g. "GET /api/plex/movies" or "preview"
+        fmt: 'pstats' or 'speedscope'
+        directory: Output directory (default: PROFILE_OUT, else ./profiles)
+
+    Returns:
+        Path to write the profile to (directory is created)
+    """
+    directory = directory or PROFILE_OUT or DEFAULT_PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-') or 'profile'
+    extension = '.speedscope.json' if fmt == 'speedscope' else '.prof'
+    return os.path.join(directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{slug}{extension}")
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval (wall-clock)"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []
+        self.samples = []
+        self.weights = []
+        self._frame_index = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                index = self._frame_index.get(key)
+                if index is None:
+                    index = self._frame_index[key] = len(self.frames)
+                    self.frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+                stack.append(index)
+                frame = frame.f_back
+            stack.reverse()
+
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def to_speedscope(self, name):
+        total = sum(self.weights)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'plex-manager profiling',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': total,
+                'samples': self.samples,
+                'weights': self.weights,
+            }],
+        }
+
+
+class Profiler:
+    """
+    Profile the current thread between start() and stop() and write the result
+
+    Raises ProfilerBusyError on start() if another profile is running.
+    """
+
+    def __init__(self, path, fmt=None, name=None):
+        """
+        Args:
+            path: Output file
+            fmt: 'pstats' or 'speedscope' (default: from the extension)
+            name: Label stored in speedscope profiles (default: file name)
+        """
+        self.path = path
+        self.fmt = fmt or output_format(path)
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format {self.fmt!r}, expected one of {', '.join(FORMATS)}")
+        self.name = name or os.path.basename(path)
+        self._profile = None
+        self._sampler = None
+
+    def start(self):
+        if not _active_lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another profile is already being recorded")
+        try:
+            if self.fmt == 'pstats':
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            else:
+                self._sampler = _StackSampler(threading.get_ident())
+                self._sampler.start()
+        except Exception:
+            _active_lock.release()
+            raise
+        return self
+
+    def stop(self):
+        """Stop recording and write the file; returns its path"""
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self._profile.dump_stats(self.path)
+            elif self._sampler is not None:
+                self._sampler.stop()
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._sampler.to_speedscope(self.name), f)
+        finally:
+            self._profile = self._sampler = None
+            _active_lock.release()
+        logger.info(f"✓ Profile written to {self.path}")
+        return self.path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def profile_token_matches(value):
+    """Whether a client-supplied X-Profile value grants profiling (PROFILE_TOKEN must be set)"""
+    return bool(PROFILE_TOKEN and value and hmac.compare_digest(value, PROFILE_TOKEN))
+
+
+def install_flask_profiling(app, header='X-Profile'):
+    """
+    Per-request profiling for a Flask app, admin-only
+
+    A request carrying "X-Profile: <PROFILE_TOKEN>" is profiled and the file
+    name is returned in the X-Profile-File response header. "X-Profile-Format:
+    speedscope" switches from pstats. A wrong token is rejected with 403;
+    without PROFILE_TOKEN set the header is ignored.
+    """
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def start_request_profile():
+        value = request.headers.get(header)
+        if not value or not PROFILE_TOKEN:
+            return None
+        if not profile_token_matches(value):
+            return jsonify({'error': 'Profiling not allowed'}), 403
+
+        fmt = request.headers.get(f'{header}-Format', 'pstats')
+        if fmt not in FORMATS:
+            return jsonify({'error': f"Unknown profile format: {fmt}"}), 400
+
+        rule = request.url_rule.rule if request.url_rule else request.path
+        name = f"{request.method} {rule}"
+        try:
+            g.profiler = Profiler(profile_path(name, fmt), fmt, name=name).start()
+        except ProfilerBusyError as e:
+            return jsonify({'error': str(e)}), 409
+        return None
+
+    @app.after_request
+    def finish_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            path = profiler.stop()
+            response.headers[f'{header}-File'] = os.path.basename(path)
+            print(f"📊 Profile written to {path}")
+        return response
+
+    @app.teardown_request
+    def release_request_profile(exc=None):
+        # after_request is skipped when the handler raised
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+
+    return app
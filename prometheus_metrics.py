@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics
+Minimal counters, gauges and histograms in the Prometheus text format (0.0.4)
+
+Stdlib only, so every entry point (CLI, bot, backend API, web app) can import
+it without pulling in prometheus_client. Metrics live in the process that
+records them: with several Gunicorn workers, each worker exposes its own and
+Prometheus aggregates across them.
+
+    from prometheus_metrics import SCAN_SECONDS, render
+    with SCAN_SECONDS.time(scan='analyze_storage'):
+        ...
+    Response(render(), content_type=CONTENT_TYPE)
+"""
+
+import math
+import time
+import logging
+import threading
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request-scale latencies (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Library scans and SSH round trips (seconds)
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._functions = []
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, fn):
+        """
+        Read values at scrape time instead of recording them
+
+        Args:
+            fn: Callable returning a number (no labels) or {label values tuple: number}
+        """
+        self._functions.append(fn)
+        return fn
+
+    def samples(self):
+        """{label values tuple: value} for recorded and function-provided values"""
+        with self._lock:
+            values = dict(self._values)
+        for fn in self._functions:
+            try:
+                result = fn()
+            except Exception as e:
+                logger.warning(f"⚠️  Metric {self.name} callback failed: {e}")
+                continue
+            if result is None:
+                continue
+            if isinstance(result, dict):
+                values.update({tuple(str(v) for v in key): value for key, value in result.items()})
+            else:
+                values[()] = result
+        return values
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.samples().get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    """Context manager and decorator that observes elapsed seconds"""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def time(self, **labels):
+        """Time a block (with ...) or every call of a function (decorator)"""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            states = {key: dict(state, buckets=list(state['buckets'])) for key, state in self._values.items()}
+        for key, state in sorted(states.items()):
+            running = 0
+            for bound, count in zip(self.buckets, state['buckets']):
+                running += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _format_value(bound)))} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Set of metrics plus collectors that render their own lines"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics.append(metric)
+
+    def add_collector(self, collector):
+        """Register collector() -> list of exposition lines, called at scrape time"""
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"⚠️  Metrics collector failed: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def render():
+    """Exposition text for the default registry"""
+    return REGISTRY.render()
+
+
+# =============================================================================
+# Metrics shared by the CLI, bot, backend API and web app
+# =============================================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'plex_manager_http_request_duration_seconds', 'Flask handler latency',
+    ('app', 'method', 'endpoint', 'status')
+)
+BOT_COMMAND_SECONDS = Histogram(
+    'plex_manager_bot_command_duration_seconds', 'Telegram bot command latency', ('command',), buckets=SLOW_BUCKETS
+)
+SCAN_SECONDS = Histogram(
+    'plex_manager_scan_duration_seconds', 'Plex library scan duration', ('scan',), buckets=SLOW_BUCKETS
+)
+CLEANUP_CANDIDATES = Gauge(
+    'plex_manager_cleanup_candidates', 'Movies matching the cleanup criteria at the last scan'
+)
+CLEANUP_CANDIDATE_BYTES = Gauge(
+    'plex_manager_cleanup_candidate_bytes', 'Size of the movies matching the cleanup criteria at the last scan'
+)
+TV_CLEANUP_CANDIDATE_EPISODES = Gauge(
+    'plex_manager_tv_cleanup_candidate_episodes', 'Episodes in TV cleanup candidates at the last scan'
+)
+TV_CLEANUP_CANDIDATE_BYTES = Gauge(
+    'plex_manager_tv_cleanup_candidate_bytes', 'Size of the TV cleanup candidates at the last scan'
+)
+MEDIA_BYTES = Gauge(
+    'plex_manager_media_bytes', 'Media size per Plex library at the last storage analysis', ('library',)
+)
+DELETED_ITEMS = Counter(
+    'plex_manager_deleted_items_total', 'Items deleted from Plex', ('source',)
+)
+BYTES_FREED = Counter(
+    'plex_manager_deleted_bytes_total', 'Bytes freed by deletions', ('source',)
+)
+DELETION_FAILURES = Counter(
+    'plex_manager_deletion_failures_total', 'Deletions that failed', ('source',)
+)
+DISK_PROBE_SECONDS = Histogram(
+    'plex_manager_disk_probe_duration_seconds', 'Disk usage probe latency (SSH round trips for remote)',
+    ('source', 'result'), buckets=SLOW_BUCKETS
+)
+DISK_BYTES = Gauge(
+    'plex_manager_disk_bytes', 'Disk space at the last probe', ('source', 'state')
+)
+CACHE_REQUESTS = Counter(
+    'plex_manager_cache_requests_total', 'Cache lookups by result (hit/miss)', ('cache', 'result')
+)
+CACHE_HIT_RATIO = Gauge(
+    'plex_manager_cache_hit_ratio', 'Cache hits / lookups since start', ('cache',)
+)
+HASHING_QUEUE_DEPTH = Gauge(
+    'plex_manager_auth_hashing_queue_depth', 'Password hashing jobs admitted but not finished'
+)
+
+
+@CACHE_HIT_RATIO.set_function
+def _cache_hit_ratios():
+    lookups = {}
+    for (cache, result), count in CACHE_REQUESTS.samples().items():
+        hits, total = lookups.get(cache, (0, 0))
+        lookups[cache] = (hits + (count if result == 'hit' else 0), total + count)
+    return {(cache,): hits / total for cache, (hits, total) in lookups.items() if total}
+
+
+def record_deletion(source, bytes_freed=0, failed=False):
+    """Count one deletion outcome"""
+    if failed:
+        DELETION_FAILURES.inc(source=source)
+    else:
+        DELETED_ITEMS.inc(source=source)
+        BYTES_FREED.inc(max(int(bytes_freed or 0), 0), source=source)
+
+
+def record_disk_usage(usage):
+    """Publish a DiskUsage result (dict with total_gb/used_gb/free_gb and source)"""
+    if not usage:
+        return
+    for state in ('total', 'used', 'free'):
+        DISK_BYTES.set(int(usage[f'{state}_gb'] * 1024 ** 3), source=usage.get('source', 'unknown'), state=state)
+
+
+@REGISTRY.add_collector
+def _plex_http_lines():
+    """Plex request statistics from plex_http_metrics"""
+    from plex_http_metrics import plex_http_stats
+
+    endpoints = plex_http_stats.snapshot()['endpoints']
+    lines = [
+        "# HELP plex_manager_plex_requests_total Requests made to Plex",
+        "# TYPE plex_manager_plex_requests_total counter",
+    ]
+    lines += [f"plex_manager_plex_requests_total{_labels(('endpoint',), (endpoint,))} {stats['requests']}"
+              for endpoint, stats in endpoints.items()]
+    lines += [
+        "# HELP plex_manager_plex_request_errors_total Plex requests answered with an HTTP error",
+        "# TYPE plex_manager_plex_request_errors_total counter",
+    ]
+    lines += [f"plex_manager_plex_request_errors_total{_labels(('endpoint',), (endpoint,))} {stats['errors']}"
+              for endpoint, stats in endpoints.items()]
+    lines += [
+        "# HELP plex_manager_plex_received_bytes_total Bytes received from Plex",
+        "# TYPE plex_manager_plex_received_bytes_total counter",
+    ]
+    lines += [f"plex_manager_plex_received_bytes_total{_labels(('endpoint',), (endpoint,))} {stats['bytes']}"
+              for endpoint, stats in endpoints.items()]
+    lines += [
+        "# HELP plex_manager_plex_request_duration_seconds Plex request latency",
+        "# TYPE plex_manager_plex_request_duration_seconds histogram",
+    ]
+    for endpoint, stats in endpoints.items():
+        for bound, count in stats['latencyBuckets'].items():
+            lines.append(f"plex_manager_plex_request_duration_seconds_bucket"
+                         f"{_labels(('endpoint',), (endpoint,), ('le', bound))} {count}")
+        lines.append(f"plex_manager_plex_request_duration_seconds_sum{_labels(('endpoint',), (endpoint,))} "
+                     f"{_format_value(stats['seconds'])}")
+        lines.append(f"plex_manager_plex_request_duration_seconds_count{_labels(('endpoint',), (endpoint,))} "
+                     f"{stats['requests']}")
+    return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, addr='0.0.0.0'):
+    """
+    Serve /metrics from a daemon thread (for processes without a web server, like the bot)
+
+    Returns:
+        The running ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"✓ Metrics on http://{addr}:{server.server_address[1]}/metrics")
+    return server
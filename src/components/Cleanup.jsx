@@ -11,6 +11,7 @@ function Cleanup() {
   const [daysAdded, setDaysAdded] = useState(0)
   const [totalCount, setTotalCount] = useState(0)
   const [totalSize, setTotalSize] = useState(0)
+  const [deleteProgress, setDeleteProgress] = useState(null)
 
   const fetchMovies = async () => {
     try {
@@ -88,17 +89,19 @@ function Cleanup() {
         movieKeys
       })
 
-      const result = response.data
+      setDeleteProgress({ succeeded: 0, failed: 0, total: response.data.total })
+      const job = await waitForJob(response.data.jobId, setDeleteProgress)
+
+      const failedItems = job.items.filter(item => item.status === 'failed')
+      const freedGB = (job.bytesFreed / (1024 * 1024 * 1024)).toFixed(2)
 
       let message = `✅ Deletion Complete!\n\n`
-      message += `✓ Successfully deleted: ${result.deletedCount} movies\n`
-      message += `💾 Space freed: ${result.deletedSizeGB} GB\n`
+      message += `✓ Successfully deleted: ${job.succeeded} movies\n`
+      message += `💾 Space freed: ${freedGB} GB\n`
 
-      if (result.failedCount > 0) {
-        message += `\n❌ Failed to delete: ${result.failedCount} movies\n`
-        if (result.errors && result.errors.length > 0) {
-          message += `\nErrors:\n${result.errors.join('\n')}`
-        }
+      if (failedItems.length > 0) {
+        message += `\n❌ Failed to delete: ${failedItems.length} movies\n`
+        message += `\nErrors:\n${failedItems.map(item => `${item.title || item.key}: ${item.error}`).join('\n')}`
       }
 
       alert(message)
@@ -109,10 +112,44 @@ function Cleanup() {
     } catch (err) {
       alert(`❌ Error during deletion: ${err.response?.data?.error || err.message}`)
     } finally {
+      setDeleteProgress(null)
       setLoading(false)
     }
   }
 
+  // Follow a background job over SSE (falling back to polling) until it finishes
+  const waitForJob = (jobId, onProgress) => new Promise((resolve, reject) => {
+    const poll = async () => {
+      try {
+        const response = await axios.get(`${API_BASE}/jobs/${jobId}`)
+        onProgress(response.data)
+        if (response.data.status === 'completed' || response.data.status === 'failed') {
+          resolve(response.data)
+        } else {
+          setTimeout(poll, 2000)
+        }
+      } catch (err) {
+        reject(err)
+      }
+    }
+
+    if (!window.EventSource) {
+      poll()
+      return
+    }
+
+    const events = new EventSource(`${API_BASE}/jobs/${jobId}/events`)
+    events.addEventListener('progress', (e) => onProgress(JSON.parse(e.data)))
+    events.addEventListener('done', (e) => {
+      events.close()
+      resolve(JSON.parse(e.data))
+    })
+    events.onerror = () => {
+      events.close()
+      poll()
+    }
+  })
+
   return (
     <div className="cleanup">
       <h1>Media Cleanup</h1>
@@ -162,6 +199,12 @@ function Cleanup() {
           <div className="summary">
             <p><strong>Total Found:</strong> {totalCount} movies ({totalSize} GB)</p>
             <p><strong>Selected:</strong> {selectedMovies.size} movies ({getSelectedSize()} GB)</p>
+            {deleteProgress && (
+              <p>
+                <strong>Deleting:</strong> {deleteProgress.succeeded + deleteProgress.failed} of {deleteProgress.total} done
+                {deleteProgress.failed > 0 && ` (${deleteProgress.failed} failed)`}
+              </p>
+            )}
           </div>
 
           <div className="actions">
@@ -171,9 +214,9 @@ function Cleanup() {
             <button
               className="btn-danger"
               onClick={handleDelete}
-              disabled={selectedMovies.size === 0}
+              disabled={selectedMovies.size === 0 || deleteProgress !== null}
             >
-              Delete Selected
+              {deleteProgress ? 'Deleting...' : 'Delete Selected'}
             </button>
           </div>
 
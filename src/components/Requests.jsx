@@ -2,9 +2,15 @@ import { useState, useEffect } from 'react'
 import axios from 'axios'
 import { API_BASE } from '../config'
 
+const PAGE_SIZE = 20
+
 function Requests() {
   const [requests, setRequests] = useState([])
+  const [total, setTotal] = useState(0)
+  const [page, setPage] = useState(0)
+  const [filters, setFilters] = useState({ status: '', type: '', requestedBy: '' })
   const [loading, setLoading] = useState(true)
+  const [syncing, setSyncing] = useState(false)
   const [showForm, setShowForm] = useState(false)
   const [formData, setFormData] = useState({
     title: '',
@@ -16,13 +22,18 @@ function Requests() {
 
   useEffect(() => {
     fetchRequests()
-  }, [])
+  }, [page, filters])
 
   const fetchRequests = async () => {
     try {
       setLoading(true)
-      const response = await axios.get(`${API_BASE}/requests`)
+      const params = { limit: PAGE_SIZE, offset: page * PAGE_SIZE }
+      Object.entries(filters).forEach(([key, value]) => {
+        if (value) params[key] = value
+      })
+      const response = await axios.get(`${API_BASE}/requests`, { params })
       setRequests(response.data.requests)
+      setTotal(response.data.total)
     } catch (err) {
       alert(`Error fetching requests: ${err.message}`)
     } finally {
@@ -51,21 +62,56 @@ function Requests() {
         notes: ''
       })
       setShowForm(false)
-      fetchRequests()
+      if (page === 0) {
+        fetchRequests()
+      } else {
+        setPage(0)
+      }
     } catch (err) {
       alert(`Error submitting request: ${err.message}`)
     }
   }
 
-  const updateRequestStatus = async (requestId, newStatus) => {
+  const updateRequestStatus = async (request, newStatus) => {
     try {
-      await axios.patch(`${API_BASE}/requests/${requestId}`, { status: newStatus })
+      await axios.patch(`${API_BASE}/requests/${request.id}`, {
+        status: newStatus,
+        version: request.version
+      })
       fetchRequests()
     } catch (err) {
-      alert(`Error updating request: ${err.message}`)
+      if (err.response?.status === 409) {
+        alert(`"${request.title}" was changed by someone else (now ${err.response.data.request.status}). Reloading.`)
+        fetchRequests()
+      } else {
+        alert(`Error updating request: ${err.message}`)
+      }
     }
   }
 
+  const checkLibrary = async () => {
+    try {
+      setSyncing(true)
+      const response = await axios.post(`${API_BASE}/requests/sync`)
+      const fulfilled = response.data.fulfilled
+      alert(fulfilled.length
+        ? `Completed ${fulfilled.length} request(s) now in Plex: ${fulfilled.map((r) => r.title).join(', ')}`
+        : 'No open requests are in Plex yet.')
+      fetchRequests()
+    } catch (err) {
+      alert(`Error checking library: ${err.response?.data?.error || err.message}`)
+    } finally {
+      setSyncing(false)
+    }
+  }
+
+  const updateFilter = (key, value) => {
+    setFilters({ ...filters, [key]: value })
+    setPage(0)
+  }
+
+  const pageCount = Math.max(1, Math.ceil(total / PAGE_SIZE))
+
   const getStatusBadge = (status) => {
     const classes = {
       pending: 'badge-pending',
@@ -90,6 +136,9 @@ function Requests() {
         <button className="btn-secondary" onClick={fetchRequests}>
           Refresh
         </button>
+        <button className="btn-secondary" onClick={checkLibrary} disabled={syncing}>
+          {syncing ? 'Checking...' : 'Check Library'}
+        </button>
       </div>
 
       {showForm && (
@@ -156,7 +205,39 @@ function Requests() {
       )}
 
       <div className="request-list">
-        <h2>All Requests ({requests.length})</h2>
+        <h2>All Requests ({total})</h2>
+
+        <div className="filters">
+          <div className="filter-group">
+            <label>Status:</label>
+            <select value={filters.status} onChange={(e) => updateFilter('status', e.target.value)}>
+              <option value="">All</option>
+              <option value="pending">Pending</option>
+              <option value="approved">Approved</option>
+              <option value="rejected">Rejected</option>
+              <option value="completed">Completed</option>
+            </select>
+          </div>
+
+          <div className="filter-group">
+            <label>Type:</label>
+            <select value={filters.type} onChange={(e) => updateFilter('type', e.target.value)}>
+              <option value="">All</option>
+              <option value="movie">Movie</option>
+              <option value="tv">TV Show</option>
+            </select>
+          </div>
+
+          <div className="filter-group">
+            <label>Requested By:</label>
+            <input
+              type="text"
+              value={filters.requestedBy}
+              onChange={(e) => updateFilter('requestedBy', e.target.value)}
+              placeholder="Anyone"
+            />
+          </div>
+        </div>
 
         {loading && <p>Loading requests...</p>}
 
@@ -178,21 +259,21 @@ function Requests() {
             <div className="request-actions">
               <button
                 className="btn-success"
-                onClick={() => updateRequestStatus(request.id, 'approved')}
+                onClick={() => updateRequestStatus(request, 'approved')}
                 disabled={request.status === 'approved'}
               >
                 Approve
               </button>
               <button
                 className="btn-danger"
-                onClick={() => updateRequestStatus(request.id, 'rejected')}
+                onClick={() => updateRequestStatus(request, 'rejected')}
                 disabled={request.status === 'rejected'}
               >
                 Reject
               </button>
               <button
                 className="btn-secondary"
-                onClick={() => updateRequestStatus(request.id, 'completed')}
+                onClick={() => updateRequestStatus(request, 'completed')}
                 disabled={request.status === 'completed'}
               >
                 Mark Complete
@@ -200,6 +281,22 @@ function Requests() {
             </div>
           </div>
         ))}
+
+        {total > PAGE_SIZE && (
+          <div className="pagination">
+            <button className="btn-secondary" onClick={() => setPage(page - 1)} disabled={page === 0}>
+              Previous
+            </button>
+            <span>Page {page + 1} of {pageCount}</span>
+            <button
+              className="btn-secondary"
+              onClick={() => setPage(page + 1)}
+              disabled={page + 1 >= pageCount}
+            >
+              Next
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -119,6 +119,12 @@ export const AuthProvider = ({ children }) => {
   }
 
   const logout = () => {
+    // Revoke the token server-side; local logout proceeds regardless
+    if (token) {
+      axios.post(`${API_BASE}/auth/logout`, null, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {})
+    }
     setToken(null)
     setUser(null)
     localStorage.removeItem('authToken')
@@ -34,6 +34,12 @@ export TELEGRAM_CHAT_ID="$TELEGRAM_CHAT_ID"
 export SSH_HOST="$SSH_HOST"
 export SSH_USER="$SSH_USER"
 export REMOTE_PATH="$REMOTE_PATH"
+export METRICS_PORT="$METRICS_PORT"
+export CLEANUP_POLICY_FILE="$CLEANUP_POLICY_FILE"
+export TV_SEASON_DAYS="${TV_SEASON_DAYS:-30}"
+export TV_ABANDONED_DAYS="${TV_ABANDONED_DAYS:-180}"
+export TV_EPISODE_DAYS="$TV_EPISODE_DAYS"
+export WATCH_HISTORY="${WATCH_HISTORY:-1}"
 
 echo "============================================"
 echo "Starting Plex Cleanup Telegram Bot"
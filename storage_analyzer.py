@@ -9,18 +9,28 @@ from collections import defaultdict
 from typing import Dict, List, Tuple, Optional
 import os
 
+from plex_http_metrics import plex_operation
+from prometheus_metrics import SCAN_SECONDS, MEDIA_BYTES
+from tracing import span, traced
+
 try:
     from disk_utils import DiskUsage
 except ImportError:
     DiskUsage = None
 
+try:
+    from dir_size_cache import DirectorySizeCache
+except ImportError:
+    DirectorySizeCache = None
+
 logger = logging.getLogger(__name__)
 
 
 class StorageAnalyzer:
     """Analyze storage usage across Plex libraries"""
 
-    def __init__(self, plex_server, total_capacity_gb: float = 3700, ssh_host: Optional[str] = None, ssh_user: Optional[str] = None):
+    def __init__(self, plex_server, total_capacity_gb: float = 3700, ssh_host: Optional[str] = None, ssh_user: Optional[str] = None,
+                 download_root: Optional[str] = None, dir_cache=None):
         """
         Initialize storage analyzer
 
@@ -29,12 +39,16 @@ class StorageAnalyzer:
             total_capacity_gb: Total storage capacity in GB
             ssh_host: SSH hostname for remote disk usage
             ssh_user: SSH username for remote disk usage
+            download_root: Local download folder to report on-disk folder sizes for (optional)
+            dir_cache: DirectorySizeCache instance (optional, created on demand)
         """
         self.plex = plex_server
         self.total_capacity_gb = total_capacity_gb
         self.ssh_host = ssh_host
         self.ssh_user = ssh_user
         self.disk_checker = DiskUsage(ssh_host, ssh_user) if DiskUsage else None
+        self.download_root = download_root
+        self.dir_cache = dir_cache
 
     def categorize_path(self, file_path: str, base_path: str = "/desispeed/Downloads") -> str:
         """
@@ -72,6 +86,9 @@ class StorageAnalyzer:
                     return parts[0]
             return "Other"
 
+    @plex_operation('analyze_storage')
+    @SCAN_SECONDS.time(scan='analyze_storage')
+    @traced('analyze_storage')
     def analyze_storage(self) -> Dict:
         """
         Analyze storage usage across all libraries
@@ -85,67 +102,84 @@ class StorageAnalyzer:
         library_stats = {}
 
         try:
-            sections = self.plex.library.sections()
+            with span('sections.fetch') as fetch:
+                sections = self.plex.library.sections()
+                fetch.set('sections', len(sections))
 
             for section in sections:
                 logger.info(f"Scanning: {section.title}")
 
                 try:
-                    items = section.all()
+                    with span('section.fetch', section=section.title) as fetch:
+                        items = section.all()
+                        fetch.set('items', len(items))
                     section_size = 0
                     item_count = 0
 
-                    for item in items:
-                        item_count += 1
+                    # Walking the items is where plexapi lazily loads media, episodes and tracks
+                    with span('section.hydrate', section=section.title) as hydrate:
+                        for item in items:
+                            item_count += 1
+
+                            try:
+                                # For TV shows, get episodes
+                                if section.type == 'show':
+                                    with span('episodes.fetch') as fetch:
+                                        episodes = item.episodes()
+                                        fetch.set('episodes', len(episodes))
+                                    for episode in episodes:
+                                        for media in episode.media:
+                                            for part in media.parts:
+                                                if hasattr(part, 'file') and hasattr(part, 'size') and part.size:
+                                                    file_path = part.file
+                                                    size = part.size
+                                                    section_size += size
+                                                    hydrate.count('files')
+
+                                                    category = self.categorize_path(file_path)
+                                                    folder_stats[category]['size_gb'] += size / (1024**3)
+                                                    folder_stats[category]['count'] += 1
+                                                    folder_stats[category]['paths'].add(os.path.dirname(file_path))
 
-                        try:
-                            # For TV shows, get episodes
-                            if section.type == 'show':
-                                for episode in item.episodes():
-                                    for media in episode.media:
+                                # For movies and music
+                                elif hasattr(item, 'media'):
+                                    for media in item.media:
                                         for part in media.parts:
                                             if hasattr(part, 'file') and hasattr(part, 'size') and part.size:
                                                 file_path = part.file
                                                 size = part.size
                                                 section_size += size
+                                                hydrate.count('files')
 
                                                 category = self.categorize_path(file_path)
                                                 folder_stats[category]['size_gb'] += size / (1024**3)
                                                 folder_stats[category]['count'] += 1
                                                 folder_stats[category]['paths'].add(os.path.dirname(file_path))
 
-                            # For movies and music
-                            elif hasattr(item, 'media'):
-                                for media in item.media:
-                                    for part in media.parts:
-                                        if hasattr(part, 'file') and hasattr(part, 'size') and part.size:
-                                            file_path = part.file
-                                            size = part.size
-                                            section_size += size
-
-                                            category = self.categorize_path(file_path)
-                                            folder_stats[category]['size_gb'] += size / (1024**3)
-                                            folder_stats[category]['count'] += 1
-                                            folder_stats[category]['paths'].add(os.path.dirname(file_path))
-
-                            # For music artists/albums
-                            elif section.type == 'artist':
-                                for album in item.albums():
-                                    for track in album.tracks():
+                                # For music artists/albums
+                                elif section.type == 'artist':
+                                    with span('tracks.fetch') as fetch:
+                                        tracks = [track for album in item.albums() for track in album.tracks()]
+                                        fetch.set('tracks', len(tracks))
+                                    for track in tracks:
                                         for media in track.media:
                                             for part in media.parts:
                                                 if hasattr(part, 'file') and hasattr(part, 'size') and part.size:
                                                     file_path = part.file
                                                     size = part.size
                                                     section_size += size
+                                                    hydrate.count('files')
 
                                                     category = self.categorize_path(file_path)
                                                     folder_stats[category]['size_gb'] += size / (1024**3)
                                                     folder_stats[category]['count'] += 1
                                                     folder_stats[category]['paths'].add(os.path.dirname(file_path))
 
-                        except Exception as e:
-                            continue
+                            except Exception as e:
+                                hydrate.count('errors')
+                                continue
+
+                        hydrate.set('items', item_count)
 
                     section_size_gb = section_size / (1024**3)
                     library_stats[section.title] = {
@@ -153,16 +187,23 @@ class StorageAnalyzer:
                         'size_gb': section_size_gb,
                         'count': item_count
                     }
+                    MEDIA_BYTES.set(section_size, library=section.title)
 
                 except Exception as e:
                     logger.error(f"Error scanning {section.title}: {e}")
 
             # Calculate totals
-            total_used_gb = sum(stats['size_gb'] for stats in folder_stats.values())
-            free_gb = self.total_capacity_gb - total_used_gb
+            with span('aggregate', folders=len(folder_stats)):
+                total_used_gb = sum(stats['size_gb'] for stats in folder_stats.values())
+                free_gb = self.total_capacity_gb - total_used_gb
+
+            # On-disk folder sizes are part of the analysis so formatting never touches the filesystem
+            with span('folders.scan'):
+                folder_sizes = self.get_folder_sizes()
 
             return {
                 'folder_stats': dict(folder_stats),
+                'folder_sizes': folder_sizes,
                 'library_stats': library_stats,
                 'total_used_gb': total_used_gb,
                 'free_gb': free_gb,
@@ -185,6 +226,41 @@ class StorageAnalyzer:
 
         return self.disk_checker.get_disk_usage(prefer_remote=True, remote_path="/home32")
 
+    def get_folder_sizes(self, root: Optional[str] = None) -> List[Dict]:
+        """
+        Get on-disk sizes of the folders directly under the download root
+
+        Uses the incremental directory size cache, so only folders that changed
+        since the last run are re-listed.
+
+        Args:
+            root: Folder to report on (default: download_root)
+
+        Returns:
+            List of folder dictionaries (path, size_gb, file_count), largest first
+        """
+        root = root or self.download_root
+        if not root:
+            return []
+
+        if self.dir_cache is None:
+            if not DirectorySizeCache:
+                logger.warning("DirectorySizeCache module not available")
+                return []
+            self.dir_cache = DirectorySizeCache()
+
+        self.dir_cache.scan(root)
+
+        return [
+            {
+                'path': child['path'],
+                'size_gb': child['size_bytes'] / (1024**3),
+                'file_count': child['file_count']
+            }
+            for child in self.dir_cache.children(root)
+        ]
+
+    @traced('format_cli_report')
     def format_cli_report(self, stats: Dict) -> str:
         """
         Format storage statistics for CLI display
@@ -236,6 +312,20 @@ class StorageAnalyzer:
                 lines.append(self.disk_checker.format_disk_usage(disk_usage))
                 lines.append("\n")
 
+        # Add on-disk folder sizes if a download root is configured
+        folder_sizes = stats.get('folder_sizes')
+        if folder_sizes:
+            lines.append("=" * 100)
+            lines.append(f"ON-DISK FOLDER SIZES ({self.download_root})")
+            lines.append("=" * 100)
+            lines.append(f"{'Folder':<60} {'Files':<10} {'Size (GB)':<15}")
+            lines.append("-" * 100)
+            for folder in folder_sizes:
+                name = os.path.basename(folder['path'])
+                name = name[:57] + '...' if len(name) > 60 else name
+                lines.append(f"{name:<60} {folder['file_count']:<10} {folder['size_gb']:<15.2f}")
+            lines.append("")
+
         lines.append("=" * 100)
         lines.append("DETAILED BREAKDOWN BY MEDIA TYPE")
         lines.append("=" * 100)
@@ -284,6 +374,7 @@ class StorageAnalyzer:
 
         return "\n".join(lines)
 
+    @traced('format_telegram_report')
     def format_telegram_report(self, stats: Dict) -> str:
         """
         Format storage statistics for Telegram
@@ -8,11 +8,20 @@ import os
 import sys
 import logging
 import asyncio
+from typing import List
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters, CallbackQueryHandler
 from plex_cleanup import PlexCleanup
 from storage_analyzer import StorageAnalyzer
 from disk_utils import DiskUsage
+from deletion_journal import DeletionJournal
+from cleanup_policy import default_policy
+from watch_history import WATCH_HISTORY_ENABLED, default_history
+from tv_cleanup import (DEFAULT_ABANDONED_DAYS, DEFAULT_WATCHED_SEASON_DAYS, TVCleanup, flatten_episodes,
+                        format_telegram_tv_summary)
+from plex_http_metrics import plex_operation
+from prometheus_metrics import BOT_COMMAND_SECONDS, record_deletion, start_metrics_server
+from profiling import FORMATS as PROFILE_FORMATS, Profiler, ProfilerBusyError, profile_path
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,17 +32,28 @@ logger = logging.getLogger(__name__)
 # Configuration
 PLEX_URL = os.getenv('PLEX_URL')
 PLEX_TOKEN = os.getenv('PLEX_TOKEN')
-MAX_VIEWS = int(os.getenv('MAX_VIEWS', '1'))
+# Override the cleanup policy (CLEANUP_POLICY_FILE, default: 1 view or less) when set
+MAX_VIEWS = int(os.getenv('MAX_VIEWS')) if os.getenv('MAX_VIEWS') else None
 DAYS_NOT_WATCHED = int(os.getenv('DAYS_NOT_WATCHED', '30')) if os.getenv('DAYS_NOT_WATCHED') else None
+# TV cleanup rules (/tv): days since a fully watched season / a partly watched show was last played,
+# and since a watched episode was last played (unset: off)
+TV_SEASON_DAYS = int(os.getenv('TV_SEASON_DAYS', DEFAULT_WATCHED_SEASON_DAYS))
+TV_ABANDONED_DAYS = int(os.getenv('TV_ABANDONED_DAYS', DEFAULT_ABANDONED_DAYS))
+TV_EPISODE_DAYS = int(os.getenv('TV_EPISODE_DAYS')) if os.getenv('TV_EPISODE_DAYS') else None
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 AUTHORIZED_CHAT_ID = int(os.getenv('TELEGRAM_CHAT_ID'))
 SSH_HOST = os.getenv('SSH_HOST', 'mirror.seedhost.eu')
 SSH_USER = os.getenv('SSH_USER', 'desispeed')
 REMOTE_PATH = os.getenv('REMOTE_PATH', '/home32')
+# Serve Prometheus metrics on this port (disabled if unset)
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
 
 # Global state for pending deletions
 pending_deletion = {}
 
+# Chats that asked (/profile) for their next command to be profiled: {chat_id: format}
+pending_profile = {}
+
 
 def check_authorization(func):
     """Decorator to check if user is authorized"""
@@ -43,10 +63,35 @@ def check_authorization(func):
             await update.message.reply_text("⛔ Unauthorized. You are not allowed to use this bot.")
             logger.warning(f"Unauthorized access attempt from chat_id: {chat_id}")
             return
-        return await func(update, context)
+        fmt = pending_profile.pop(chat_id, None) if func.__name__ != 'profile_command' else None
+        if fmt:
+            return await run_profiled(func, fmt, update, context)
+        # Logs "<command>: N Plex requests, X MB, Y s" for commands that talk to Plex
+        with plex_operation(func.__name__), BOT_COMMAND_SECONDS.time(command=func.__name__):
+            return await func(update, context)
     return wrapper
 
 
+async def run_profiled(func, fmt, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Run a command under the profiler and send the profile file back to the chat"""
+    try:
+        profiler = Profiler(profile_path(func.__name__, fmt), fmt, name=func.__name__).start()
+    except ProfilerBusyError as e:
+        await update.message.reply_text(f"⚠️ {e}, running /{func.__name__} without it.")
+        profiler = None
+
+    try:
+        with plex_operation(func.__name__), BOT_COMMAND_SECONDS.time(command=func.__name__):
+            return await func(update, context)
+    finally:
+        if profiler:
+            path = profiler.stop()
+            with open(path, 'rb') as f:
+                await update.message.reply_document(
+                    f, filename=os.path.basename(path), caption=f"📊 Profile of {func.__name__} ({fmt})"
+                )
+
+
 @check_authorization
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -55,11 +100,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Control your Plex media cleanup remotely!\n\n"
         "Available commands:\n"
         "/preview - Show movies that would be deleted\n"
+        "/tv - Show watched seasons and abandoned shows to delete\n"
         "/select - Select movies interactively with buttons\n"
-        "/delete - Delete movies (type numbers or 'all')\n"
+        "/delete - Delete movies or TV (type numbers or 'all')\n"
+        "/resume - Finish an interrupted deletion\n"
         "/space - Analyze Plex media storage\n"
         "/disk - Check actual disk usage\n"
         "/status - Show current configuration\n"
+        "/profile - Profile the next command\n"
         "/help - Show this help message",
         parse_mode='HTML'
     )
@@ -74,13 +122,21 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @check_authorization
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /status command"""
-    days_text = f"{DAYS_NOT_WATCHED} days" if DAYS_NOT_WATCHED else "Disabled"
+    policy = default_policy().merged(max_views=MAX_VIEWS, days_not_watched=DAYS_NOT_WATCHED)
+    days_text = f"{policy.days_not_watched} days" if policy.days_not_watched else "Disabled"
+    history_text = "all accounts" if WATCH_HISTORY_ENABLED else "token owner only"
+    tv_text = f"seasons watched {TV_SEASON_DAYS}+ days ago, shows abandoned {TV_ABANDONED_DAYS}+ days"
+    if TV_EPISODE_DAYS is not None:
+        tv_text += f", episodes watched {TV_EPISODE_DAYS}+ days ago"
 
     await update.message.reply_text(
         "⚙️ <b>Current Configuration</b>\n\n"
         f"🖥 Server: {PLEX_URL}\n"
-        f"👁 Max Views: {MAX_VIEWS}\n"
-        f"📅 Time Filter: {days_text}\n",
+        f"👁 Max Views: {policy.max_views}\n"
+        f"📅 Time Filter: {days_text}\n"
+        f"📋 Policy: {policy.describe()}\n"
+        f"📺 TV: {tv_text}\n"
+        f"👥 Views counted: {history_text}\n",
         parse_mode='HTML'
     )
 
@@ -147,7 +203,8 @@ async def preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Get unwatched movies
         movies = cleanup.get_unwatched_movies(
             max_view_count=MAX_VIEWS,
-            days_since_watched=DAYS_NOT_WATCHED
+            days_since_watched=DAYS_NOT_WATCHED,
+            history=default_history()
         )
 
         if not movies:
@@ -176,6 +233,38 @@ async def preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Error: {str(e)}")
 
 
+@check_authorization
+async def tv_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /tv command - preview TV cleanup candidates"""
+    await update.message.reply_text("🔍 Scanning your TV libraries...\nThis may take a moment...")
+
+    try:
+        cleanup = PlexCleanup(PLEX_URL, PLEX_TOKEN)
+        groups = TVCleanup(cleanup.plex).find_candidates(TV_SEASON_DAYS, TV_ABANDONED_DAYS, TV_EPISODE_DAYS,
+                                                         history=default_history())
+
+        for message in format_telegram_tv_summary(groups):
+            await update.message.reply_text(message, parse_mode='HTML')
+        if not groups:
+            return
+
+        # /delete and /select work on the numbered shows/seasons; execute_deletion expands them to episodes
+        pending_deletion[update.effective_chat.id] = groups
+        context.user_data['selected_indices'] = set()
+
+        await update.message.reply_text(
+            "💡 <b>What would you like to do?</b>\n\n"
+            "• <code>/delete all</code> - Delete everything listed\n"
+            "• <code>/delete 1,5,10</code> - Delete specific shows/seasons by number\n"
+            "• <code>/select</code> - Select interactively with buttons",
+            parse_mode='HTML'
+        )
+
+    except Exception as e:
+        logger.error(f"Error in TV preview: {e}")
+        await update.message.reply_text(f"❌ Error: {str(e)}")
+
+
 @check_authorization
 async def select_movies(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /select command - show interactive movie selection"""
@@ -336,7 +425,7 @@ async def handle_selection_callback(update: Update, context: ContextTypes.DEFAUL
         # Show first 5 selected movies
         for movie in selected_movies[:5]:
             title = movie['title'][:30] + '...' if len(movie['title']) > 30 else movie['title']
-            summary += f"• {title} ({movie['year']}) - {movie['file_size_mb']:.0f} MB\n"
+            summary += f"• {title}{year_suffix(movie)} - {movie['file_size_mb']:.0f} MB\n"
 
         if len(selected_movies) > 5:
             summary += f"... and {len(selected_movies) - 5} more\n"
@@ -354,6 +443,11 @@ async def handle_selection_callback(update: Update, context: ContextTypes.DEFAUL
         await query.edit_message_text("✅ Selection cancelled.")
 
 
+def year_suffix(item) -> str:
+    """' (1999)' for a movie, '' for TV items without a year"""
+    return f" ({item['year']})" if item.get('year') else ''
+
+
 def parse_movie_selection(selection: str, total_movies: int) -> List[int]:
     """
     Parse movie selection string and return list of movie indices
@@ -438,11 +532,11 @@ async def delete_movies(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if len(selected_movies) <= 5:
             for movie in selected_movies:
                 title = movie['title'][:30] + '...' if len(movie['title']) > 30 else movie['title']
-                summary += f"• {title} ({movie['year']}) - {movie['file_size_mb']:.0f} MB\n"
+                summary += f"• {title}{year_suffix(movie)} - {movie['file_size_mb']:.0f} MB\n"
         else:
             for movie in selected_movies[:5]:
                 title = movie['title'][:30] + '...' if len(movie['title']) > 30 else movie['title']
-                summary += f"• {title} ({movie['year']}) - {movie['file_size_mb']:.0f} MB\n"
+                summary += f"• {title}{year_suffix(movie)} - {movie['file_size_mb']:.0f} MB\n"
             summary += f"... and {len(selected_movies) - 5} more\n"
 
         summary += f"\n<b>To confirm, reply with:</b> <code>CONFIRM DELETE</code>\n"
@@ -502,6 +596,9 @@ async def execute_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not movies:
         await update.message.reply_text("❌ No movies to delete.")
         return
+    # TV shows and seasons from /tv are deleted episode by episode
+    if 'episodes' in movies[0]:
+        movies = flatten_episodes(movies)
     await update.message.reply_text(
         f"🗑 <b>Starting deletion of {len(movies)} movies...</b>\n"
         f"This may take a few minutes.",
@@ -509,30 +606,37 @@ async def execute_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
     try:
-        # Initialize Plex cleanup
-        cleanup = PlexCleanup(PLEX_URL, PLEX_TOKEN)
-
         deleted_count = 0
         failed_count = 0
-
-        # Delete movies one by one
-        for idx, movie in enumerate(movies, 1):
-            try:
-                movie['plex_object'].delete()
-                deleted_count += 1
-
-                # Send progress update every 10 movies
-                if idx % 10 == 0:
-                    await update.message.reply_text(
-                        f"⏳ Progress: {idx}/{len(movies)} movies processed..."
-                    )
-
-            except Exception as e:
-                logger.error(f"Failed to delete {movie['title']}: {e}")
-                failed_count += 1
+        deleted_size_mb = 0
+
+        # Journal the run so /resume can finish it after a crash or restart
+        with DeletionJournal() as journal:
+            run_id = journal.start_run(movies, source='telegram')
+
+            # Delete movies one by one
+            for idx, movie in enumerate(movies, 1):
+                try:
+                    movie['plex_object'].delete()
+                    deleted_count += 1
+                    deleted_size_mb += movie['file_size_mb']
+                    journal.record_deleted(run_id, movie['plex_object'].ratingKey, movie['file_size_mb'] * 1024 * 1024)
+                    record_deletion('telegram', movie['file_size_mb'] * 1024 * 1024)
+
+                    # Send progress update every 10 movies
+                    if idx % 10 == 0:
+                        await update.message.reply_text(
+                            f"⏳ Progress: {idx}/{len(movies)} movies processed..."
+                        )
+
+                except Exception as e:
+                    logger.error(f"Failed to delete {movie['title']}: {e}")
+                    failed_count += 1
+                    journal.record_failed(run_id, movie['plex_object'].ratingKey, e)
+                    record_deletion('telegram', failed=True)
 
         # Calculate freed space
-        deleted_size_gb = sum(m['file_size_mb'] for m in movies[:deleted_count]) / 1024
+        deleted_size_gb = deleted_size_mb / 1024
 
         # Send completion message
         completion_msg = f"✅ <b>DELETION COMPLETED</b>\n\n"
@@ -540,6 +644,7 @@ async def execute_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
         completion_msg += f"💾 Space freed: {deleted_size_gb:.2f} GB\n"
         if failed_count > 0:
             completion_msg += f"❌ Failed: {failed_count} movies\n"
+            completion_msg += f"Use /resume to retry them.\n"
 
         await update.message.reply_text(completion_msg, parse_mode='HTML')
 
@@ -552,6 +657,46 @@ async def execute_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Error during deletion: {str(e)}")
 
 
+@check_authorization
+async def resume_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /resume command - finish the last interrupted or partly failed deletion"""
+    try:
+        cleanup = PlexCleanup(PLEX_URL, PLEX_TOKEN)
+
+        with DeletionJournal() as journal:
+            result = cleanup.resume_deletions(journal, confirm=False, source='telegram')
+
+        if not result:
+            await update.message.reply_text("✅ Nothing to resume - the last deletion finished.")
+            return
+
+        message = f"✅ <b>RESUME COMPLETED</b>\n\n"
+        message += f"✓ Deleted: {result['deleted']} items\n"
+        if result['already_gone']:
+            message += f"✓ Already gone: {result['already_gone']} items\n"
+        message += f"💾 Space freed: {result['bytes_freed'] / (1024 ** 3):.2f} GB\n"
+        if result['failed']:
+            message += f"❌ Failed: {result['failed']} items\n"
+
+        await update.message.reply_text(message, parse_mode='HTML')
+
+    except Exception as e:
+        logger.error(f"Error resuming deletion: {e}")
+        await update.message.reply_text(f"❌ Error resuming deletion: {str(e)}")
+
+
+@check_authorization
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /profile [pstats|speedscope] - profile the next command and send the file"""
+    fmt = context.args[0].lower() if context.args else 'pstats'
+    if fmt not in PROFILE_FORMATS:
+        await update.message.reply_text(f"Usage: /profile [{'|'.join(PROFILE_FORMATS)}]")
+        return
+
+    pending_profile[update.effective_chat.id] = fmt
+    await update.message.reply_text(f"📊 The next command will be profiled ({fmt}).")
+
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors"""
     logger.error(f"Update {update} caused error {context.error}")
@@ -571,6 +716,9 @@ async def main_async():
     logger.info("Starting Plex Cleanup Telegram Bot...")
     logger.info(f"Authorized Chat ID: {AUTHORIZED_CHAT_ID}")
 
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
     # Create application
     application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
 
@@ -581,8 +729,11 @@ async def main_async():
     application.add_handler(CommandHandler("space", analyze_space))
     application.add_handler(CommandHandler("disk", check_disk))
     application.add_handler(CommandHandler("preview", preview))
+    application.add_handler(CommandHandler("tv", tv_preview))
     application.add_handler(CommandHandler("select", select_movies))
     application.add_handler(CommandHandler("delete", delete_movies))
+    application.add_handler(CommandHandler("resume", resume_deletion))
+    application.add_handler(CommandHandler("profile", profile_command))
 
     # Add callback query handler for button clicks
     application.add_handler(CallbackQueryHandler(handle_selection_callback))
@@ -0,0 +1,32 @@
+"""
+Environment for tests that import the backend modules in-process
+
+backend/ modules import each other as top-level modules, so backend/ goes on
+sys.path, after the repository root: both have a plex_cleanup.py and the root
+one is the one other tests use. Data files go to a throwaway DATA_DIR.
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'backend')
+
+os.environ.setdefault('PLEX_URL', 'http://127.0.0.1:32400')
+os.environ.setdefault('PLEX_TOKEN', 'test-token')
+if 'DATA_DIR' not in os.environ:
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='plex-manager-tests-')
+    atexit.register(shutil.rmtree, os.environ['DATA_DIR'], ignore_errors=True)
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+# Cheapest bcrypt cost; tests that need another cost set it on the store
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+# No background Plex syncs from the job runner
+os.environ.setdefault('REQUEST_SYNC_SECONDS', '0')
+os.environ.setdefault('LIBRARY_PRUNE_SECONDS', '0')
+
+for path in (REPO_ROOT, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
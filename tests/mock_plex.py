@@ -0,0 +1,729 @@
+#!/usr/bin/env python3
+"""
+Mock Plex Media Server
+Serves a synthetic library over the Plex HTTP/XML API for tests and benchmarks
+
+Covers what plexapi needs for the scan and deletion paths: the server root,
+/library, /library/sections, section listings (with the type, artist.id and
+addedAt filters and filter metadata), show/album/artist children and leaves,
+/library/metadata/<id> (GET and DELETE), the server-wide play history
+(/status/sessions/history/all) and X-Plex-Container paging.
+
+Items are derived from (seed, rating key) on demand, so a 200k item library
+costs no memory up front and is identical on every run.
+
+Usage:
+    python tests/mock_plex.py --items 20000 --port 32400 --latency-ms 5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import multiprocessing
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import quoteattr
+
+# Fixed reference time, so addedAt/lastViewedAt are identical on every run
+BASE_TIME = 1_700_000_000
+DAY = 86400
+MB = 1024 * 1024
+
+# Plex metadata type numbers
+TYPE_IDS = {'movie': 1, 'show': 2, 'season': 3, 'episode': 4, 'artist': 8, 'album': 9, 'track': 10}
+
+# Rating key ranges per kind
+MOVIE_BASE = 1_000_000
+SHOW_BASE = 2_000_000
+EPISODE_BASE = 3_000_000
+ARTIST_BASE = 4_000_000
+ALBUM_BASE = 5_000_000
+TRACK_BASE = 6_000_000
+
+MAX_EPISODES_PER_SHOW = 1000
+MAX_ALBUMS_PER_ARTIST = 100
+MAX_TRACKS_PER_ALBUM = 100
+
+SECTIONS = (
+    {'key': 1, 'type': 'movie', 'title': 'Movies', 'agent': 'tv.plex.agents.movie',
+     'scanner': 'Plex Movie', 'location': '/home32/desispeed/Downloads/Movies'},
+    {'key': 2, 'type': 'show', 'title': 'TV Shows', 'agent': 'tv.plex.agents.series',
+     'scanner': 'Plex TV Series', 'location': '/home32/desispeed/Downloads/TV Shows'},
+    {'key': 3, 'type': 'artist', 'title': 'Music', 'agent': 'tv.plex.agents.music',
+     'scanner': 'Plex Music', 'location': '/home32/desispeed/Downloads/Music'},
+)
+
+ADJECTIVES = ('Silent', 'Crimson', 'Last', 'Hidden', 'Broken', 'Golden', 'Dark', 'Electric', 'Lost', 'Frozen',
+              'Burning', 'Savage', 'Quiet', 'Wild', 'Final', 'Iron', 'Midnight', 'Hollow', 'Bright', 'Endless')
+NOUNS = ('Horizon', 'Empire', 'River', 'Signal', 'Garden', 'Protocol', 'Harbor', 'Witness', 'Kingdom', 'Orbit',
+         'Frontier', 'Shadow', 'Machine', 'Promise', 'Tide', 'Summit', 'Voyage', 'Circuit', 'Legacy', 'Storm')
+RESOLUTIONS = (('4k', 15000, 60000), ('1080', 4000, 15000), ('720', 1500, 5000), ('sd', 700, 1500))
+
+
+def _title(rng, index):
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {index}"
+
+
+def _attrs(**attrs):
+    """Render XML attributes, skipping None values"""
+    return ' '.join(f'{name}={quoteattr(str(value))}' for name, value in attrs.items() if value is not None)
+
+
+class SyntheticLibrary:
+    """
+    Deterministic synthetic Plex library
+
+    Args:
+        movies: Number of movies
+        shows: Number of TV shows
+        episodes_per_show: Episodes per show (10 per season)
+        artists: Number of music artists
+        albums_per_artist: Albums per artist
+        tracks_per_album: Tracks per album
+        multi_version_ratio: Share of movies with a second version (e.g. 4k + 1080p)
+        multi_part_ratio: Share of movie versions split into two files (cd1/cd2)
+        history: Number of plays by other accounts (2-5) in the play history
+        seed: Random seed
+    """
+
+    def __init__(self, movies=1000, shows=0, episodes_per_show=20, artists=0, albums_per_artist=4,
+                 tracks_per_album=10, multi_version_ratio=0.15, multi_part_ratio=0.1, history=0, seed=0):
+        if episodes_per_show > MAX_EPISODES_PER_SHOW:
+            raise ValueError(f"episodes_per_show must be <= {MAX_EPISODES_PER_SHOW}")
+        if albums_per_artist > MAX_ALBUMS_PER_ARTIST or tracks_per_album > MAX_TRACKS_PER_ALBUM:
+            raise ValueError("albums_per_artist and tracks_per_album must be <= 100")
+
+        self.movies = movies
+        self.shows = shows
+        self.episodes_per_show = episodes_per_show
+        self.artists = artists
+        self.albums_per_artist = albums_per_artist
+        self.tracks_per_album = tracks_per_album
+        self.multi_version_ratio = multi_version_ratio
+        self.multi_part_ratio = multi_part_ratio
+        self.history = history
+        self.seed = seed
+        self.deleted = set()
+        self._keys = {}
+        self._plays = None
+
+    @classmethod
+    def scaled(cls, items, seed=0, **kwargs):
+        """
+        Library with about `items` playable items: 50% movies, 35% episodes, 15% tracks
+        """
+        episodes_per_show = kwargs.pop('episodes_per_show', 20)
+        albums_per_artist = kwargs.pop('albums_per_artist', 4)
+        tracks_per_album = kwargs.pop('tracks_per_album', 10)
+        return cls(
+            movies=max(1, items // 2),
+            shows=max(1, int(items * 0.35) // episodes_per_show),
+            episodes_per_show=episodes_per_show,
+            artists=max(1, int(items * 0.15) // (albums_per_artist * tracks_per_album)),
+            albums_per_artist=albums_per_artist,
+            tracks_per_album=tracks_per_album,
+            seed=seed,
+            **kwargs
+        )
+
+    def to_dict(self):
+        """Constructor arguments, for rebuilding the library in another process"""
+        return {
+            'movies': self.movies, 'shows': self.shows, 'episodes_per_show': self.episodes_per_show,
+            'artists': self.artists, 'albums_per_artist': self.albums_per_artist,
+            'tracks_per_album': self.tracks_per_album, 'multi_version_ratio': self.multi_version_ratio,
+            'multi_part_ratio': self.multi_part_ratio, 'history': self.history, 'seed': self.seed,
+        }
+
+    @property
+    def total_items(self):
+        """Movies + episodes + tracks"""
+        return (self.movies + self.shows * self.episodes_per_show
+                + self.artists * self.albums_per_artist * self.tracks_per_album)
+
+    def delete(self, rating_key):
+        """Remove an item, as DELETE /library/metadata/<id> does"""
+        self.deleted.add(rating_key)
+        self._keys.clear()
+
+    def restore(self):
+        """Bring back every deleted item"""
+        self.deleted.clear()
+        self._keys.clear()
+
+    @property
+    def plays(self):
+        """Play history as [history_id, rating_key, viewed_at, account_id], oldest first"""
+        if self._plays is None:
+            rng = random.Random(self.seed ^ 0x5EED)
+            keys = [MOVIE_BASE + i for i in range(self.movies)] + self._episode_keys(None)
+            viewed = sorted(BASE_TIME - rng.randrange(0, 1500 * DAY) for _ in range(self.history if keys else 0))
+            self._plays = [[i + 1, rng.choice(keys), viewed_at, rng.randint(2, 5)] for i, viewed_at in enumerate(viewed)]
+        return self._plays
+
+    def add_play(self, rating_key, account_id, viewed_at):
+        """Record a play, as Plex does when someone finishes watching (thread-served mocks only)"""
+        history_id = self.plays[-1][0] + 1 if self.plays else 1
+        self.plays.append([history_id, rating_key, viewed_at, account_id])
+        return history_id
+
+    def history_xml(self, play):
+        history_id, rating_key, viewed_at, account_id = play
+        kind = self.kind(rating_key) or 'movie'
+        tag = 'Track' if kind == 'track' else 'Video'
+        attrs = _attrs(
+            historyKey=f"/status/sessions/history/{history_id}", key=f"/library/metadata/{rating_key}",
+            ratingKey=rating_key, type=kind, title=f"Item {rating_key}", viewedAt=viewed_at,
+            accountID=account_id, deviceID=1,
+        )
+        return f"<{tag} {attrs}/>"
+
+    def _cached(self, name, build):
+        """Whole-library key lists are rebuilt only after a delete, not on every page"""
+        if name not in self._keys:
+            self._keys[name] = build()
+        return self._keys[name]
+
+    def _rng(self, rating_key):
+        return random.Random((self.seed << 32) ^ rating_key)
+
+    # --- rating keys -------------------------------------------------------
+
+    def movie_keys(self):
+        return self._cached('movie', lambda: [MOVIE_BASE + i for i in range(self.movies)
+                                              if MOVIE_BASE + i not in self.deleted])
+
+    def show_keys(self):
+        return [SHOW_BASE + i for i in range(self.shows) if SHOW_BASE + i not in self.deleted]
+
+    def episode_keys(self, show_key=None):
+        if show_key is None:
+            return self._cached('episode', lambda: self._episode_keys(None))
+        return self._episode_keys(show_key)
+
+    def _episode_keys(self, show_key):
+        shows = [show_key - SHOW_BASE] if show_key else range(self.shows)
+        return [EPISODE_BASE + s * MAX_EPISODES_PER_SHOW + e
+                for s in shows if SHOW_BASE + s not in self.deleted
+                for e in range(self.episodes_per_show)
+                if EPISODE_BASE + s * MAX_EPISODES_PER_SHOW + e not in self.deleted]
+
+    def artist_keys(self):
+        return [ARTIST_BASE + i for i in range(self.artists) if ARTIST_BASE + i not in self.deleted]
+
+    def album_keys(self, artist_key=None):
+        artists = [artist_key - ARTIST_BASE] if artist_key else range(self.artists)
+        return [ALBUM_BASE + a * MAX_ALBUMS_PER_ARTIST + b
+                for a in artists if ARTIST_BASE + a not in self.deleted
+                for b in range(self.albums_per_artist)
+                if ALBUM_BASE + a * MAX_ALBUMS_PER_ARTIST + b not in self.deleted]
+
+    def track_keys(self, album_key=None, artist_key=None):
+        if album_key is None and artist_key is None:
+            return self._cached('track', lambda: self._track_keys(None, None))
+        return self._track_keys(album_key, artist_key)
+
+    def _track_keys(self, album_key, artist_key):
+        if album_key:
+            albums = [album_key]
+        else:
+            albums = self.album_keys(artist_key)
+        return [TRACK_BASE + (album - ALBUM_BASE) * MAX_TRACKS_PER_ALBUM + t
+                for album in albums
+                for t in range(self.tracks_per_album)
+                if TRACK_BASE + (album - ALBUM_BASE) * MAX_TRACKS_PER_ALBUM + t not in self.deleted]
+
+    def kind(self, rating_key):
+        """Item kind for a rating key, or None if it doesn't exist"""
+        if rating_key in self.deleted:
+            return None
+        if MOVIE_BASE <= rating_key < MOVIE_BASE + self.movies:
+            return 'movie'
+        if SHOW_BASE <= rating_key < SHOW_BASE + self.shows:
+            return 'show'
+        if EPISODE_BASE <= rating_key < ARTIST_BASE:
+            s, e = divmod(rating_key - EPISODE_BASE, MAX_EPISODES_PER_SHOW)
+            return 'episode' if s < self.shows and e < self.episodes_per_show else None
+        if ARTIST_BASE <= rating_key < ARTIST_BASE + self.artists:
+            return 'artist'
+        if ALBUM_BASE <= rating_key < TRACK_BASE:
+            a, b = divmod(rating_key - ALBUM_BASE, MAX_ALBUMS_PER_ARTIST)
+            return 'album' if a < self.artists and b < self.albums_per_artist else None
+        if TRACK_BASE <= rating_key:
+            album, t = divmod(rating_key - TRACK_BASE, MAX_TRACKS_PER_ALBUM)
+            a, b = divmod(album, MAX_ALBUMS_PER_ARTIST)
+            if a < self.artists and b < self.albums_per_artist and t < self.tracks_per_album:
+                return 'track'
+        return None
+
+    def added_at(self, rating_key):
+        """addedAt timestamp of an item (cheap, for filtering)"""
+        return BASE_TIME - self._rng(rating_key).randrange(0, 2000) * DAY
+
+    # --- XML -----------------------------------------------------------------
+
+    def _watch_attrs(self, rng):
+        roll = rng.random()
+        view_count = 0 if roll < 0.55 else 1 if roll < 0.8 else rng.randint(2, 10)
+        last_viewed = BASE_TIME - rng.randrange(0, 1500) * DAY if view_count else None
+        return view_count, last_viewed
+
+    def _media_xml(self, rating_key, rng, path_stem, container, versions, parts_per_version, size_range_mb,
+                   resolution=None):
+        media = []
+        for v in range(versions):
+            if resolution is None:
+                res, low, high = RESOLUTIONS[(v + rng.randrange(len(RESOLUTIONS))) % len(RESOLUTIONS)]
+            else:
+                res, (low, high) = resolution, size_range_mb
+            media_id = rating_key * 10 + v
+            parts = []
+            for p in range(parts_per_version[v]):
+                suffix = f".cd{p + 1}" if parts_per_version[v] > 1 else ''
+                file_path = f"{path_stem}{'.' + res if versions > 1 else ''}{suffix}.{container}"
+                parts.append(f"<Part {_attrs(id=media_id * 10 + p, key=f'/library/parts/{media_id * 10 + p}/file.{container}', file=file_path, size=rng.randint(low, high) * MB, container=container)}/>")
+            media.append(
+                f"<Media {_attrs(id=media_id, videoResolution=res if container != 'flac' else None, container=container, duration=rng.randint(60, 200) * 60000)}>"
+                + ''.join(parts) + "</Media>"
+            )
+        return ''.join(media)
+
+    def movie_xml(self, rating_key):
+        rng = self._rng(rating_key)
+        index = rating_key - MOVIE_BASE
+        added_at = BASE_TIME - rng.randrange(0, 2000) * DAY
+        title = _title(rng, index)
+        year = rng.randint(1950, 2024)
+        view_count, last_viewed = self._watch_attrs(rng)
+        versions = 2 if rng.random() < self.multi_version_ratio else 1
+        parts = [2 if rng.random() < self.multi_part_ratio else 1 for _ in range(versions)]
+        folder = f"/home32/desispeed/Downloads/Movies/{title} ({year})"
+        media = self._media_xml(rating_key, rng, f"{folder}/{title} ({year})", 'mkv', versions, parts, None)
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}", guid=f"plex://movie/{rating_key:x}",
+            type='movie', title=title, year=year, librarySectionID=1, librarySectionTitle='Movies',
+            viewCount=view_count or None, lastViewedAt=last_viewed, addedAt=added_at, updatedAt=added_at,
+            rating=round(rng.uniform(3, 9.5), 1), duration=rng.randint(80, 180) * 60000,
+        )
+        return f"<Video {attrs}>{media}</Video>"
+
+    def show_xml(self, rating_key):
+        rng = self._rng(rating_key)
+        index = rating_key - SHOW_BASE
+        added_at = BASE_TIME - rng.randrange(0, 2000) * DAY
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}/children", guid=f"plex://show/{rating_key:x}",
+            type='show', title=f"The {_title(rng, index)}", year=rng.randint(1990, 2024), librarySectionID=2,
+            librarySectionTitle='TV Shows', leafCount=self.episodes_per_show,
+            childCount=(self.episodes_per_show + 9) // 10, addedAt=added_at, updatedAt=added_at,
+        )
+        return f"<Directory {attrs}></Directory>"
+
+    def episode_xml(self, rating_key):
+        s, e = divmod(rating_key - EPISODE_BASE, MAX_EPISODES_PER_SHOW)
+        show_key = SHOW_BASE + s
+        show_title = f"The {_title(self._rng(show_key), s)}"
+        rng = self._rng(rating_key)
+        added_at = BASE_TIME - rng.randrange(0, 2000) * DAY
+        season, episode = divmod(e, 10)
+        view_count, last_viewed = self._watch_attrs(rng)
+        stem = f"/home32/desispeed/Downloads/TV Shows/{show_title}/Season {season + 1:02d}/{show_title} - S{season + 1:02d}E{episode + 1:02d}"
+        media = self._media_xml(rating_key, rng, stem, 'mkv', 1, [1], (300, 3000), resolution='1080')
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}", type='episode',
+            title=f"Episode {episode + 1}", index=episode + 1, parentIndex=season + 1,
+            grandparentRatingKey=show_key, grandparentKey=f"/library/metadata/{show_key}",
+            grandparentTitle=show_title, librarySectionID=2, viewCount=view_count or None,
+            lastViewedAt=last_viewed, addedAt=added_at, updatedAt=added_at,
+        )
+        return f"<Video {attrs}>{media}</Video>"
+
+    def artist_xml(self, rating_key):
+        rng = self._rng(rating_key)
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}/children", type='artist',
+            title=_title(rng, rating_key - ARTIST_BASE), librarySectionID=3, librarySectionTitle='Music',
+            addedAt=BASE_TIME - rng.randrange(0, 2000) * DAY,
+        )
+        return f"<Directory {attrs}></Directory>"
+
+    def album_xml(self, rating_key):
+        a, b = divmod(rating_key - ALBUM_BASE, MAX_ALBUMS_PER_ARTIST)
+        artist_key = ARTIST_BASE + a
+        rng = self._rng(rating_key)
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}/children", type='album',
+            title=f"{_title(rng, b)}", parentRatingKey=artist_key, parentKey=f"/library/metadata/{artist_key}",
+            parentTitle=_title(self._rng(artist_key), a), leafCount=self.tracks_per_album, librarySectionID=3,
+            year=rng.randint(1960, 2024), addedAt=BASE_TIME - rng.randrange(0, 2000) * DAY,
+        )
+        return f"<Directory {attrs}></Directory>"
+
+    def track_xml(self, rating_key):
+        album, t = divmod(rating_key - TRACK_BASE, MAX_TRACKS_PER_ALBUM)
+        album_key = ALBUM_BASE + album
+        a, b = divmod(album, MAX_ALBUMS_PER_ARTIST)
+        artist_title = _title(self._rng(ARTIST_BASE + a), a)
+        album_title = _title(self._rng(album_key), b)
+        rng = self._rng(rating_key)
+        stem = f"/home32/desispeed/Downloads/Music/{artist_title}/{album_title}/{t + 1:02d} - Track {t + 1}"
+        media = self._media_xml(rating_key, rng, stem, 'flac', 1, [1], (20, 60), resolution='audio')
+        attrs = _attrs(
+            ratingKey=rating_key, key=f"/library/metadata/{rating_key}", type='track', title=f"Track {t + 1}",
+            index=t + 1, parentRatingKey=album_key, parentTitle=album_title,
+            grandparentRatingKey=ARTIST_BASE + a, grandparentTitle=artist_title, librarySectionID=3,
+            addedAt=BASE_TIME - rng.randrange(0, 2000) * DAY,
+        )
+        return f"<Track {attrs}>{media}</Track>"
+
+    def item_xml(self, rating_key):
+        """XML element for any item, or None if it doesn't exist"""
+        kind = self.kind(rating_key)
+        return getattr(self, f"{kind}_xml")(rating_key) if kind else None
+
+
+def _section_xml(section):
+    """Directory element for /library/sections"""
+    attrs = _attrs(
+        key=section['key'], type=section['type'], title=section['title'], agent=section['agent'],
+        scanner=section['scanner'], language='en-US', uuid=f"mock-section-{section['key']}", refreshing=0,
+        updatedAt=BASE_TIME, createdAt=BASE_TIME, scannedAt=BASE_TIME,
+    )
+    return f"<Directory {attrs}><Location {_attrs(id=section['key'], path=section['location'])}/></Directory>"
+
+
+def _meta_xml(section):
+    """Filter metadata plexapi loads before running filtered searches"""
+    types = {
+        'movie': [('movie', [('addedAt', 'date')])],
+        'show': [('show', [('addedAt', 'date')]), ('episode', [('addedAt', 'date')])],
+        'artist': [('artist', [('artist.id', 'integer'), ('addedAt', 'date')]),
+                   ('album', [('album.id', 'integer'), ('addedAt', 'date')]),
+                   ('track', [('addedAt', 'date')])],
+    }[section['type']]
+
+    xml = ['<Meta>']
+    for libtype, fields in types:
+        key = f"/library/sections/{section['key']}/all?type={TYPE_IDS[libtype]}"
+        xml.append(f"<Type {_attrs(key=key, type=libtype, title=libtype.title(), active=1)}>")
+        xml.extend(f"<Field {_attrs(key=key, title=key, type=field_type)}/>" for key, field_type in fields)
+        xml.append('</Type>')
+    xml.append('<FieldType type="integer"><Operator key="=" title="is"/><Operator key="!=" title="is not"/>'
+               '<Operator key="&gt;&gt;=" title="is greater than"/><Operator key="&lt;&lt;=" title="is less than"/></FieldType>')
+    xml.append('<FieldType type="date"><Operator key="&gt;&gt;=" title="is after"/>'
+               '<Operator key="&lt;&lt;=" title="is before"/></FieldType>')
+    xml.append('</Meta>')
+    return ''.join(xml)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler; the server carries the library, token, latency and stats"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients stall on delayed ACKs for ~40ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/xml;charset=utf-8'):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+        self.server.stats['bytes'] += len(payload)
+
+    def _container(self, elements, total=None, start=0, **attrs):
+        body = ''.join(elements)
+        size = len(elements)
+        return (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<MediaContainer "
+                f"{_attrs(size=size, totalSize=total if total is not None else size, offset=start, **attrs)}>"
+                f"{body}</MediaContainer>")
+
+    def _page(self, keys, render, query, **attrs):
+        """Render one X-Plex-Container page of rating keys"""
+        start = int(self.headers.get('X-Plex-Container-Start') or query.get('X-Plex-Container-Start', ['0'])[0])
+        size = self.headers.get('X-Plex-Container-Size') or query.get('X-Plex-Container-Size', [None])[0]
+        size = len(keys) if size is None else int(size)
+        size = min(size, self.server.max_page_size)
+        page = keys[start:start + size]
+        return self._container([render(key) for key in page], total=len(keys), start=start, **attrs)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/') or '/'
+        query = parse_qs(url.query, keep_blank_values=True)
+        stats = self.server.stats
+
+        if path.startswith('/__mock__/'):
+            return self._mock_control(path)
+
+        with self.server.stats_lock:
+            stats['requests'] += 1
+            stats['by_endpoint'][f"{method} {self._endpoint(path)}"] += 1
+
+        token = self.headers.get('X-Plex-Token') or query.get('X-Plex-Token', [None])[0]
+        if self.server.token and token != self.server.token:
+            return self._send(401, '<html><head><title>Unauthorized</title></head></html>', 'text/html')
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        try:
+            body = self._route(method, path, query)
+        except (ValueError, KeyError):
+            body = None
+        if body is None:
+            return self._send(404, '<html><head><title>Not Found</title></head></html>', 'text/html')
+        self._send(200, body)
+
+    @staticmethod
+    def _endpoint(path):
+        """Collapse rating keys and section IDs, for per-endpoint request counts"""
+        return '/'.join('{id}' if part.isdigit() else part for part in path.split('/'))
+
+    def _mock_control(self, path):
+        if path == '/__mock__/stats':
+            with self.server.stats_lock:
+                stats = dict(self.server.stats)
+                stats['by_endpoint'] = dict(stats['by_endpoint'])
+            return self._send(200, json.dumps(stats), 'application/json')
+        if path == '/__mock__/reset':
+            with self.server.stats_lock:
+                self.server.stats.update(requests=0, bytes=0, by_endpoint=Counter())
+            return self._send(200, '{}', 'application/json')
+        return self._send(404, '{}', 'application/json')
+
+    def _route(self, method, path, query):
+        library = self.server.library
+        parts = path.strip('/').split('/')
+
+        if method == 'DELETE':
+            if len(parts) == 3 and parts[:2] == ['library', 'metadata'] and library.kind(int(parts[2])):
+                library.delete(int(parts[2]))
+                return self._container([])
+            return None
+
+        if path == '/':
+            return self._container([], **{
+                'friendlyName': 'Mock Plex', 'machineIdentifier': 'mock-plex-0001', 'version': '1.40.0.7998',
+                'platform': 'Linux', 'platformVersion': 'mock', 'myPlex': 0, 'allowMediaDeletion': 1,
+            })
+
+        if path == '/library':
+            return self._container([
+                '<Directory key="sections" title="Library Sections"/>',
+                '<Directory key="recentlyAdded" title="Recently Added Content"/>',
+            ], title1='Plex Library')
+
+        if path == '/library/sections':
+            return self._container([_section_xml(section) for section in SECTIONS], title1='Plex Library')
+
+        if path == '/status/sessions/history/all':
+            # Newest first (sort=viewedAt:desc, the order Plex lists history in)
+            plays = sorted(library.plays, key=lambda play: (play[2], play[0]), reverse=True)
+            return self._page(plays, library.history_xml, query)
+
+        if parts[:2] == ['library', 'sections'] and len(parts) == 4:
+            section = next((s for s in SECTIONS if str(s['key']) == parts[2]), None)
+            if section is None:
+                return None
+            if parts[3] == 'collections':
+                return self._container([_meta_xml(section)] if 'includeMeta' in query else [], total=0)
+            if parts[3] != 'all':
+                return None
+            return self._section_all(section, query)
+
+        if parts[:2] == ['library', 'metadata'] and len(parts) >= 3:
+            rating_key = int(parts[2])
+            kind = library.kind(rating_key)
+            if kind is None:
+                return None
+            if len(parts) == 3:
+                return self._container([library.item_xml(rating_key)])
+            if parts[3] == 'allLeaves':
+                if kind == 'show':
+                    return self._page(library.episode_keys(rating_key), library.episode_xml, query)
+                if kind == 'artist':
+                    return self._page(library.track_keys(artist_key=rating_key), library.track_xml, query)
+            if parts[3] == 'children':
+                if kind == 'album':
+                    return self._page(library.track_keys(album_key=rating_key), library.track_xml, query,
+                                      librarySectionID=3)
+                if kind == 'artist':
+                    return self._page(library.album_keys(rating_key), library.album_xml, query,
+                                      librarySectionID=3)
+            return None
+
+        return None
+
+    def _section_all(self, section, query):
+        library = self.server.library
+
+        if 'includeMeta' in query and query.get('X-Plex-Container-Size') == ['0']:
+            return self._container([_meta_xml(section)], total=0)
+
+        default_type = {'movie': 'movie', 'show': 'show', 'artist': 'artist'}[section['type']]
+        type_id = int(query.get('type', [TYPE_IDS[default_type]])[0])
+        libtype = next(name for name, value in TYPE_IDS.items() if value == type_id)
+
+        if libtype == 'movie' and section['type'] == 'movie':
+            keys, render = library.movie_keys(), library.movie_xml
+        elif libtype == 'show' and section['type'] == 'show':
+            keys, render = library.show_keys(), library.show_xml
+        elif libtype == 'episode' and section['type'] == 'show':
+            keys, render = library.episode_keys(), library.episode_xml
+        elif libtype == 'artist' and section['type'] == 'artist':
+            keys, render = library.artist_keys(), library.artist_xml
+        elif libtype == 'album' and section['type'] == 'artist':
+            artist = query.get('artist.id', [None])[0]
+            keys, render = library.album_keys(int(artist) if artist else None), library.album_xml
+        elif libtype == 'track' and section['type'] == 'artist':
+            keys, render = library.track_keys(), library.track_xml
+        else:
+            keys, render = [], str
+
+        added_after = query.get('addedAt>>', [None])[0]
+        if added_after:
+            keys = [key for key in keys if library.added_at(key) > int(added_after)]
+
+        return self._page(keys, render, query, librarySectionID=section['key'],
+                          librarySectionTitle=section['title'])
+
+
+class MockPlexServer:
+    """
+    Mock Plex server running in a background thread or a child process
+
+    Use the child process for benchmarks, so server-side XML rendering
+    doesn't share the GIL (or the RSS) of the code being measured.
+
+    Args:
+        library: SyntheticLibrary to serve
+        token: Required X-Plex-Token (None accepts anything)
+        latency_ms: Delay added to every request
+        max_page_size: Largest page served regardless of X-Plex-Container-Size
+        port: Port to bind (0 picks a free one)
+        process: Serve from a child process instead of a thread
+    """
+
+    def __init__(self, library=None, token='mock-token', latency_ms=0, max_page_size=1000, port=0, process=False):
+        self.library = library or SyntheticLibrary()
+        self.token = token
+        self.latency_ms = latency_ms
+        self.max_page_size = max_page_size
+        self.port = port
+        self.process = process
+        self._server = None
+        self._thread = None
+        self._child = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.process:
+            parent, child = multiprocessing.Pipe()
+            self._child = multiprocessing.Process(
+                target=_serve_child,
+                args=(child, self.library.to_dict(), self.token, self.latency_ms, self.max_page_size, self.port),
+                daemon=True
+            )
+            self._child.start()
+            self.port = parent.recv()
+        else:
+            self._server = make_server(self.library, self.token, self.latency_ms, self.max_page_size, self.port)
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, name='mock-plex', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._child is not None:
+            self._child.terminate()
+            self._child.join()
+            self._child = None
+
+    def _control(self, action):
+        import urllib.request
+        with urllib.request.urlopen(f"{self.url}/__mock__/{action}") as response:
+            return json.loads(response.read())
+
+    def stats(self):
+        """Request count, bytes served and per-endpoint counts since the last reset"""
+        return self._control('stats')
+
+    def reset_stats(self):
+        self._control('reset')
+
+
+def make_server(library, token=None, latency_ms=0, max_page_size=1000, port=0):
+    """Create (but don't start) a ThreadingHTTPServer serving library"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+    server.daemon_threads = True
+    server.library = library
+    server.token = token
+    server.latency = latency_ms / 1000
+    server.max_page_size = max_page_size
+    server.stats = {'requests': 0, 'bytes': 0, 'by_endpoint': Counter()}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def _serve_child(conn, library_args, token, latency_ms, max_page_size, port):
+    server = make_server(SyntheticLibrary(**library_args), token, latency_ms, max_page_size, port)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Plex server with a synthetic library")
+    parser.add_argument("--items", type=int, default=10000, help="Approximate number of movies + episodes + tracks")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--port", type=int, default=32400, help="Port to listen on (default: 32400)")
+    parser.add_argument("--token", default="mock-token", help="Required X-Plex-Token (default: mock-token)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every request")
+    parser.add_argument("--max-page-size", type=int, default=1000, help="Largest page served per request")
+    args = parser.parse_args()
+
+    library = SyntheticLibrary.scaled(args.items, seed=args.seed)
+    server = make_server(library, args.token, args.latency_ms, args.max_page_size, args.port)
+    print(f"Mock Plex serving {library.total_items} items on http://127.0.0.1:{server.server_address[1]} "
+          f"(token: {args.token})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Tests for the backend AuthManager: reset tokens, password hashing and JWTs
+"""
+
+import os
+import sys
+import time
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401  (sets DATA_DIR etc. before the backend modules load)
+
+pytest.importorskip('bcrypt')
+pytest.importorskip('jwt')
+pytest.importorskip('pyotp')
+
+import auth
+from auth import AuthManager, _bcrypt_cost, _hash_reset_token, calibrate_bcrypt_rounds
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = AuthManager(db_file=str(tmp_path / 'users.db'))
+    totp_secret, error = manager.create_user('alice', 'correct horse')
+    assert totp_secret and error is None
+    return manager
+
+
+def test_reset_token_is_stored_as_digest(manager):
+    token, error = manager.generate_reset_token('alice')
+
+    assert error is None
+    record = manager.users['alice']
+    assert record['reset_token_hash'] == _hash_reset_token(token)
+    assert token not in record.values()
+    assert manager.verify_reset_token(token) == 'alice'
+    assert manager.verify_reset_token(token[:-1] + ('A' if token[-1] != 'A' else 'B')) is None
+    assert manager.generate_reset_token('nobody') == (None, "User not found")
+
+
+def test_new_reset_token_replaces_the_old_one(manager):
+    first, _ = manager.generate_reset_token('alice')
+    second, _ = manager.generate_reset_token('alice')
+
+    assert manager.verify_reset_token(first) is None
+    assert manager.verify_reset_token(second) == 'alice'
+
+
+def test_expired_reset_token_is_rejected_and_cleared(manager):
+    token, _ = manager.generate_reset_token('alice')
+    manager.users.update('alice', reset_token_expires=(datetime.now() - timedelta(seconds=1)).isoformat())
+
+    assert manager.verify_reset_token(token) is None
+    assert 'reset_token_hash' not in manager.users['alice']
+
+
+def test_reset_password_consumes_the_token(manager):
+    token, _ = manager.generate_reset_token('alice')
+
+    assert manager.reset_password(token, 'battery staple') == (True, None)
+    assert manager.verify_password('alice', 'battery staple')
+    assert not manager.verify_password('alice', 'correct horse')
+    assert manager.reset_password(token, 'again') == (False, "Invalid or expired reset token")
+
+
+def test_calibration_is_clamped_to_the_allowed_costs():
+    assert calibrate_bcrypt_rounds(target_ms=0.001, min_rounds=4, max_rounds=16) == 4
+    assert calibrate_bcrypt_rounds(target_ms=1e9, min_rounds=4, max_rounds=9) == 9
+    assert 4 <= calibrate_bcrypt_rounds(target_ms=50, min_rounds=4, max_rounds=16) <= 16
+
+
+def test_login_rehashes_at_the_current_cost(manager):
+    assert _bcrypt_cost(manager.users['alice']['password_hash']) == 4
+
+    # Another worker (or a restart) raised the shared cost
+    manager.users.set_meta('bcrypt_rounds', 5)
+    assert not manager.verify_password('alice', 'wrong password')
+    assert _bcrypt_cost(manager.users['alice']['password_hash']) == 4
+
+    assert manager.verify_password('alice', 'correct horse')
+    assert _bcrypt_cost(manager.users['alice']['password_hash']) == 5
+    assert manager.verify_password('alice', 'correct horse')
+    assert not manager.verify_password('alice', 'wrong password')
+
+
+def test_cost_is_shared_through_the_store(manager, tmp_path):
+    other_worker = AuthManager(db_file=str(tmp_path / 'users.db'))
+    manager.users.set_meta('bcrypt_rounds', 6)
+    assert other_worker.bcrypt_rounds == 6
+
+
+def test_logout_revokes_the_token_in_every_worker(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, 'REVOCATION_SYNC_SECONDS', 0)
+    other_worker = AuthManager(db_file=str(tmp_path / 'users.db'))
+    token = manager.generate_jwt('alice')
+
+    # Both workers have verified (and cached) the token
+    assert manager.verify_jwt(token) == 'alice' and other_worker.verify_jwt(token) == 'alice'
+
+    assert manager.revoke_jwt(token)
+    assert manager.verify_jwt(token) is None
+    assert other_worker.verify_jwt(token) is None
+    assert not manager.revoke_jwt('not-a-jwt')
+
+
+def test_password_reset_invalidates_earlier_tokens(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, 'REVOCATION_SYNC_SECONDS', 0)
+    other_worker = AuthManager(db_file=str(tmp_path / 'users.db'))
+    token = manager.generate_jwt('alice')
+    assert other_worker.verify_jwt(token) == 'alice'
+
+    reset_token, _ = manager.generate_reset_token('alice')
+    assert manager.reset_password(reset_token, 'battery staple')[0]
+
+    assert manager.verify_jwt(token) is None
+    assert other_worker.verify_jwt(token) is None
+
+    # Logging in again afterwards works
+    time.sleep(1.1)
+    assert manager.verify_jwt(manager.generate_jwt('alice')) == 'alice'
+
+
+def test_expired_and_forged_tokens_are_rejected(manager, monkeypatch):
+    token = manager.generate_jwt('alice')
+    assert manager.verify_jwt(token) == 'alice'
+
+    # Cached tokens still expire
+    monkeypatch.setattr(time, 'time', lambda: 4102444800)
+    assert manager.verify_jwt(token) is None
+    monkeypatch.undo()
+
+    header, payload, signature = manager.generate_jwt('alice').split('.')
+    assert manager.verify_jwt(f"{header}.{payload}.{signature[::-1]}") is None
+    assert manager.verify_jwt('') is None
+
+
+def test_only_session_tokens_authenticate(manager):
+    import jwt
+
+    # Purpose-scoped tokens signed with the same secret by earlier releases (QR downloads)
+    qr_token = jwt.encode({'username': 'alice', 'purpose': 'totp-qr',
+                           'exp': datetime.utcnow() + timedelta(minutes=15)},
+                          auth.JWT_SECRET, algorithm=auth.JWT_ALGORITHM)
+    assert manager.verify_jwt(qr_token) is None
+    assert manager.verify_jwt(manager.generate_jwt('alice')) == 'alice'
+
+
+def test_qr_code_is_an_inline_svg(manager):
+    pytest.importorskip('qrcode')
+
+    qr_code = manager.generate_qr_code('alice')
+    assert qr_code.startswith('data:image/svg+xml;base64,')
+    assert b'<svg' in base64.b64decode(qr_code.split(',', 1)[1])
+    assert manager.generate_qr_code('nobody') is None
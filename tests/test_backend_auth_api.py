@@ -0,0 +1,56 @@
+"""
+Tests for the backend API's authentication endpoints
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+pytest.importorskip('dotenv')
+pytest.importorskip('bcrypt')
+pytest.importorskip('jwt')
+pytest.importorskip('pyotp')
+
+import api
+from auth_limits import LoginThrottle
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, 'login_throttle', LoginThrottle(max_per_ip=3, max_per_user=100))
+    return api.app.test_client()
+
+
+def failed_login(client, username, forwarded_for):
+    return client.post('/api/auth/login', json={'username': username, 'password': 'wrong'},
+                       headers={'X-Forwarded-For': forwarded_for})
+
+
+def test_spoofed_forwarded_for_does_not_bypass_ip_throttle(client):
+    # The proxy appends the real address; whatever the client put before it is ignored
+    for i in range(3):
+        assert failed_login(client, f"user{i}", f"198.51.100.{i}, 203.0.113.7").status_code == 401
+
+    response = failed_login(client, 'user9', '198.51.100.99, 203.0.113.7')
+    assert response.status_code == 429 and int(response.headers['Retry-After']) > 0
+
+    # Another client behind the same proxy is not affected
+    assert failed_login(client, 'user9', '203.0.113.8').status_code == 401
+
+
+
+def test_register_returns_the_qr_code_inline(client):
+    pytest.importorskip('qrcode')
+
+    response = client.post('/api/auth/register', json={'username': 'qr-user', 'password': 'secret'})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['qr_code'].startswith('data:image/svg+xml;base64,')
+    assert 'qr_code_url' not in body and 'token=' not in response.get_data(as_text=True)
+    assert client.get('/api/auth/qr.svg').status_code == 404
@@ -0,0 +1,55 @@
+"""
+Tests for the benchmark regression check
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_cleanup import compare, run_benchmark
+
+BASE = {'scan@1000': {'wall_s': 1.0, 'requests': 300, 'peak_rss_mb': 50.0}}
+
+
+def test_within_threshold_passes():
+    results = {'scan@1000': {'wall_s': 1.2, 'requests': 300, 'peak_rss_mb': 55.0}}
+
+    assert compare(results, BASE, threshold=0.25) == []
+
+
+def test_slowdown_and_growth_are_reported():
+    results = {'scan@1000': {'wall_s': 1.5, 'requests': 300, 'peak_rss_mb': 80.0}}
+
+    regressions = compare(results, BASE, threshold=0.25)
+
+    assert len(regressions) == 2
+    assert 'wall time' in regressions[0]
+    assert 'peak RSS' in regressions[1]
+
+
+def test_any_extra_request_is_a_regression():
+    results = {'scan@1000': {'wall_s': 0.5, 'requests': 301, 'peak_rss_mb': 40.0}}
+
+    assert compare(results, BASE) == ['scan@1000: requests 300 -> 301']
+
+
+def test_tiny_absolute_changes_are_noise():
+    base = {'fmt@1000': {'wall_s': 0.001, 'requests': 0, 'peak_rss_mb': 10.0}}
+    results = {'fmt@1000': {'wall_s': 0.003, 'requests': 0, 'peak_rss_mb': 14.0}}
+
+    assert compare(results, base) == []
+
+
+def test_benchmarks_without_a_baseline_are_skipped():
+    results = {'new@1000': {'wall_s': 9.0, 'requests': 999, 'peak_rss_mb': 999.0}}
+
+    assert compare(results, BASE) == []
+
+
+def test_run_benchmark_counts_requests():
+    result = run_benchmark('delete_movies', 200)
+
+    assert result['requests'] > 0
+    assert result['wall_s'] > 0
+    assert result['peak_rss_mb'] > 0
@@ -0,0 +1,123 @@
+"""
+Tests for the declarative cleanup policy
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cleanup_policy
+from cleanup_policy import CleanupPolicy, PolicyError, load_policy, parse_policy
+
+NOW = datetime(2026, 1, 1)
+GB = 1024 ** 3
+
+
+def item(views=None, watched_days_ago=None, added_days_ago=400, size_gb=5, resolution='1080', labels=(),
+         collections=()):
+    return SimpleNamespace(
+        title='Movie',
+        viewCount=views,
+        lastViewedAt=NOW - timedelta(days=watched_days_ago) if watched_days_ago is not None else None,
+        addedAt=NOW - timedelta(days=added_days_ago),
+        media=[SimpleNamespace(videoResolution=resolution, parts=[SimpleNamespace(size=int(size_gb * GB))])],
+        labels=[SimpleNamespace(tag=tag) for tag in labels],
+        collections=[SimpleNamespace(tag=tag) for tag in collections],
+    )
+
+
+def test_yaml_subset_without_pyyaml(monkeypatch):
+    monkeypatch.setattr(cleanup_policy, 'yaml', None)
+    data = parse_policy("""
+# Keep anything we like
+max_views: 0
+days_not_watched: 90   # three months
+resolutions: [720p, sd]
+exclude_labels:
+  - keep
+  - "Family Night"
+max_size_gb:
+""")
+    assert data == {'max_views': '0', 'days_not_watched': '90', 'resolutions': ['720p', 'sd'],
+                    'exclude_labels': ['keep', 'Family Night'], 'max_size_gb': None}
+
+    policy = CleanupPolicy.from_dict(data)
+    assert policy.max_views == 0 and policy.days_not_watched == 90 and policy.max_size_gb is None
+
+
+def test_invalid_policies_are_rejected(tmp_path):
+    with pytest.raises(PolicyError):
+        CleanupPolicy.from_dict({'max_view': 1})
+    with pytest.raises(PolicyError):
+        CleanupPolicy.from_dict({'days_not_watched': 'soon'})
+
+    path = tmp_path / 'policy.json'
+    path.write_text('{"max_views": 2, "exclude_collections": "Criterion"}')
+    assert load_policy(str(path)).exclude_collections == ['Criterion']
+
+
+def test_compiled_rules():
+    policy = CleanupPolicy(max_views=1, days_not_watched=30, days_since_added=60, min_size_gb=1,
+                           resolutions=['720p', '1080p'], exclude_labels=['Keep'], exclude_collections=['Pixar'])
+    compiled = policy.compile(now=NOW)
+
+    assert compiled.matches(item())
+    assert compiled.matches(item(views=1, watched_days_ago=45))
+    assert not compiled.matches(item(views=2))
+    assert not compiled.matches(item(views=1, watched_days_ago=3))
+    assert not compiled.matches(item(added_days_ago=10))
+    assert not compiled.matches(item(size_gb=0.5))
+    assert not compiled.matches(item(resolution='4k'))
+    assert not compiled.matches(item(labels=['keep']))
+    assert not compiled.matches(item(collections=['Pixar']))
+
+
+def test_overrides_and_sections():
+    policy = CleanupPolicy(max_views=3, libraries=['Movies', 'Kids Movies'], exclude_libraries=['Kids Movies'])
+    merged = policy.merged(max_views=None, days_not_watched=30)
+    assert merged.max_views == 3 and merged.days_not_watched == 30
+
+    library = SimpleNamespace(sections=lambda: [
+        SimpleNamespace(title='Movies', type='movie'),
+        SimpleNamespace(title='Kids Movies', type='movie'),
+        SimpleNamespace(title='TV Shows', type='show'),
+    ])
+    assert [s.title for s in merged.compile().sections(library)] == ['Movies']
+
+
+def test_scan_does_not_reload_movies():
+    from mock_plex import MockPlexServer, SyntheticLibrary
+    from plex_cleanup import PlexCleanup
+
+    with MockPlexServer(SyntheticLibrary(movies=120), max_page_size=50) as server:
+        cleanup = PlexCleanup(server.url, server.token)
+        server.reset_stats()
+        movies = cleanup.get_unwatched_movies(max_view_count=1, days_since_watched=30)
+
+        assert movies
+        assert 'GET /library/metadata/{id}' not in server.stats()['by_endpoint']
+
+
+def test_dashboard_starts_from_the_shared_default(tmp_path, monkeypatch):
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        'web_app', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web', 'app.py'))
+    web_app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(web_app)
+    client = web_app.app.test_client()
+
+    assert client.get('/api/settings').get_json()['policy'] == CleanupPolicy().to_dict()
+
+    path = tmp_path / 'policy.yaml'
+    path.write_text('days_not_watched: 90\n')
+    monkeypatch.setattr(cleanup_policy, 'CLEANUP_POLICY_FILE', str(path))
+    settings = client.get('/api/settings').get_json()
+    assert settings['policy'] == CleanupPolicy(days_not_watched=90).to_dict()
+    assert (settings['max_view_count'], settings['days_not_watched']) == (1, 90)
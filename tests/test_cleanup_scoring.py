@@ -0,0 +1,93 @@
+"""
+Tests for cleanup scoring and space-target selection
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleanup_scoring import GB, CleanupScorer, parse_weights, select_for_target
+
+TODAY = date(2026, 1, 1)
+
+
+def movie(title, size_gb, views=0, watched_days_ago=None, added_days_ago=365, rating=None):
+    return {
+        'title': title,
+        'view_count': views,
+        'last_viewed': (TODAY - timedelta(days=watched_days_ago)).isoformat() if watched_days_ago is not None
+        else 'Never',
+        'added_date': (TODAY - timedelta(days=added_days_ago)).isoformat(),
+        'rating': rating,
+        'file_size_mb': size_gb * 1024,
+    }
+
+
+def random_library(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        movie(f"m{i}", rng.uniform(0.7, 80), views=rng.choice([0, 0, 1, 2, 5]),
+              watched_days_ago=rng.choice([None, rng.randint(1, 900)]), added_days_ago=rng.randint(1, 2000),
+              rating=rng.choice([None, 5.5, 8.8]))
+        for i in range(count)
+    ]
+
+
+def test_value_prefers_keeping_recent_popular_movies():
+    scorer = CleanupScorer(today=TODAY)
+    stale = movie('stale', 20, added_days_ago=1500)
+    loved = movie('loved', 20, views=5, watched_days_ago=3, added_days_ago=30, rating=9)
+
+    ranked = scorer.score([loved, stale])
+    assert [m['title'] for m in ranked] == ['stale', 'loved']
+    assert stale['value'] < loved['value']
+
+
+def test_parse_weights():
+    assert parse_weights('views=0, size=1.5')['size'] == 1.5
+    assert parse_weights(None)['recency'] == 2.0
+    with pytest.raises(ValueError):
+        parse_weights('popularity=1')
+    for spec in ('views=-1', 'recency=nan', 'size=inf', 'age=-inf'):
+        with pytest.raises(ValueError, match='finite and not negative'):
+            parse_weights(spec)
+
+
+def test_selection_is_minimal_value_on_small_inputs():
+    rng = random.Random(3)
+    scorer = CleanupScorer(today=TODAY)
+    for trial in range(30):
+        movies = random_library(9, seed=trial)
+        target = rng.randint(20, 150) * GB
+        result = select_for_target(movies, target, scorer)
+
+        feasible = [sum(m['value'] for m in combo)
+                    for k in range(1, len(movies) + 1) for combo in itertools.combinations(movies, k)
+                    if sum(int(m['file_size_mb'] * 1024 * 1024) for m in combo) >= target]
+        if not feasible:
+            assert not result['met']
+            continue
+        assert result['met'] and result['bytes'] >= target
+        assert result['value'] <= min(feasible) * 1.01
+
+
+def test_unreachable_target_returns_everything():
+    movies = [movie('a', 10), movie('b', 5)]
+    result = select_for_target(movies, 100 * GB, CleanupScorer(today=TODAY), solver='greedy')
+    assert not result['met']
+    assert len(result['selected']) == 2
+
+
+def test_ten_thousand_items_select_quickly():
+    movies = random_library(10000)
+    started = time.perf_counter()
+    result = select_for_target(movies, 500 * GB, CleanupScorer(today=TODAY))
+    assert result['met']
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,76 @@
+"""
+Tests for the deletion journal and resuming interrupted runs
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from deletion_journal import DeletionJournal
+
+DELETE = 'DELETE /library/metadata/{id}'
+FETCH = 'GET /library/metadata/{id}'
+
+
+def candidate(rating_key, title='Movie', size_mb=100):
+    return {'plex_object': SimpleNamespace(ratingKey=rating_key), 'title': title, 'year': 2001, 'file_size_mb': size_mb}
+
+
+def test_run_state_follows_the_latest_outcome(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with DeletionJournal(path) as journal:
+        old_run = journal.start_run([candidate(9)], source='telegram')
+        run_id = journal.start_run([candidate(1), candidate(2), candidate(3)])
+        journal.record_deleted(run_id, 1, 100)
+        journal.record_failed(run_id, 2, 'timeout')
+        journal.record_deleted(run_id, 3, 5, already_gone=True)
+        journal.record_failed(run_id, 3, 'late failure')
+
+    # A crash mid-write leaves a partial last line behind
+    with open(path, 'a') as f:
+        f.write('{"event": "deleted", "run": "')
+
+    journal = DeletionJournal(path)
+    assert journal.last_run_id() == run_id
+    assert journal.last_run_id(source='telegram') == old_run
+    state = journal.run_state(run_id)
+    assert {key: item['status'] for key, item in state.items()} == {'1': 'deleted', '2': 'failed', '3': 'failed'}
+    assert state['2']['error'] == 'timeout' and state['1']['size_bytes'] == 100 * 1024 * 1024
+    assert [item['rating_key'] for item in journal.pending(run_id)] == ['2', '3']
+
+
+def test_resume_skips_items_already_deleted(tmp_path):
+    from mock_plex import MockPlexServer, SyntheticLibrary
+    from plex_cleanup import PlexCleanup
+
+    library = SyntheticLibrary(movies=20)
+    with MockPlexServer(library) as server:
+        cleanup = PlexCleanup(server.url, server.token)
+        movies = cleanup.get_unwatched_movies(max_view_count=1000)[:5]
+        keys = [m['plex_object'].ratingKey for m in movies]
+
+        journal = DeletionJournal(str(tmp_path / 'journal.jsonl'))
+        run_id = journal.start_run(movies)
+        # Interrupted: the first deletion was journaled, the second happened but wasn't
+        movies[0]['plex_object'].delete()
+        journal.record_deleted(run_id, keys[0], 1)
+        movies[1]['plex_object'].delete()
+        journal.record_failed(run_id, keys[2], 'connection reset')
+
+        server.reset_stats()
+        result = cleanup.resume_deletions(journal, confirm=False)
+        journal.close()
+
+        assert result['run'] == run_id
+        assert (result['deleted'], result['already_gone'], result['failed']) == (3, 1, 0)
+        by_endpoint = server.stats()['by_endpoint']
+        # The journaled deletion is neither fetched nor deleted again
+        assert by_endpoint[FETCH] == 4 and by_endpoint[DELETE] == 3
+        assert set(keys) <= library.deleted
+        assert journal.pending(run_id) == []
+
+        # Nothing left to do on a second resume
+        assert cleanup.resume_deletions(journal, confirm=False) is None
@@ -0,0 +1,108 @@
+"""
+Tests for the incremental directory size cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dir_size_cache import DirectorySizeCache
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+
+def tree(root):
+    write(os.path.join(root, 'Movies', 'A (2001)', 'a.mkv'), 100)
+    write(os.path.join(root, 'Movies', 'B (2002)', 'b.mkv'), 200)
+    write(os.path.join(root, 'Movies', 'B (2002)', 'Subs', 'b.srt'), 5)
+    write(os.path.join(root, 'TV', 'Show', 'Season 1', 'e1.mkv'), 50)
+    write(os.path.join(root, 'notes.txt'), 1)
+
+
+def test_totals_roll_up_to_parents(tmp_path):
+    root = str(tmp_path)
+    tree(root)
+
+    with DirectorySizeCache(':memory:') as cache:
+        assert cache.scan(root) == {'path': root, 'size_bytes': 356, 'file_count': 5}
+        assert cache.get(os.path.join(root, 'Movies')) == {
+            'path': os.path.join(root, 'Movies'), 'size_bytes': 305, 'file_count': 3}
+        assert [(os.path.basename(c['path']), c['size_bytes']) for c in cache.children(root)] == [
+            ('Movies', 305), ('TV', 50)]
+
+
+def test_only_changed_directories_are_relisted(tmp_path):
+    root = str(tmp_path)
+    tree(root)
+
+    with DirectorySizeCache(':memory:') as cache:
+        cache.scan(root)
+        cache.scan(root)
+        assert cache.last_scan['listed'] == 0
+
+        # A new file changes the mtime of its own directory only; the totals above it still roll up
+        write(os.path.join(root, 'TV', 'Show', 'Season 1', 'e2.mkv'), 70)
+        assert cache.scan(root)['size_bytes'] == 356 + 70
+        assert cache.last_scan['listed'] == 1
+        assert cache.get(os.path.join(root, 'TV'))['size_bytes'] == 120
+
+        # A removed subtree is dropped from the cache
+        subs = os.path.join(root, 'Movies', 'B (2002)', 'Subs')
+        os.remove(os.path.join(subs, 'b.srt'))
+        os.rmdir(subs)
+        assert cache.scan(root)['file_count'] == 5
+        assert cache.get(subs) is None and cache.last_scan['removed'] == 1
+
+
+def test_ctime_change_relists_even_with_restored_mtime(tmp_path):
+    root = str(tmp_path)
+    tree(root)
+    season = os.path.join(root, 'TV', 'Show', 'Season 1')
+
+    with DirectorySizeCache(':memory:') as cache:
+        cache.scan(root)
+
+        # Adding a file and putting the directory mtime back still bumps its ctime
+        before = os.stat(season)
+        write(os.path.join(season, 'e2.mkv'), 70)
+        os.utime(season, ns=(before.st_atime_ns, before.st_mtime_ns))
+        assert os.stat(season).st_mtime_ns == before.st_mtime_ns
+
+        assert cache.scan(root)['size_bytes'] == 356 + 70
+        assert cache.last_scan['listed'] == 1
+
+
+def test_cache_persists_between_instances(tmp_path):
+    root = str(tmp_path / 'media')
+    tree(root)
+    cache_file = str(tmp_path / 'cache.db')
+
+    with DirectorySizeCache(cache_file) as cache:
+        cache.scan(root)
+    with DirectorySizeCache(cache_file) as cache:
+        assert cache.scan(root)['size_bytes'] == 356
+        assert cache.last_scan['listed'] == 0
+
+
+def test_cli_report_does_not_scan(tmp_path):
+    from storage_analyzer import StorageAnalyzer
+
+    root = str(tmp_path)
+    tree(root)
+    plex = type('Plex', (), {'library': type('Library', (), {'sections': lambda self: []})()})()
+
+    with DirectorySizeCache(':memory:') as cache:
+        analyzer = StorageAnalyzer(plex, total_capacity_gb=1, download_root=root, dir_cache=cache)
+        stats = analyzer.analyze_storage()
+        assert [os.path.basename(f['path']) for f in stats['folder_sizes']] == ['Movies', 'TV']
+
+        def fail(*args, **kwargs):
+            raise AssertionError("format_cli_report scanned the filesystem")
+        cache.scan = fail
+        assert 'ON-DISK FOLDER SIZES' in analyzer.format_cli_report(stats)
@@ -0,0 +1,94 @@
+"""
+Tests for the duplicate media finder
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from duplicate_finder import DuplicateFinder, partial_hash
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def media(media_id, resolution, *files):
+    parts = [SimpleNamespace(file=f, size=os.path.getsize(f) if os.path.exists(f) else 1000) for f in files]
+    return SimpleNamespace(id=media_id, videoResolution=resolution, bitrate=None, parts=parts)
+
+
+def movie(rating_key, title, guid, *versions):
+    return SimpleNamespace(ratingKey=rating_key, title=title, year=2001, guid=guid, type='movie', media=list(versions))
+
+
+def fake_plex(**libraries):
+    sections = [SimpleNamespace(type='movie', title=title, search=lambda libtype, items=items: items)
+                for title, items in libraries.items()]
+    return SimpleNamespace(library=SimpleNamespace(sections=lambda: sections))
+
+
+def test_versions_of_one_movie_are_grouped_by_guid(tmp_path):
+    plex = fake_plex(Movies=[movie(1, 'Heat', 'plex://movie/heat',
+                                   media(10, '1080', str(tmp_path / 'heat.1080.mkv')),
+                                   media(11, '720', str(tmp_path / 'heat.720.mkv')))])
+
+    result = DuplicateFinder(plex).find_duplicates(hash_content=False)
+
+    [group] = result['groups']
+    assert group['match'] == 'guid'
+    assert group['keep']['resolution'] == '1080'
+    assert [v['resolution'] for v in group['redundant']] == ['720']
+    assert result['versions_scanned'] == 2
+
+
+def test_overlapping_libraries_are_not_duplicates(tmp_path):
+    # Two libraries on the same folder: Plex lists one file twice, under one GUID
+    path = str(tmp_path / 'Movies' / 'Heat (1995)' / 'heat.mkv')
+    write(path, b'heat' * 1000)
+    plex = fake_plex(Movies=[movie(1, 'Heat', 'plex://movie/heat', media(10, '1080', path))],
+                     Favourites=[movie(2, 'Heat', 'plex://movie/heat', media(20, '1080', path))])
+
+    result = DuplicateFinder(plex).find_duplicates()
+
+    assert result['groups'] == [] and result['total_reclaimable_gb'] == 0
+    assert result['versions_scanned'] == 2
+
+
+def test_overlapping_libraries_through_path_mapping(tmp_path):
+    # The same file under two spellings that map to one local path, with a different GUID each
+    local = str(tmp_path / 'Heat (1995)' / 'heat.mkv')
+    write(local, b'heat' * 1000)
+    plex = fake_plex(Movies=[movie(1, 'Heat', 'plex://movie/heat', media(10, '1080', '/plex/Heat (1995)/heat.mkv'))],
+                     Old=[movie(2, 'Heat', 'local://2', media(20, '1080', '/plex/Heat (1995)/./heat.mkv'))])
+    for section in plex.library.sections():
+        for part in section.search('movie')[0].media[0].parts:
+            part.size = os.path.getsize(local)
+
+    finder = DuplicateFinder(plex, plex_path_prefix='/plex', local_path_prefix=str(tmp_path))
+    assert finder.find_duplicates()['groups'] == []
+
+
+def test_identical_files_are_grouped_by_content(tmp_path):
+    data = os.urandom(64 * 1024)
+    first = str(tmp_path / 'a' / 'heat.mkv')
+    second = str(tmp_path / 'b' / 'heat (copy).mkv')
+    other = str(tmp_path / 'c' / 'ronin.mkv')
+    write(first, data)
+    write(second, data)
+    write(other, data[:-1] + b'!')
+    plex = fake_plex(Movies=[movie(1, 'Heat', 'plex://movie/heat', media(10, '1080', first)),
+                             movie(2, 'Heat (copy)', 'local://2', media(20, '1080', second)),
+                             movie(3, 'Ronin', 'plex://movie/ronin', media(30, '1080', other))])
+
+    result = DuplicateFinder(plex).find_duplicates()
+
+    [group] = result['groups']
+    assert group['match'] == 'content'
+    assert group['reclaimable_bytes'] == len(data)
+    assert partial_hash(first, block_size=1024) == partial_hash(second, block_size=1024)
+    assert partial_hash(first, block_size=1024) != partial_hash(other, block_size=1024)
@@ -0,0 +1,97 @@
+"""
+Cold-start budget for the backend API
+
+Imports backend/api.py in a fresh interpreter under `python -X importtime`
+and fails when the import gets slower than the budget, or when modules that
+should load lazily (plexapi, imaging, the auth stack) are pulled in eagerly.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+pytest.importorskip('dotenv')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'backend')
+
+# Cumulative import time of `api`, in milliseconds (best of RUNS)
+IMPORT_BUDGET_MS = float(os.getenv('API_IMPORT_BUDGET_MS', '400'))
+RUNS = 3
+
+# Modules that must not be imported until an endpoint needs them
+LAZY_MODULES = ('plexapi', 'requests', 'PIL', 'qrcode', 'auth', 'bcrypt', 'jwt', 'pyotp')
+
+
+def run_backend(code, tmp_path):
+    """Run code in a fresh interpreter from backend/ with importtime enabled"""
+    env = dict(os.environ)
+    env.update({
+        'PLEX_URL': 'http://127.0.0.1:32400',
+        'PLEX_TOKEN': 'test-token',
+        'DATA_DIR': str(tmp_path),
+        'BCRYPT_ROUNDS': '10',
+        'JWT_SECRET': 'test-secret',
+    })
+    env.pop('PYTHONPATH', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def cumulative_import_us(stderr, module):
+    """Cumulative import time (microseconds) of a top-level module from -X importtime output"""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_api_import_within_budget(tmp_path):
+    timings_ms = [
+        cumulative_import_us(run_backend('import api', tmp_path).stderr, 'api') / 1000
+        for _ in range(RUNS)
+    ]
+
+    best = min(timings_ms)
+    assert best <= IMPORT_BUDGET_MS, (
+        f"backend api import took {best:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); "
+        f"runs: {', '.join(f'{t:.0f}' for t in timings_ms)}"
+    )
+
+
+def test_api_import_defers_heavy_modules(tmp_path):
+    code = (
+        "import sys, api\n"
+        f"print('loaded:' + ','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    loaded = run_backend(code, tmp_path).stdout.strip().splitlines()[-1]
+
+    assert loaded == 'loaded:'
+
+
+def test_health_and_token_check_skip_plex_and_imaging(tmp_path):
+    code = (
+        "import sys, api\n"
+        "client = api.app.test_client()\n"
+        "assert client.get('/api/health').status_code == 200\n"
+        "assert client.get('/api/auth/verify', headers={'Authorization': 'Bearer x'}).status_code == 401\n"
+        "print('loaded:' + ','.join(m for m in ('plexapi', 'requests', 'PIL', 'qrcode') if m in sys.modules))\n"
+    )
+    loaded = run_backend(code, tmp_path).stdout.strip().splitlines()[-1]
+
+    assert loaded == 'loaded:'
@@ -0,0 +1,80 @@
+"""
+Tests for the persistent background job queue
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401
+
+from job_store import JobRunner, JobStore
+
+
+def items(count):
+    return [{'key': f"movie_{i}", 'rating_key': str(i), 'title': f"Movie {i}", 'size_bytes': 10} for i in range(count)]
+
+
+def test_job_runs_each_item_and_records_progress(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    runner = JobRunner(store, heartbeat_seconds=0.05)
+
+    def handler(item):
+        if item['item_key'] == 'movie_1':
+            raise LookupError('gone')
+        return item['size_bytes']
+    runner.register('delete_movies', handler)
+
+    job_id = store.create('delete_movies', items(3))
+    runner.run_job(store.claim_next(runner.worker))
+
+    job = store.get(job_id)
+    assert job['status'] == 'completed'
+    assert (job['succeeded'], job['failed'], job['bytesFreed']) == (2, 1, 20)
+    assert [item['status'] for item in job['items']] == ['succeeded', 'failed', 'succeeded']
+    assert store.claim_next(runner.worker) is None
+
+
+def test_slow_item_keeps_the_job_claimed(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    runner = JobRunner(store, heartbeat_seconds=0.05)
+    calls = []
+
+    def slow_delete(item):
+        calls.append(item['item_key'])
+        time.sleep(0.6)
+        return 0
+    runner.register('delete_movies', slow_delete)
+
+    job_id = store.create('delete_movies', items(1))
+    job = store.claim_next(runner.worker, stale_after=0.2)
+    worker = threading.Thread(target=runner.run_job, args=(job,))
+    worker.start()
+
+    # Another worker polling with a short stale timeout must not take over the in-flight deletion
+    other = JobStore(store.db_file)
+    stolen = []
+    while worker.is_alive():
+        stolen.append(other.claim_next('other-worker', stale_after=0.2))
+        time.sleep(0.05)
+    worker.join()
+
+    assert stolen and not any(stolen)
+    assert calls == ['movie_0']
+    assert store.get(job_id)['status'] == 'completed'
+
+
+def test_abandoned_job_is_requeued_with_its_remaining_items(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    job_id = store.create('delete_movies', items(3))
+    job = store.claim_next('dead-worker')
+    store.finish_item(job['id'], 0, 'succeeded', 10)
+
+    # The worker died: no heartbeat for longer than the stale timeout
+    assert store.claim_next('new-worker', stale_after=60) is None
+    time.sleep(0.05)
+    resumed = store.claim_next('new-worker', stale_after=0.01)
+    assert resumed['id'] == job_id and resumed['status'] == 'running'
+    assert [item['seq'] for item in store.pending_items(job_id)] == [1, 2]
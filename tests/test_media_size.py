@@ -0,0 +1,114 @@
+"""
+Tests for multi-part and multi-version size accounting
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_size import media_file_paths, media_size_breakdown, media_total_bytes
+
+GB = 1024 ** 3
+
+
+def make_part(file, size):
+    return SimpleNamespace(file=file, size=size)
+
+
+def make_media(parts, resolution='1080', media_id=1, container='mkv'):
+    return SimpleNamespace(id=media_id, videoResolution=resolution, container=container, parts=parts)
+
+
+def make_movie(media, title='Movie', view_count=0, last_viewed=None):
+    return SimpleNamespace(
+        title=title,
+        year=2001,
+        viewCount=view_count,
+        lastViewedAt=last_viewed,
+        addedAt=datetime(2020, 1, 1),
+        rating=7.5,
+        media=media
+    )
+
+
+def test_single_part_single_version():
+    movie = make_movie([make_media([make_part('/m/a.mkv', 2 * GB)])])
+
+    assert media_total_bytes(movie) == 2 * GB
+    assert media_file_paths(movie) == ['/m/a.mkv']
+
+
+def test_multi_part_split_is_summed():
+    movie = make_movie([make_media([
+        make_part('/m/a.cd1.avi', 700 * 1024 * 1024),
+        make_part('/m/a.cd2.avi', 650 * 1024 * 1024),
+    ])])
+
+    breakdown = media_size_breakdown(movie)
+
+    assert breakdown['total_bytes'] == 1350 * 1024 * 1024
+    assert breakdown['file_paths'] == ['/m/a.cd1.avi', '/m/a.cd2.avi']
+    assert len(breakdown['versions']) == 1
+    assert len(breakdown['versions'][0]['parts']) == 2
+
+
+def test_every_version_counts():
+    movie = make_movie([
+        make_media([make_part('/m/a.2160p.mkv', 40 * GB)], resolution='4k', media_id=1),
+        make_media([make_part('/m/a.1080p.cd1.mkv', 6 * GB), make_part('/m/a.1080p.cd2.mkv', 5 * GB)],
+                   resolution='1080', media_id=2),
+    ])
+
+    breakdown = media_size_breakdown(movie)
+
+    assert breakdown['total_bytes'] == 51 * GB
+    assert [v['resolution'] for v in breakdown['versions']] == ['4k', '1080']
+    assert [v['size_bytes'] for v in breakdown['versions']] == [40 * GB, 11 * GB]
+    assert media_total_bytes(movie) == breakdown['total_bytes']
+
+
+def test_missing_sizes_and_files_are_tolerated():
+    movie = make_movie([make_media([
+        make_part('/m/a.mkv', None),
+        SimpleNamespace(file=None),
+    ])])
+
+    breakdown = media_size_breakdown(movie)
+
+    assert breakdown['total_bytes'] == 0
+    assert breakdown['file_paths'] == ['/m/a.mkv']
+
+
+def test_item_without_media():
+    item = SimpleNamespace(media=None)
+
+    assert media_total_bytes(item) == 0
+    assert media_size_breakdown(item) == {'total_bytes': 0, 'file_paths': [], 'versions': []}
+
+
+def test_get_unwatched_movies_uses_all_parts_and_versions():
+    from plex_cleanup import PlexCleanup
+
+    movies = [
+        make_movie([
+            make_media([make_part('/m/a.4k.mkv', 30 * GB)], resolution='4k', media_id=1),
+            make_media([make_part('/m/a.cd1.mkv', 4 * GB), make_part('/m/a.cd2.mkv', 3 * GB)], media_id=2),
+        ], title='Split'),
+        make_movie([make_media([make_part('/m/b.mkv', GB)])], title='Watched', view_count=5),
+        make_movie([make_media([make_part('/m/c.mkv', GB)])], title='Recent', view_count=1,
+                   last_viewed=datetime.now() - timedelta(days=2)),
+    ]
+    section = SimpleNamespace(type='movie', title='Movies', all=lambda: movies)
+
+    cleanup = PlexCleanup.__new__(PlexCleanup)
+    cleanup.plex = SimpleNamespace(library=SimpleNamespace(sections=lambda: [section]))
+
+    result = cleanup.get_unwatched_movies(max_view_count=1, days_since_watched=30)
+
+    assert [m['title'] for m in result] == ['Split']
+    assert result[0]['file_size_mb'] == 37 * 1024
+    assert result[0]['file_paths'] == ['/m/a.4k.mkv', '/m/a.cd1.mkv', '/m/a.cd2.mkv']
+    assert [v['size_bytes'] for v in result[0]['versions']] == [30 * GB, 7 * GB]
@@ -0,0 +1,84 @@
+"""
+Tests for the mock Plex server, driven through plexapi and the real scan paths
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plexapi.server import PlexServer
+
+from mock_plex import MockPlexServer, SyntheticLibrary
+from storage_analyzer import StorageAnalyzer
+
+
+@pytest.fixture(scope='module')
+def library():
+    return SyntheticLibrary(movies=300, shows=6, episodes_per_show=12, artists=3, albums_per_artist=2,
+                            tracks_per_album=5, multi_version_ratio=0.2, multi_part_ratio=0.2, seed=7)
+
+
+@pytest.fixture
+def mock_server(library):
+    library.restore()
+    with MockPlexServer(library, max_page_size=100) as server:
+        yield server
+
+
+def test_library_is_deterministic(library):
+    again = SyntheticLibrary(**library.to_dict())
+
+    assert again.movie_xml(1_000_005) == library.movie_xml(1_000_005)
+    assert again.track_xml(again.track_keys()[-1]) == library.track_xml(library.track_keys()[-1])
+    assert library.total_items == 300 + 6 * 12 + 3 * 2 * 5
+
+
+def test_rejects_wrong_token(library):
+    from plexapi.exceptions import Unauthorized
+
+    with MockPlexServer(library, token='right') as server:
+        with pytest.raises(Unauthorized):
+            PlexServer(server.url, 'wrong')
+
+
+def test_get_unwatched_movies_pages_through_library(mock_server, library):
+    from plex_cleanup import PlexCleanup
+
+    cleanup = PlexCleanup(mock_server.url, mock_server.token)
+    mock_server.reset_stats()
+    movies = cleanup.get_unwatched_movies(max_view_count=1)
+
+    all_movies = cleanup.plex.library.section('Movies').all()
+    expected = [m for m in all_movies if (m.viewCount or 0) <= 1]
+    assert len(all_movies) == library.movies
+    assert len(movies) == len(expected) > 0
+    assert any(len(movie['versions']) > 1 for movie in movies)
+    assert any(len(movie['file_paths']) > len(movie['versions']) for movie in movies)
+
+    # 300 movies at 100 per page
+    assert mock_server.stats()['by_endpoint']['GET /library/sections/{id}/all'] >= 3
+
+
+def test_analyze_storage_covers_every_section(mock_server, library):
+    plex = PlexServer(mock_server.url, mock_server.token)
+    stats = StorageAnalyzer(plex, total_capacity_gb=100000).analyze_storage()
+
+    assert stats['library_stats']['Movies']['count'] == library.movies
+    assert stats['library_stats']['TV Shows']['count'] == library.shows
+    assert stats['library_stats']['Music']['count'] == library.artists
+    assert stats['folder_stats']['TV Shows']['count'] == library.shows * library.episodes_per_show
+    assert stats['folder_stats']['Music']['count'] == library.artists * library.albums_per_artist * 5
+    assert stats['folder_stats']['Movies']['count'] >= library.movies
+
+
+def test_delete_removes_item(mock_server, library):
+    plex = PlexServer(mock_server.url, mock_server.token)
+    movie = plex.library.section('Movies').all()[0]
+    movie.delete()
+
+    assert len(plex.library.section('Movies').all()) == library.movies - 1
+    assert movie.ratingKey in library.deleted
@@ -0,0 +1,79 @@
+"""
+Tests for orphaned file detection
+"""
+
+import os
+import sys
+from collections import Counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dir_size_cache import DirectorySizeCache
+from orphan_detector import OrphanDetector
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+
+def fake_plex(*part_files):
+    """A Plex server with one movie library whose movies have the given part files"""
+    movies = [SimpleNamespace(media=[SimpleNamespace(parts=[SimpleNamespace(file=f)])]) for f in part_files]
+    section = SimpleNamespace(type='movie', title='Movies', search=lambda libtype: movies)
+    return SimpleNamespace(library=SimpleNamespace(sections=lambda: [section]))
+
+
+def downloads(root):
+    write(os.path.join(root, 'Movies', 'Kept (2001)', 'kept.mkv'), 100)
+    write(os.path.join(root, 'Movies', 'Kept (2001)', 'kept.nfo'), 3)
+    write(os.path.join(root, 'Movies', 'Gone (2002)', 'gone.mkv'), 200)
+    write(os.path.join(root, 'Movies', 'Gone (2002)', 'Extras', 'trailer.mkv'), 20)
+    write(os.path.join(root, 'stray.iso'), 50)
+
+
+def test_reports_unreferenced_files_and_folders(tmp_path):
+    root = str(tmp_path)
+    downloads(root)
+    plex = fake_plex('/plex/Movies/Kept (2001)/kept.mkv')
+
+    detector = OrphanDetector(plex, plex_path_prefix='/plex', local_path_prefix=root)
+    result = detector.find_orphans([root])
+
+    orphans = [(os.path.relpath(o['path'], root), o['type'], o['size_bytes'], o['file_count'])
+               for o in result['orphans']]
+    assert orphans == [
+        (os.path.join('Movies', 'Gone (2002)'), 'folder', 220, 2),
+        ('stray.iso', 'file', 50, 1),
+        (os.path.join('Movies', 'Kept (2001)', 'kept.nfo'), 'file', 3, 1),
+    ]
+    assert result['plex_parts'] == 1 and result['matched_parts'] == 1
+    assert result['total_files'] == 4
+
+
+def test_every_directory_is_listed_once_with_cache(tmp_path, monkeypatch):
+    root = str(tmp_path / 'downloads')
+    downloads(root)
+    plex = fake_plex(os.path.join(root, 'Movies', 'Kept (2001)', 'kept.mkv'))
+
+    listed = Counter()
+    scandir = os.scandir
+
+    def counting_scandir(path='.'):
+        listed[os.fspath(path)] += 1
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', counting_scandir)
+
+    with DirectorySizeCache(str(tmp_path / 'cache.db')) as cache:
+        result = OrphanDetector(plex, dir_cache=cache).find_orphans([root])
+        assert result['orphans'][0]['size_bytes'] == 220
+        assert set(listed.values()) == {1}
+        assert len(listed) == 5
+
+        # Second run: the orphaned folder comes from the cache without being listed again
+        listed.clear()
+        result = OrphanDetector(plex, dir_cache=cache).find_orphans([root])
+        assert result['orphans'][0]['size_bytes'] == 220
+        assert os.path.join(root, 'Movies', 'Gone (2002)') not in listed
@@ -0,0 +1,85 @@
+"""
+Tests for Plex HTTP instrumentation
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plexapi.server import PlexServer
+
+from mock_plex import MockPlexServer, SyntheticLibrary
+from plex_http_metrics import (
+    endpoint_pattern, instrumented_session, plex_http_stats, plex_operation, recent_operations
+)
+from storage_analyzer import StorageAnalyzer
+
+
+@pytest.fixture
+def mock_server():
+    library = SyntheticLibrary(movies=150, shows=2, episodes_per_show=5, artists=1, albums_per_artist=2,
+                               tracks_per_album=3)
+    plex_http_stats.reset()
+    recent_operations.clear()
+    with MockPlexServer(library, max_page_size=50) as server:
+        yield server
+
+
+def test_endpoint_pattern_collapses_ids():
+    assert endpoint_pattern('http://plex:32400/library/metadata/12345/children?X-Plex-Token=x') == \
+        '/library/metadata/{id}/children'
+    assert endpoint_pattern('http://plex:32400/') == '/'
+
+
+def test_requests_are_counted_per_endpoint(mock_server):
+    plex = PlexServer(mock_server.url, mock_server.token, session=instrumented_session())
+    plex.library.section('Movies').all()
+
+    snapshot = plex_http_stats.snapshot()
+    served = mock_server.stats()
+
+    assert snapshot['totals']['requests'] == served['requests']
+    assert snapshot['totals']['bytes'] == served['bytes']
+    listing = snapshot['endpoints']['GET /library/sections/{id}/all']
+    assert listing['requests'] == served['by_endpoint']['GET /library/sections/{id}/all']
+    assert listing['latencyBuckets']['+Inf'] == listing['requests']
+    assert listing['errors'] == 0
+
+
+def test_operations_nest_and_summarize(mock_server, caplog):
+    plex = PlexServer(mock_server.url, mock_server.token, session=instrumented_session())
+    plex_http_stats.reset()
+
+    with caplog.at_level('INFO', logger='plex_http_metrics'):
+        with plex_operation('space') as outer:
+            StorageAnalyzer(plex).analyze_storage()
+            plex.library.sections()
+
+    inner = recent_operations[0]
+    assert inner.name == 'analyze_storage'
+    assert outer.requests == inner.requests + 1 == plex_http_stats.snapshot()['totals']['requests']
+    assert inner.endpoints['GET /library/metadata/{id}/allLeaves'] == 2
+    assert 'analyze_storage: ' in caplog.text and 'Plex requests' in caplog.text
+
+
+def test_operations_without_plex_traffic_are_not_kept(mock_server):
+    with plex_operation('idle'):
+        pass
+
+    assert list(recent_operations) == []
+
+
+def test_error_responses_are_counted(mock_server):
+    from plexapi.exceptions import NotFound
+
+    plex = PlexServer(mock_server.url, mock_server.token, session=instrumented_session())
+    with plex_operation('lookup') as operation:
+        with pytest.raises(NotFound):
+            plex.fetchItem(999)
+
+    assert operation.errors == 1
+    assert plex_http_stats.snapshot()['endpoints']['GET /library/metadata/{id}']['errors'] == 1
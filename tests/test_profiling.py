@@ -0,0 +1,81 @@
+"""
+Tests for the profiling switch
+"""
+
+import json
+import os
+import pstats
+import sys
+import time
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+from profiling import Profiler, ProfilerBusyError, install_flask_profiling, profile_path
+
+
+def busy_work():
+    time.sleep(0.02)
+    return sum(i * i for i in range(20000))
+
+
+def test_pstats_profile(tmp_path):
+    path = str(tmp_path / 'run.prof')
+    with Profiler(path):
+        busy_work()
+
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'busy_work' in functions
+
+
+def test_speedscope_profile_samples_wall_clock(tmp_path):
+    path = str(tmp_path / 'run.speedscope.json')
+    with Profiler(path):
+        busy_work()
+
+    with open(path) as f:
+        data = json.load(f)
+    profile = data['profiles'][0]
+    assert profile['type'] == 'sampled'
+    assert len(profile['samples']) == len(profile['weights']) > 0
+    assert profile['endValue'] >= 0.015
+    names = {frame['name'] for frame in data['shared']['frames']}
+    assert 'busy_work' in names
+
+
+def test_only_one_profile_at_a_time(tmp_path):
+    with Profiler(str(tmp_path / 'a.prof')):
+        with pytest.raises(ProfilerBusyError):
+            Profiler(str(tmp_path / 'b.prof')).start()
+    # Released again afterwards
+    with Profiler(str(tmp_path / 'c.prof')):
+        pass
+
+
+def test_flask_requests_are_profiled_with_the_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiling, 'PROFILE_OUT', str(tmp_path))
+
+    app = Flask(__name__)
+    install_flask_profiling(app)
+
+    @app.route('/api/items/<int:item>')
+    def item(item):
+        busy_work()
+        return {'item': item}
+
+    client = app.test_client()
+
+    assert 'X-Profile-File' not in client.get('/api/items/1').headers
+    assert client.get('/api/items/1', headers={'X-Profile': 'wrong'}).status_code == 403
+
+    response = client.get('/api/items/1', headers={'X-Profile': 'secret', 'X-Profile-Format': 'speedscope'})
+    assert response.status_code == 200
+    name = response.headers['X-Profile-File']
+    assert name.endswith('-GET-api-items-int-item.speedscope.json')
+    assert os.path.exists(tmp_path / name)
+
+    assert os.path.basename(profile_path('preview', directory=str(tmp_path))).endswith('-preview.prof')
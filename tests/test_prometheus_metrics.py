@@ -0,0 +1,106 @@
+"""
+Tests for the Prometheus exposition
+"""
+
+import os
+import sys
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prometheus_metrics import (
+    CACHE_HIT_RATIO, CACHE_REQUESTS, Counter, Gauge, Histogram, Registry, record_deletion, render,
+    start_metrics_server
+)
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    deleted = Counter('deleted_total', 'Deleted items', ('source',), registry=registry)
+    free = Gauge('free_bytes', 'Free space', registry=registry)
+
+    deleted.inc(source='cli')
+    deleted.inc(2, source='cli')
+    deleted.inc(source='tele"gram')
+    free.set(1.5e12)
+
+    text = registry.render()
+    assert '# TYPE deleted_total counter' in text
+    assert 'deleted_total{source="cli"} 3' in text
+    assert 'deleted_total{source="tele\\"gram"} 1' in text
+    assert 'free_bytes 1500000000000' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0), registry=registry)
+
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, endpoint='/a')
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{endpoint="/a"} 4' in lines
+    assert 'latency_seconds_sum{endpoint="/a"} 4.05' in lines
+
+
+def test_histogram_timer_works_as_decorator():
+    registry = Registry()
+    scans = Histogram('scan_seconds', 'Scans', ('scan',), registry=registry)
+
+    @scans.time(scan='movies')
+    def scan():
+        return 42
+
+    assert scan() == 42
+    assert scan() == 42
+    assert 'scan_seconds_count{scan="movies"} 2' in registry.render()
+
+
+def test_labels_must_match():
+    registry = Registry()
+    counter = Counter('x_total', 'X', ('source',), registry=registry)
+
+    with pytest.raises(ValueError):
+        counter.inc(other='cli')
+    with pytest.raises(ValueError):
+        Counter('x_total', 'Duplicate', registry=registry)
+
+
+def test_function_values_are_read_at_scrape_time():
+    registry = Registry()
+    depth = Gauge('queue_depth', 'Depth', registry=registry)
+    queue = []
+    depth.set_function(lambda: len(queue))
+
+    queue.extend([1, 2, 3])
+    assert 'queue_depth 3' in registry.render()
+
+
+def test_cache_hit_ratio_and_deletions_in_default_registry():
+    CACHE_REQUESTS.inc(3, cache='test_cache', result='hit')
+    CACHE_REQUESTS.inc(1, cache='test_cache', result='miss')
+    record_deletion('test', 2048)
+    record_deletion('test', failed=True)
+
+    assert CACHE_HIT_RATIO.samples()[('test_cache',)] == 0.75
+    text = render()
+    assert 'plex_manager_deleted_bytes_total{source="test"} 2048' in text
+    assert 'plex_manager_deletion_failures_total{source="test"} 1' in text
+    assert '# TYPE plex_manager_plex_request_duration_seconds histogram' in text
+
+
+def test_metrics_server_serves_exposition():
+    server = start_metrics_server(0, addr='127.0.0.1')
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            body = response.read().decode()
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE plex_manager_scan_duration_seconds histogram' in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,126 @@
+"""
+Tests for media request fulfillment against the library index
+"""
+
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401
+
+from job_store import JobRunner, JobStore
+from request_matcher import LibraryIndex, RequestMatcher, normalize_title
+from request_store import RequestStore
+
+
+class FakeSection:
+    def __init__(self, key, section_type, items):
+        self.key = key
+        self.type = section_type
+        self.items = items
+        self.searches = []
+
+    def search(self, libtype, filters=None):
+        self.searches.append(filters)
+        if filters:
+            return [item for item in self.items if item.addedAt >= filters['addedAt>>']]
+        return list(self.items)
+
+
+def item(rating_key, title, year, added=datetime(2026, 1, 1)):
+    return SimpleNamespace(ratingKey=rating_key, title=title, year=year, addedAt=added)
+
+
+@pytest.fixture
+def library():
+    movies = FakeSection(1, 'movie', [item(1, 'The Matrix', 1999), item(2, 'Heat', 1995)])
+    shows = FakeSection(2, 'show', [item(3, 'The Wire', 2002)])
+    return SimpleNamespace(movies=movies, shows=shows,
+                           plex=SimpleNamespace(library=SimpleNamespace(sections=lambda: [movies, shows])))
+
+
+@pytest.fixture
+def matcher(tmp_path):
+    db = str(tmp_path / 'requests.db')
+    return RequestMatcher(RequestStore(db), LibraryIndex(db))
+
+
+def test_normalize_title():
+    assert normalize_title('The Lord of the Rings: The Two Towers') == normalize_title('lord of rings two towers')
+    assert normalize_title('Amélie') == 'amelie'
+    assert normalize_title('The The') == 'the the'
+
+
+def test_new_items_complete_open_requests(matcher, library):
+    waiting = matcher.store.create('Blade Runner', year=1982)
+    assert matcher.sync(library.plex)['indexed'] == 3
+
+    # Already in the library: completed on creation
+    assert matcher.match(matcher.store.create('the matrix', year=1999))['status'] == 'completed'
+    assert matcher.match(matcher.store.create('The Wire', media_type='tv'))['plexRatingKey'] == '3'
+
+    # Added later: the next (incremental) sync completes the waiting request
+    library.movies.items.append(item(4, 'Blade Runner', 1982, added=datetime(2026, 2, 1)))
+    result = matcher.sync(library.plex)
+    assert [r['id'] for r in result['fulfilled']] == [waiting['id']]
+    assert library.movies.searches[-1] is not None
+
+
+def test_full_sync_forgets_items_deleted_elsewhere(matcher, library):
+    matcher.sync(library.plex)
+
+    # Deleted by the CLI, the bot or in Plex itself
+    library.movies.items = [m for m in library.movies.items if m.title != 'Heat']
+    assert matcher.sync(library.plex)['removed'] == 0
+    result = matcher.sync(library.plex, full=True)
+    assert result['removed'] == 1 and result['indexed'] == 2
+
+    assert matcher.match(matcher.store.create('Heat', year=1995))['status'] == 'pending'
+    assert matcher.match(matcher.store.create('The Matrix'))['status'] == 'completed'
+
+
+def test_items_without_a_year_match_requests_with_one(matcher, library):
+    library.movies.items += [item(5, 'Nosferatu', None), item(6, 'Dune', None), item(7, 'Dune', 2021)]
+    matcher.sync(library.plex)
+
+    # Matched both ways: creating the request and syncing the library agree
+    assert matcher.match(matcher.store.create('Nosferatu', year=1922))['plexRatingKey'] == '5'
+    waiting = matcher.store.create('Nosferatu', year=2024)
+    library.movies.items.append(item(8, 'Nosferatu', None, added=datetime(2026, 2, 1)))
+    assert [r['id'] for r in matcher.sync(library.plex)['fulfilled']] == [waiting['id']]
+
+    # The exact year wins over an item without one
+    assert matcher.match(matcher.store.create('Dune', year=2021))['plexRatingKey'] == '7'
+    assert matcher.match(matcher.store.create('Heat', year=1986))['status'] == 'pending'
+
+
+def test_scheduled_tasks_run_once_per_interval_across_workers(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    runs = []
+    workers = [JobRunner(JobStore(db)), JobRunner(JobStore(db))]
+    for worker in workers:
+        worker.schedule('sync', 3600, lambda: runs.append('sync'))
+        worker.schedule('disabled', 0, lambda: runs.append('disabled'))
+
+    for _ in range(3):
+        for worker in workers:
+            worker.run_due_schedules()
+    assert runs == ['sync']
+
+
+def test_create_request_rejects_bad_input():
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    pytest.importorskip('dotenv')
+    import api
+
+    client = api.app.test_client()
+    assert client.post('/api/requests', json={'title': 'Heat', 'year': 'nineteen'}).status_code == 400
+    assert client.post('/api/requests', json={'title': 'Heat', 'year': [1995]}).status_code == 400
+    assert client.post('/api/requests', json=['Heat']).status_code == 400
+    assert client.post('/api/requests', data='Heat', content_type='text/plain').status_code == 400
+    assert client.post('/api/requests', json={'title': 'Heat', 'year': '1995'}).status_code == 201
@@ -0,0 +1,105 @@
+"""
+Tests for the SQLite media request store
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401
+
+from request_store import MAX_PAGE_SIZE, RequestConflictError, RequestStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RequestStore(str(tmp_path / 'requests.db'))
+
+
+def test_list_pages_and_filters_newest_first(store):
+    for i in range(7):
+        store.create(f"Movie {i}", requested_by='alice' if i % 2 else 'bob')
+    store.create('Show', media_type='tv', requested_by='alice')
+
+    page, total = store.list(limit=3)
+    assert total == 8 and [r['title'] for r in page] == ['Show', 'Movie 6', 'Movie 5']
+    page, _ = store.list(limit=3, offset=6)
+    assert [r['title'] for r in page] == ['Movie 1', 'Movie 0']
+
+    page, total = store.list({'requestedBy': 'alice', 'type': 'movie', 'status': ''})
+    assert total == 3 and {r['title'] for r in page} == {'Movie 1', 'Movie 3', 'Movie 5'}
+    assert len(store.list(limit=MAX_PAGE_SIZE + 1)[0]) == 8
+    with pytest.raises(ValueError):
+        store.list({'notes': 'x'})
+
+
+def test_stale_version_is_rejected(store):
+    created = store.create('Heat', year=1995)
+    assert created['version'] == 1 and created['status'] == 'pending'
+
+    # Two admins load version 1; the first approval wins
+    approved = store.update_status(created['id'], 'approved', expected_version=1)
+    assert approved['status'] == 'approved' and approved['version'] == 2
+
+    with pytest.raises(RequestConflictError) as conflict:
+        store.update_status(created['id'], 'rejected', expected_version=1)
+    assert conflict.value.current['status'] == 'approved'
+    assert store.get(created['id'])['status'] == 'approved'
+
+    # Without a version the update is unconditional
+    assert store.update_status(created['id'], 'rejected')['version'] == 3
+    assert store.update_status(12345, 'approved', expected_version=1) is None
+    with pytest.raises(ValueError):
+        store.update_status(created['id'], 'lost')
+
+
+def test_open_requests_are_found_by_normalized_title(store):
+    heat = store.create('Heat', year=1995)
+    any_year = store.create('heat')
+    store.create('Heat', year=2030)
+    store.create('Heat', media_type='tv')
+
+    found = {r['id'] for r in store.find_open_by_title('movie', heat['title'].lower(), 1995)}
+    assert found == {heat['id'], any_year['id']}
+
+    completed = store.mark_fulfilled(heat['id'], 42)
+    assert completed['status'] == 'completed' and completed['plexRatingKey'] == '42'
+    assert store.mark_fulfilled(heat['id'], 43) is None
+
+
+def test_api_returns_409_on_conflict():
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    pytest.importorskip('dotenv')
+    import api
+
+    client = api.app.test_client()
+    created = client.post('/api/requests', json={'title': 'Conflict Test Movie'}).get_json()['request']
+
+    first = client.patch(f"/api/requests/{created['id']}", json={'status': 'approved', 'version': 1})
+    second = client.patch(f"/api/requests/{created['id']}", json={'status': 'rejected', 'version': 1})
+    assert first.status_code == 200
+    assert second.status_code == 409 and second.get_json()['request']['status'] == 'approved'
+    assert client.patch(f"/api/requests/{created['id']}",
+                        json={'status': 'rejected', 'version': 'two'}).status_code == 400
+
+
+def test_api_rejects_bad_update_bodies():
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    pytest.importorskip('dotenv')
+    import api
+
+    client = api.app.test_client()
+    created = client.post('/api/requests', json={'title': 'Bad Update Movie'}).get_json()['request']
+    url = f"/api/requests/{created['id']}"
+
+    assert client.patch(url).status_code == 400
+    assert client.patch(url, data='not json', content_type='application/json').status_code == 400
+    assert client.patch(url, json=['approved']).status_code == 400
+    for version in (1.0, True, '1'):
+        response = client.patch(url, json={'status': 'approved', 'version': version})
+        assert response.status_code == 400 and response.get_json()['error'] == 'Version must be an integer'
+    assert client.patch(url, json={'status': 'approved', 'version': 1}).status_code == 200
@@ -0,0 +1,90 @@
+"""
+Tests for the timing spans and exporters
+"""
+
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracing import (
+    JSONLogExporter, OTLPFileExporter, ProfileCollector, add_exporter, current_span, remove_exporter, span,
+    traced
+)
+
+
+@pytest.fixture
+def exporter():
+    exporters = []
+
+    def register(instance):
+        exporters.append(add_exporter(instance))
+        return instance
+
+    yield register
+    for instance in exporters:
+        remove_exporter(instance)
+
+
+def test_spans_nest_and_export_once_per_trace(exporter, tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    exporter(OTLPFileExporter(str(path), service_name='test'))
+
+    @traced('format')
+    def format_report():
+        return current_span().name
+
+    with span('scan', library='Movies') as root:
+        with span('section.fetch') as fetch:
+            fetch.set('items', 3)
+        assert format_report() == 'format'
+        root.count('files', 2)
+    assert current_span() is None
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    resource = json.loads(lines[0])['resourceSpans'][0]
+    assert resource['resource']['attributes'][0]['value'] == {'stringValue': 'test'}
+    spans = {s['name']: s for s in resource['scopeSpans'][0]['spans']}
+    assert set(spans) == {'scan', 'section.fetch', 'format'}
+    assert len({s['traceId'] for s in spans.values()}) == 1
+    assert spans['section.fetch']['parentSpanId'] == spans['scan']['spanId']
+    assert spans['scan']['parentSpanId'] == ''
+    assert {'key': 'items', 'value': {'intValue': '3'}} in spans['section.fetch']['attributes']
+    assert int(spans['scan']['endTimeUnixNano']) >= int(spans['format']['endTimeUnixNano'])
+
+
+def test_errors_are_recorded_on_the_span(exporter, caplog):
+    exporter(JSONLogExporter())
+
+    with caplog.at_level(logging.INFO, logger='tracing.spans'):
+        with pytest.raises(ValueError):
+            with span('ssh.df'):
+                raise ValueError('boom')
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['span'] == 'ssh.df'
+    assert record['attributes']['error'] == 'ValueError: boom'
+
+
+def test_profile_collector_merges_repeated_paths(exporter):
+    profiler = exporter(ProfileCollector())
+
+    with span('analyze_storage'):
+        for episodes in (3, 4):
+            with span('episodes.fetch') as fetch:
+                fetch.set('episodes', episodes)
+    with span('format_cli_report'):
+        pass
+
+    report = profiler.report()
+    lines = report.splitlines()
+    fetch_line = next(line for line in lines if 'episodes.fetch' in line)
+    assert fetch_line.startswith('  episodes.fetch')
+    assert 'x2' in fetch_line and 'episodes=7' in fetch_line
+    assert lines.index(fetch_line) == next(i for i, line in enumerate(lines) if 'analyze_storage' in line) + 1
+    assert any(line.startswith('format_cli_report') for line in lines)
@@ -0,0 +1,135 @@
+"""
+Tests for TV cleanup candidate grouping
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cleanup_policy import CleanupPolicy
+from tv_cleanup import apply_exclusions, flatten_episodes, format_tv_report, plan_tv_cleanup
+
+NOW = datetime(2026, 1, 1)
+GB = 1024 ** 3
+
+
+def episode(show, season, number, watched_days_ago=None, size_gb=1):
+    return SimpleNamespace(
+        ratingKey=f"{show}{season}{number}",
+        title=f"Episode {number}",
+        grandparentTitle=f"Show {show}",
+        grandparentRatingKey=show,
+        parentIndex=season,
+        index=number,
+        viewCount=1 if watched_days_ago is not None else 0,
+        lastViewedAt=NOW - timedelta(days=watched_days_ago) if watched_days_ago is not None else None,
+        addedAt=NOW - timedelta(days=400),
+        media=[SimpleNamespace(videoResolution='1080', container='mkv',
+                               parts=[SimpleNamespace(file=f"/tv/{show}/{season}/{number}.mkv", size=int(size_gb * GB))])],
+    )
+
+
+def library():
+    return [
+        # Show 1: season 1 fully watched long ago, season 2 still being watched
+        *[episode(1, 1, n, watched_days_ago=100) for n in range(1, 4)],
+        episode(1, 2, 1, watched_days_ago=2), episode(1, 2, 2),
+        # Show 2: abandoned half way through
+        episode(2, 1, 1, watched_days_ago=300, size_gb=2), episode(2, 1, 2, watched_days_ago=250, size_gb=2),
+        episode(2, 1, 3, size_gb=2), episode(2, 2, 1, size_gb=2),
+        # Show 3: season fully watched, but only last week
+        *[episode(3, 1, n, watched_days_ago=7) for n in range(1, 3)],
+        # Show 4: never watched
+        episode(4, 1, 1),
+    ]
+
+
+def test_seasons_and_abandoned_shows():
+    groups = plan_tv_cleanup(library(), watched_season_days=30, abandoned_days=180, now=NOW)
+
+    assert [(g['kind'], g['show'], g['season'], g['episode_count']) for g in groups] == [
+        ('show', 'Show 2', None, 4),
+        ('season', 'Show 1', 1, 3),
+    ]
+    show = groups[0]
+    assert show['file_size_mb'] == 8 * 1024
+    assert show['season_sizes_mb'] == {1: 6 * 1024, 2: 2 * 1024}
+    assert show['watched_count'] == 2 and show['last_viewed'] == '2025-04-26'
+    assert groups[1]['episodes'][0]['title'] == 'Show 1 - S01E01 - Episode 1'
+    assert 'Show 2' in format_tv_report(groups)
+
+
+def test_watched_episodes_rule_skips_grouped_episodes():
+    groups = plan_tv_cleanup(library(), watched_season_days=30, abandoned_days=180, watched_episode_days=5, now=NOW)
+
+    by_kind = {(g['kind'], g['show']): g for g in groups}
+    assert set(by_kind) == {('show', 'Show 2'), ('season', 'Show 1'), ('episodes', 'Show 3')}
+    # Show 1 season 2 was watched 2 days ago: nothing else to delete there
+    assert by_kind[('episodes', 'Show 3')]['episode_count'] == 2
+
+    keys = [e['plex_object'].ratingKey for e in flatten_episodes(groups)]
+    assert len(keys) == len(set(keys)) == 4 + 3 + 2
+
+    # Rules are independent: with only the episode rule, show 2's watched episodes qualify on their own
+    only_episodes = plan_tv_cleanup(library(), None, None, watched_episode_days=200, now=NOW)
+    assert [(g['kind'], g['show'], g['episode_count']) for g in only_episodes] == [('episodes', 'Show 2', 2)]
+
+
+def test_scan_uses_bulk_episode_queries():
+    from mock_plex import MockPlexServer, SyntheticLibrary
+    from plexapi.server import PlexServer
+    from tv_cleanup import TVCleanup
+
+    with MockPlexServer(SyntheticLibrary(movies=10, shows=12, episodes_per_show=20), max_page_size=50) as server:
+        plex = PlexServer(server.url, server.token)
+        server.reset_stats()
+        groups = TVCleanup(plex).find_candidates(watched_season_days=30, abandoned_days=180, watched_episode_days=60)
+
+        assert groups
+        by_endpoint = server.stats()['by_endpoint']
+        assert 'GET /library/metadata/{id}' not in by_endpoint
+        assert 'GET /library/metadata/{id}/children' not in by_endpoint
+        # 240 episodes, listed in pages of at most 50
+        assert by_endpoint['GET /library/sections/{id}/all'] <= 5
+
+
+def test_policy_exclusions_protect_shows_and_episodes():
+    def tags(*names):
+        return [SimpleNamespace(tag=name) for name in names]
+
+    episodes = library()
+    episodes[0].labels = tags('Keep')
+    shows = [SimpleNamespace(ratingKey=2, collections=tags('Favourites')), SimpleNamespace(ratingKey=3)]
+    compiled = CleanupPolicy(exclude_labels=['keep'], exclude_collections=['favourites']).compile(now=NOW)
+
+    eligible = apply_exclusions(episodes, compiled, shows)
+    assert episodes[0] not in eligible
+    assert {e.grandparentRatingKey for e in eligible} == {1, 3, 4} and len(eligible) == len(episodes) - 5
+
+    groups = plan_tv_cleanup(eligible, watched_season_days=30, abandoned_days=180, now=NOW)
+    assert [(g['kind'], g['show'], g['episode_count']) for g in groups] == [('season', 'Show 1', 2)]
+    # Without exclusions nothing is filtered
+    assert apply_exclusions(episodes, CleanupPolicy().compile(now=NOW), shows) == episodes
+
+
+def test_scan_honours_policy_libraries():
+    from mock_plex import MockPlexServer, SyntheticLibrary
+    from plexapi.server import PlexServer
+    from tv_cleanup import TVCleanup
+
+    with MockPlexServer(SyntheticLibrary(movies=10, shows=4, episodes_per_show=20)) as server:
+        plex = PlexServer(server.url, server.token)
+        rules = dict(watched_season_days=30, abandoned_days=180, watched_episode_days=60)
+
+        server.reset_stats()
+        assert TVCleanup(plex).find_candidates(**rules, policy=CleanupPolicy(exclude_libraries=['tv shows'])) == []
+        assert TVCleanup(plex).find_candidates(**rules, policy=CleanupPolicy(libraries=['Movies'])) == []
+        assert 'GET /library/sections/{id}/all' not in server.stats()['by_endpoint']
+
+        listed = TVCleanup(plex).find_candidates(**rules, policy=CleanupPolicy(libraries=['Movies', 'TV Shows']))
+        unrestricted = TVCleanup(plex).find_candidates(**rules, policy=CleanupPolicy())
+        assert listed and [g['title'] for g in listed] == [g['title'] for g in unrestricted]
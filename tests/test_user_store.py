@@ -0,0 +1,87 @@
+"""
+Tests for the SQLite user store shared by the backend workers
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import backend_env  # noqa: F401
+
+from user_store import UserStore
+
+
+def record(password_hash='hash'):
+    return {'password_hash': password_hash, 'totp_secret': 'SECRET', 'totp_enabled': False,
+            'created_at': '2026-01-01T00:00:00'}
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({
+        'alice': dict(record('a'), totp_enabled=True, reset_token='raw-token', reset_token_expires='2030-01-01'),
+        'bob': record('b'),
+    }))
+    db = str(tmp_path / 'users.db')
+
+    store = UserStore(db, legacy_json_file=str(legacy))
+    assert sorted(store) == ['alice', 'bob'] and len(store) == 2
+    alice = store['alice']
+    assert alice['totp_enabled'] is True
+    assert alice['reset_token_hash'] == hashlib.sha256(b'raw-token').hexdigest()
+    assert 'reset_token' not in alice and 'tokens_valid_after' not in alice
+
+    # A user deleted later must not come back from the JSON file on the next start
+    store._conn().execute("DELETE FROM users WHERE username = 'bob'")
+    store._conn().commit()
+    assert 'bob' not in UserStore(db, legacy_json_file=str(legacy))
+
+
+def test_updates_from_different_workers_do_not_clobber_each_other(tmp_path):
+    db = str(tmp_path / 'users.db')
+    first, second = UserStore(db), UserStore(db)
+    assert first.create('alice', record())
+    assert not second.create('alice', record())
+
+    # Each worker changes a different field of the same row
+    assert first.update('alice', password_hash='new-hash')
+    assert second.update('alice', totp_enabled=True)
+
+    alice = UserStore(db)['alice']
+    assert alice['password_hash'] == 'new-hash' and alice['totp_enabled'] is True
+    assert not first.update('nobody', totp_enabled=True)
+    with pytest.raises(ValueError):
+        first.update('alice', is_admin=True)
+
+
+def test_concurrent_creates_from_threads(tmp_path):
+    store = UserStore(str(tmp_path / 'users.db'))
+    results = []
+
+    def register(name):
+        results.append(store.create(name, record()))
+
+    threads = [threading.Thread(target=register, args=(f"user{i % 10}",)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 10 and len(store) == 10
+
+
+def test_reset_token_lookup_by_digest(tmp_path):
+    store = UserStore(str(tmp_path / 'users.db'))
+    store.create('alice', record())
+    store.update('alice', reset_token_hash='digest', reset_token_expires='2000-01-01T00:00:00')
+
+    username, alice = store.find_by_reset_token('digest')
+    assert username == 'alice' and alice['reset_token_hash'] == 'digest'
+
+    store.clear_expired_reset_tokens('2001-01-01T00:00:00')
+    assert store.find_by_reset_token('digest') is None
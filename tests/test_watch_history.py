@@ -0,0 +1,154 @@
+"""
+Tests for the server-wide watch history index
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_plex import MockPlexServer, SyntheticLibrary
+from watch_history import WatchHistory
+
+HISTORY = 'GET /status/sessions/history/all'
+
+
+def expected_index(plays):
+    index = {}
+    for _, rating_key, viewed_at, account_id in plays:
+        count, last, users = index.get(str(rating_key), (0, 0, set()))
+        index[str(rating_key)] = (count + 1, max(last, viewed_at), users | {str(account_id)})
+    return index
+
+
+def test_index_is_built_and_updated_incrementally(tmp_path):
+    from plexapi.server import PlexServer
+
+    library = SyntheticLibrary(movies=50, shows=3, episodes_per_show=10, history=230)
+    cache = str(tmp_path / 'history.db')
+
+    with MockPlexServer(library, max_page_size=100) as server:
+        plex = PlexServer(server.url, server.token)
+
+        with WatchHistory(cache, page_size=100) as history:
+            result = history.refresh(plex)
+            assert result['new'] == 230 and result['pages'] == 3 and history.last_id == 230
+
+            for rating_key, (plays, last, users) in expected_index(library.plays).items():
+                stats = history.get(rating_key)
+                assert stats.plays == plays and stats.users == users
+                assert stats.last_viewed.timestamp() == last
+
+        # A new play costs two small pages (the second confirms nothing newer follows),
+        # and the cache carries over between instances
+        movie = library.movie_keys()[0]
+        library.add_play(movie, 7, int(time.time()))
+        server.reset_stats()
+        with WatchHistory(cache, page_size=100) as history:
+            assert history.refresh(plex)['new'] == 1
+            assert server.stats()['by_endpoint'][HISTORY] == 2
+            server.reset_stats()
+            assert history.refresh(plex)['new'] == 0
+            assert server.stats()['by_endpoint'][HISTORY] == 1
+            assert '7' in history.get(movie).users
+            assert history.get(movie).plays == expected_index(library.plays)[str(movie)][0]
+
+            # History cleared on the server: the index is rebuilt rather than left stale
+            library.plays[:] = [[1, movie, int(time.time()), 2]]
+            history.refresh(plex)
+            assert len(history) == 1 and history.get(movie).plays == 1 and history.last_id == 1
+
+
+def test_late_synced_plays_and_incremental_index(tmp_path, monkeypatch):
+    from plexapi.server import PlexServer
+
+    library = SyntheticLibrary(movies=50, history=120)
+    with MockPlexServer(library, max_page_size=100) as server:
+        plex = PlexServer(server.url, server.token)
+        with WatchHistory(str(tmp_path / 'history.db'), page_size=100) as history:
+            history.refresh(plex)
+
+            # Refreshes fold new plays into the index instead of rereading every stored play
+            monkeypatch.setattr(history, '_load', lambda: pytest.fail('index reread from the cache'))
+            movies = library.movie_keys()
+            now = int(time.time())
+            library.add_play(movies[0], 9, now)
+            # Played offline a while ago and synced now: the newest ID, but sorted below plays already stored
+            older_than_stored = library.plays[100][2] - 60
+            late = library.add_play(movies[1], 8, older_than_stored)
+            assert history.refresh(plex)['new'] == 2 and history.last_id == late
+
+            for rating_key, (plays, last, users) in expected_index(library.plays).items():
+                stats = history.get(rating_key)
+                assert (stats.plays, stats.last_viewed.timestamp(), stats.users) == (plays, last, users)
+
+
+def test_plays_are_counted_once(tmp_path):
+    from plexapi.server import PlexServer
+
+    library = SyntheticLibrary(movies=50, history=120)
+    cache = str(tmp_path / 'history.db')
+
+    with MockPlexServer(library, max_page_size=100) as server:
+        plex = PlexServer(server.url, server.token)
+
+        # A play arriving while paging shifts the next page: its first entry was already on the previous one
+        query = plex.query
+        calls = []
+
+        def query_with_new_play(path, *args, **kwargs):
+            if calls:
+                library.add_play(library.movie_keys()[1], 5, int(time.time()))
+            calls.append(path)
+            return query(path, *args, **kwargs)
+
+        plex.query = query_with_new_play
+        with WatchHistory(cache, page_size=100) as history:
+            assert history.refresh(plex)['new'] == 120 and len(calls) == 2
+            plex.query = query
+            # The play that arrived meanwhile is newer than last_id and comes with the next refresh
+            assert history.refresh(plex)['new'] == 1
+            for rating_key, (plays, _, _) in expected_index(library.plays).items():
+                assert history.get(rating_key).plays == plays
+
+        # Two processes refreshing the same cache fetch the same new plays; the second write adds nothing
+        library.add_play(library.movie_keys()[0], 7, int(time.time()))
+        with WatchHistory(cache, page_size=100) as first, WatchHistory(cache, page_size=100) as second:
+            fetch = second._fetch_new
+
+            def fetch_while_first_refreshes(plex, last_id):
+                result = fetch(plex, last_id)
+                assert first.refresh(plex)['new'] == 1
+                return result
+
+            second._fetch_new = fetch_while_first_refreshes
+            assert second.refresh(plex)['new'] == 0
+
+            expected = expected_index(library.plays)
+            for history in (first, second):
+                for rating_key, (plays, _, users) in expected.items():
+                    assert (history.get(rating_key).plays, history.get(rating_key).users) == (plays, users)
+
+
+def test_candidates_use_every_accounts_plays():
+    from plex_cleanup import PlexCleanup
+
+    library = SyntheticLibrary(movies=60)
+    with MockPlexServer(library, max_page_size=50) as server:
+        cleanup = PlexCleanup(server.url, server.token)
+        owner_only = cleanup.get_unwatched_movies(max_view_count=1, days_since_watched=30)
+        watched_elsewhere = owner_only[0]['plex_object'].ratingKey
+
+        # Someone else watched it yesterday
+        library.add_play(watched_elsewhere, 3, int(time.time()) - 86400)
+        with WatchHistory(':memory:') as history:
+            movies = cleanup.get_unwatched_movies(max_view_count=1, days_since_watched=30, history=history)
+
+        keys = {m['plex_object'].ratingKey for m in movies}
+        assert watched_elsewhere not in keys
+        assert keys == {m['plex_object'].ratingKey for m in owner_only} - {watched_elsewhere}
+        assert {m['watched_by'] for m in movies} == {0}
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Tracing
+Lightweight per-phase timing spans for scans and reports
+
+    with span('section.fetch', section=section.title) as s:
+        items = section.all()
+        s.set('items', len(items))
+
+Spans nest through a contextvar. When a top-level span ends, the whole trace
+goes to the configured exporters:
+
+- JSONLogExporter: one JSON log line per span
+- OTLPFileExporter: OpenTelemetry OTLP/JSON, one ExportTraceServiceRequest
+  per line (the OpenTelemetry Collector file exporter format)
+- ProfileCollector: aggregates spans by call path for a flame-style breakdown
+
+Exporters can also be configured from the environment:
+    TRACE_JSON_LOG=1             log every span as JSON
+    TRACE_OTEL_FILE=traces.jsonl append OTLP/JSON traces to a file
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'plex-manager')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_exporters = []
+_exporters_lock = threading.Lock()
+
+
+class Span:
+    """One timed phase: name, parent, start/end (ns since epoch) and attributes"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent', 'start_ns', 'end_ns', 'attributes', 'children',
+                 '_token', '_lock')
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        # Finished descendants, collected on the root span for export
+        self.children = [] if parent is None else None
+        self._token = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        """Seconds (so far, if still running)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    @property
+    def root(self):
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def set(self, key, value):
+        """Set an attribute"""
+        self.attributes[key] = value
+        return self
+
+    def count(self, key, amount=1):
+        """Add to a numeric attribute"""
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+        return self
+
+    def to_dict(self):
+        return {
+            'span': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'start_ns': self.start_ns,
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+        }
+
+    # Context manager
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.attributes['error'] = f"{exc_type.__name__}: {exc}"
+        self.end()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended in a different context than it started in
+                _current_span.set(self.parent)
+            self._token = None
+        return False
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        root = self.root
+        if root is self:
+            _export([self] + self.children)
+        else:
+            with root._lock:
+                root.children.append(self)
+
+
+def span(name, **attributes):
+    """Start a span as a child of the current one (use as a context manager)"""
+    return Span(name, _current_span.get(), attributes)
+
+
+def current_span():
+    """The innermost open span, or None"""
+    return _current_span.get()
+
+
+def traced(name=None, **attributes):
+    """Decorator: run every call of the function in a span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_exporter(exporter):
+    """Register exporter.export(spans) to receive every finished trace"""
+    with _exporters_lock:
+        _exporters.append(exporter)
+    return exporter
+
+
+def remove_exporter(exporter):
+    with _exporters_lock:
+        if exporter in _exporters:
+            _exporters.remove(exporter)
+
+
+def _export(spans):
+    with _exporters_lock:
+        exporters = list(_exporters)
+    for exporter in exporters:
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"⚠️  Trace exporter {type(exporter).__name__} failed: {e}")
+
+
+class JSONLogExporter:
+    """Log each span as one JSON line"""
+
+    def __init__(self, log=None, level=logging.INFO):
+        self.log = log or logging.getLogger('tracing.spans')
+        self.level = level
+
+    def export(self, spans):
+        for finished in spans:
+            self.log.log(self.level, json.dumps(finished.to_dict(), default=str))
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OTLPFileExporter:
+    """Append traces to a file as OTLP/JSON lines, readable by OpenTelemetry tooling"""
+
+    def __init__(self, path, service_name=SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        request = {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [
+                        {
+                            'traceId': s.trace_id,
+                            'spanId': s.span_id,
+                            'parentSpanId': s.parent.span_id if s.parent else '',
+                            'name': s.name,
+                            'kind': 1,
+                            'startTimeUnixNano': str(s.start_ns),
+                            'endTimeUnixNano': str(s.end_ns),
+                            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in s.attributes.items()],
+                            'status': {'code': 2, 'message': s.attributes['error']} if 'error' in s.attributes
+                                      else {},
+                        }
+                        for s in spans
+                    ],
+                }],
+            }]
+        }
+        line = json.dumps(request, default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class ProfileCollector:
+    """
+    Aggregate spans by call path (root > child > ...) for a flame-style breakdown
+
+    Repeated spans on the same path (one per section, per show, ...) are
+    merged: total time, number of calls and summed numeric attributes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths = {}
+
+    def export(self, spans):
+        by_id = {s.span_id: s for s in spans}
+        with self._lock:
+            for s in spans:
+                path = []
+                node = s
+                while node is not None:
+                    path.append(node.name)
+                    node = by_id.get(node.parent.span_id) if node.parent else None
+                path = tuple(reversed(path))
+
+                entry = self._paths.setdefault(path, {'seconds': 0.0, 'calls': 0, 'counts': {}})
+                entry['seconds'] += (s.end_ns - s.start_ns) / 1e9
+                entry['calls'] += 1
+                for key, value in s.attributes.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        entry['counts'][key] = entry['counts'].get(key, 0) + value
+
+    def report(self, width=30):
+        """Indented tree of paths with total time, share of the top level and calls"""
+        with self._lock:
+            paths = dict(self._paths)
+        if not paths:
+            return "No spans recorded"
+
+        total = sum(entry['seconds'] for path, entry in paths.items() if len(path) == 1) or 1e-9
+        name_width = max(len('  ' * (len(path) - 1) + path[-1]) for path in paths) + 2
+
+        lines = ["=" * (name_width + width + 40), "PROFILE (time per phase)", "=" * (name_width + width + 40)]
+
+        def walk(prefix):
+            children = [path for path in paths if len(path) == len(prefix) + 1 and path[:len(prefix)] == prefix]
+            for path in sorted(children, key=lambda p: -paths[p]['seconds']):
+                entry = paths[path]
+                share = entry['seconds'] / total
+                label = '  ' * (len(path) - 1) + path[-1]
+                calls = f"x{entry['calls']}" if entry['calls'] > 1 else ''
+                counts = ', '.join(f"{key}={value:,}" if isinstance(value, int) else f"{key}={value:,.1f}"
+                                   for key, value in entry['counts'].items())
+                lines.append(
+                    f"{label:<{name_width}}{entry['seconds']:>9.2f} s {share:>6.1%} "
+                    f"{'█' * max(1 if entry['seconds'] else 0, round(share * width)):<{width}} {calls:>6} {counts}"
+                )
+                walk(path)
+
+        walk(())
+        return '\n'.join(lines)
+
+
+def _configure_from_env():
+    if os.getenv('TRACE_JSON_LOG', '').lower() in ('1', 'true', 'yes'):
+        add_exporter(JSONLogExporter())
+    if os.getenv('TRACE_OTEL_FILE'):
+        add_exporter(OTLPFileExporter(os.getenv('TRACE_OTEL_FILE')))
+
+
+_configure_from_env()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+TV Cleanup
+Finds TV space to reclaim: fully watched seasons, abandoned shows and
+episodes watched long ago
+
+Episodes are fetched per library in one paged bulk query (no per-show or
+per-season requests) and grouped by show and season locally. Candidates are
+groups, largest first:
+
+    show      abandoned: some episodes watched, none in abandoned_days
+    season    every episode watched, the last one over watched_season_days ago
+    episodes  the watched episodes of a partly watched season, each watched
+              over watched_episode_days ago
+
+A show is never listed twice: an abandoned show's seasons and episodes are
+part of the show group, and a fully watched season's episodes are part of the
+season group.
+
+With a WatchHistory, "watched" and "last played" cover every account.
+
+The cleanup policy (cleanup_policy.py) picks the TV libraries scanned
+(libraries, exclude_libraries), and its exclude_labels and exclude_collections
+protect whole shows as well as single episodes. Its watch, size and
+resolution rules are for movies; the rules above replace them.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from cleanup_policy import default_policy, movie_candidate, view_state
+from plex_http_metrics import plex_operation
+from prometheus_metrics import SCAN_SECONDS, TV_CLEANUP_CANDIDATE_BYTES, TV_CLEANUP_CANDIDATE_EPISODES
+from tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCHED_SEASON_DAYS = 30
+DEFAULT_ABANDONED_DAYS = 180
+
+KIND_LABELS = {'show': 'Abandoned show', 'season': 'Watched season', 'episodes': 'Watched episodes'}
+
+
+def _raw(item, attr):
+    """An attribute as listed by Plex, without plexapi reloading the episode when it is missing"""
+    return item.__dict__.get(attr)
+
+
+def episode_candidate(episode, history=None) -> Dict:
+    """Candidate dictionary for one episode, titled 'Show - S01E02 - Title'"""
+    candidate = movie_candidate(episode, history)
+    season = _raw(episode, 'parentIndex')
+    number = _raw(episode, 'index')
+    code = f"S{season or 0:02d}E{number or 0:02d}"
+    candidate['title'] = f"{_raw(episode, 'grandparentTitle')} - {code} - {candidate['title']}"
+    return candidate
+
+
+def _last_viewed(episode, history=None) -> Optional[datetime]:
+    return view_state(episode, history)[1]
+
+
+def _latest(episodes, history=None) -> Optional[datetime]:
+    dates = [date for date in (_last_viewed(e, history) for e in episodes) if date]
+    return max(dates) if dates else None
+
+
+def _watched(episode, history=None) -> bool:
+    return view_state(episode, history)[0] > 0
+
+
+def _group(kind, show_title, show_key, season, episodes, reason, history=None) -> Dict:
+    candidates = [episode_candidate(e, history) for e in episodes]
+    latest = _latest(episodes, history)
+    size_mb = sum(c['file_size_mb'] for c in candidates)
+
+    if kind == 'show':
+        title = show_title
+    elif kind == 'season':
+        title = f"{show_title} - Season {season}"
+    else:
+        title = f"{show_title} - Season {season} ({len(episodes)} episodes)"
+
+    seasons = defaultdict(float)
+    for episode, candidate in zip(episodes, candidates):
+        seasons[_raw(episode, 'parentIndex') or 0] += candidate['file_size_mb']
+
+    return {
+        'kind': kind,
+        'title': title,
+        'show': show_title,
+        'show_key': show_key,
+        'season': season,
+        'episode_count': len(episodes),
+        'watched_count': sum(1 for e in episodes if _watched(e, history)),
+        'file_size_mb': size_mb,
+        'season_sizes_mb': dict(sorted(seasons.items())),
+        'last_viewed': latest.strftime('%Y-%m-%d') if latest else 'Never',
+        'reason': reason,
+        'episodes': candidates,
+    }
+
+
+def plan_tv_cleanup(episodes, watched_season_days: Optional[int] = DEFAULT_WATCHED_SEASON_DAYS,
+                    abandoned_days: Optional[int] = DEFAULT_ABANDONED_DAYS,
+                    watched_episode_days: Optional[int] = None, now: Optional[datetime] = None,
+                    history=None) -> List[Dict]:
+    """
+    Group episodes into cleanup candidates
+
+    Args:
+        episodes: plexapi Episodes (from a bulk library query)
+        watched_season_days: Fully watched seasons whose last play is older than this (None: off)
+        abandoned_days: Partly watched shows with no play in this many days (None: off)
+        watched_episode_days: Watched episodes whose last play is older than this (None: off)
+        now: Reference time (default: now)
+        history: WatchHistory to count every account's plays (default: the token owner's)
+
+    Returns:
+        Candidate groups (see module docstring), largest first
+    """
+    now = now or datetime.now()
+
+    def older_than(when, days):
+        return when is None or when <= now - timedelta(days=days)
+
+    shows = defaultdict(lambda: defaultdict(list))
+    titles = {}
+    for episode in episodes:
+        show_key = str(_raw(episode, 'grandparentRatingKey'))
+        titles[show_key] = _raw(episode, 'grandparentTitle')
+        shows[show_key][_raw(episode, 'parentIndex') or 0].append(episode)
+
+    groups = []
+    for show_key, seasons in shows.items():
+        show_title = titles[show_key]
+        show_episodes = [e for season in seasons.values() for e in season]
+        watched = sum(1 for e in show_episodes if _watched(e, history))
+
+        if abandoned_days is not None and 0 < watched < len(show_episodes):
+            latest = _latest(show_episodes, history)
+            if older_than(latest, abandoned_days):
+                since = f"since {latest.strftime('%Y-%m-%d')}" if latest else 'in a long time'
+                groups.append(_group('show', show_title, show_key, None, show_episodes,
+                                     f"{watched}/{len(show_episodes)} episodes watched, none {since}", history))
+                continue
+
+        for season, season_episodes in sorted(seasons.items()):
+            if (watched_season_days is not None and all(_watched(e, history) for e in season_episodes)
+                    and older_than(_latest(season_episodes, history), watched_season_days)):
+                groups.append(_group('season', show_title, show_key, season, season_episodes,
+                                     f"all {len(season_episodes)} episodes watched", history))
+                continue
+
+            if watched_episode_days is not None:
+                old = [e for e in season_episodes
+                       if _watched(e, history) and older_than(_last_viewed(e, history), watched_episode_days)]
+                if old:
+                    groups.append(_group('episodes', show_title, show_key, season, old,
+                                         f"watched over {watched_episode_days} days ago", history))
+
+    groups.sort(key=lambda g: g['file_size_mb'], reverse=True)
+    return groups
+
+
+def apply_exclusions(episodes, compiled, shows=()) -> List:
+    """
+    Drop the episodes a policy's label and collection exclusions protect
+
+    Args:
+        episodes: plexapi Episodes
+        compiled: CompiledPolicy
+        shows: plexapi Shows of the same libraries; an excluded show excludes all its episodes
+
+    Returns:
+        The episodes still eligible for cleanup
+    """
+    if not compiled.exclusions:
+        return list(episodes)
+    excluded_shows = {str(_raw(show, 'ratingKey')) for show in shows if compiled.excluded(show)}
+    return [episode for episode in episodes
+            if str(_raw(episode, 'grandparentRatingKey')) not in excluded_shows and not compiled.excluded(episode)]
+
+
+def flatten_episodes(groups: List[Dict]) -> List[Dict]:
+    """The episode candidates of a list of groups, ready for deletion"""
+    return [episode for group in groups for episode in group['episodes']]
+
+
+class TVCleanup:
+    """Finds TV cleanup candidates on a Plex server"""
+
+    def __init__(self, plex_server):
+        """
+        Args:
+            plex_server: Connected PlexServer
+        """
+        self.plex = plex_server
+
+    @plex_operation('find_tv_candidates')
+    @SCAN_SECONDS.time(scan='find_tv_candidates')
+    @traced('find_tv_candidates')
+    def find_candidates(self, watched_season_days: Optional[int] = DEFAULT_WATCHED_SEASON_DAYS,
+                        abandoned_days: Optional[int] = DEFAULT_ABANDONED_DAYS,
+                        watched_episode_days: Optional[int] = None, history=None,
+                        policy=None) -> List[Dict]:
+        """
+        Scan the TV libraries the cleanup policy allows for cleanup candidates
+
+        Args:
+            watched_season_days: Fully watched seasons idle this long (None: off)
+            abandoned_days: Partly watched shows idle this long (None: off)
+            watched_episode_days: Watched episodes idle this long (None: off)
+            history: WatchHistory to count every account's plays (updated first)
+            policy: CleanupPolicy for libraries and exclusions (default: default_policy())
+
+        Returns:
+            Candidate groups, largest first (see plan_tv_cleanup)
+        """
+        if history is not None:
+            history.refresh_or_warn(self.plex)
+        compiled = (policy or default_policy()).compile(history=history)
+
+        with span('sections.fetch') as fetch:
+            sections = compiled.sections(self.plex.library, libtype='show')
+            fetch.set('sections', len(sections))
+
+        if not sections:
+            logger.warning("No TV libraries found in Plex")
+            return []
+
+        episodes = []
+        for section in sections:
+            logger.info(f"Scanning TV library: {section.title}")
+            # One paged query returns every episode with its view state and media
+            with span('episodes.fetch', section=section.title) as fetch:
+                section_episodes = section.searchEpisodes()
+                fetch.set('episodes', len(section_episodes))
+            # Show labels and collections are only in the show listing, so it is fetched only when needed
+            shows = []
+            if compiled.exclusions:
+                with span('shows.fetch', section=section.title) as fetch:
+                    shows = section.all()
+                    fetch.set('shows', len(shows))
+            eligible = apply_exclusions(section_episodes, compiled, shows)
+            if len(eligible) < len(section_episodes):
+                logger.info(f"Skipping {len(section_episodes) - len(eligible)} excluded episodes in {section.title}")
+            episodes.extend(eligible)
+
+        with span('aggregate', episodes=len(episodes)) as aggregate:
+            groups = plan_tv_cleanup(episodes, watched_season_days, abandoned_days, watched_episode_days,
+                                     history=history)
+            aggregate.set('groups', len(groups))
+
+        episode_count = sum(g['episode_count'] for g in groups)
+        total_mb = sum(g['file_size_mb'] for g in groups)
+        TV_CLEANUP_CANDIDATE_EPISODES.set(episode_count)
+        TV_CLEANUP_CANDIDATE_BYTES.set(int(total_mb * 1024 * 1024))
+        logger.info(f"Found {len(groups)} TV cleanup candidates ({episode_count} episodes, {total_mb / 1024:.2f} GB)")
+        return groups
+
+
+@traced('format_tv_report')
+def format_tv_report(groups: List[Dict]) -> str:
+    """
+    Format TV candidates for CLI display
+
+    Args:
+        groups: Candidate groups from TVCleanup.find_candidates
+
+    Returns:
+        Formatted string
+    """
+    if not groups:
+        return "\n✓ No TV shows, seasons or episodes found matching criteria!"
+
+    total_gb = sum(g['file_size_mb'] for g in groups) / 1024
+    episodes = sum(g['episode_count'] for g in groups)
+
+    lines = ["\n" + "=" * 115]
+    lines.append(f"TV TO DELETE ({len(groups)} items, {episodes} episodes, {total_gb:.2f} GB total)")
+    lines.append("=" * 115)
+    lines.append(f"{'#':<4} {'Title':<50} {'Kind':<18} {'Episodes':<9} {'Size (GB)':<10} {'Last Watched':<14}")
+    lines.append("-" * 115)
+
+    for idx, group in enumerate(groups, 1):
+        title = group['title'][:47] + '...' if len(group['title']) > 50 else group['title']
+        lines.append(f"{idx:<4} {title:<50} {KIND_LABELS[group['kind']]:<18} {group['episode_count']:<9} "
+                     f"{group['file_size_mb'] / 1024:<10.2f} {group['last_viewed']:<14}")
+        lines.append(f"     {group['reason']}")
+
+    lines.append("-" * 115)
+    lines.append(f"TOTAL: {len(groups)} items, {episodes} episodes, {total_gb:.2f} GB\n")
+    return "\n".join(lines)
+
+
+@traced('format_telegram_tv_summary')
+def format_telegram_tv_summary(groups: List[Dict]) -> List[str]:
+    """
+    Format TV candidates as Telegram messages (several if needed)
+
+    Args:
+        groups: Candidate groups from TVCleanup.find_candidates
+
+    Returns:
+        List of formatted HTML message strings
+    """
+    if not groups:
+        return ["✅ <b>No TV shows, seasons or episodes found matching criteria!</b>"]
+
+    total_gb = sum(g['file_size_mb'] for g in groups) / 1024
+    episodes = sum(g['episode_count'] for g in groups)
+
+    header = f"📺 <b>TV CLEANUP SUMMARY</b>\n\n"
+    header += f"📦 Items: {len(groups)} ({episodes} episodes)\n"
+    header += f"💾 Total size: {total_gb:.2f} GB\n"
+    header += f"{'=' * 30}\n\n"
+
+    messages = []
+    current_message = header
+    for idx, group in enumerate(groups, 1):
+        title = group['title'][:40] + '...' if len(group['title']) > 40 else group['title']
+        text = f"{idx}. <b>{title}</b>\n"
+        text += f"   {KIND_LABELS[group['kind']]} | 📦 {group['file_size_mb'] / 1024:.1f} GB | 📅 {group['last_viewed']}\n"
+        text += f"   {group['reason']}\n\n"
+
+        # Telegram's limit is 4096 characters
+        if len(current_message + text) > 3800:
+            messages.append(current_message)
+            current_message = f"📺 <b>CONTINUED...</b>\n\n" + text
+        else:
+            current_message += text
+
+    footer = f"{'=' * 30}\n<b>TOTAL: {len(groups)} items, {total_gb:.2f} GB</b>"
+    if len(current_message + footer) > 4000:
+        messages.append(current_message)
+        messages.append(footer)
+    else:
+        messages.append(current_message + footer)
+    return messages
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Watch History
+Server-wide play history index: total plays, last play and distinct users per item
+
+viewCount and lastViewedAt on library items are the token owner's own, so a
+movie another account watched yesterday still looks unwatched. WatchHistory
+reads /status/sessions/history/all (every account's plays) in pages and keeps,
+per rating key, how often it was played, when it was last played and by which
+accounts.
+
+The plays are cached in SQLite keyed by history ID, together with the newest
+history ID seen. A refresh pages newest-first by viewedAt until a whole page
+holds nothing newer than that ID, so after the first run only new plays (and
+one page of known ones) are downloaded. Checking a whole page rather than
+stopping at the first known entry catches plays synced late: they get a new
+ID but an older viewedAt, so they sort below plays already stored.
+
+A play is stored once however often it is fetched (pages shifting under new
+plays, two processes refreshing the same cache). The in-memory index is read
+from the stored plays once and then updated with each refresh's new plays.
+Plays removed from history in Plex stay counted until refresh(full=True)
+rebuilds the index.
+
+The CLI, bot, API and web dashboard use it for candidate selection unless
+WATCH_HISTORY=0; WATCH_HISTORY_CACHE_FILE moves the cache.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Cache file location, next to the module unless overridden
+DEFAULT_CACHE_FILE = os.getenv(
+    'WATCH_HISTORY_CACHE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watch_history.db')
+)
+
+# Count every account's plays when selecting cleanup candidates
+WATCH_HISTORY_ENABLED = os.getenv('WATCH_HISTORY', '1').lower() not in ('0', 'false', 'no')
+
+HISTORY_PATH = '/status/sessions/history/all'
+PAGE_SIZE = 1000
+# An incremental refresh usually ends on the first page, so that one is small
+FIRST_PAGE_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    history_id  INTEGER PRIMARY KEY,
+    rating_key  TEXT NOT NULL,
+    viewed_at   INTEGER NOT NULL,
+    account_id  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class PlayStats:
+    """Plays of one item across every account"""
+
+    __slots__ = ('plays', 'last_viewed', 'users')
+
+    def __init__(self, plays: int = 0, last_viewed: Optional[datetime] = None, users: frozenset = frozenset()):
+        self.plays = plays
+        self.last_viewed = last_viewed
+        self.users = users
+
+    def __repr__(self):
+        return f"PlayStats(plays={self.plays}, last_viewed={self.last_viewed}, users={len(self.users)})"
+
+
+class WatchHistory:
+    """
+    Incremental per-item index of the server-wide play history
+
+    Lookups (get) are served from memory; refresh() brings the index and its
+    SQLite cache up to date with the server.
+    """
+
+    def __init__(self, cache_file: str = DEFAULT_CACHE_FILE, page_size: int = PAGE_SIZE):
+        """
+        Args:
+            cache_file: Path to the SQLite cache file (':memory:' for a throwaway index)
+            page_size: History entries requested per page
+        """
+        self.cache_file = cache_file
+        self.page_size = page_size
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._stats = {}
+        self._load()
+        # last_id the in-memory index reflects
+        self._synced_id = self.last_id
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self._stats)
+
+    @property
+    def last_id(self) -> int:
+        """Newest history ID counted in the index (0 if empty)"""
+        row = self.conn.execute("SELECT value FROM state WHERE key = 'last_id'").fetchone()
+        return row[0] if row else 0
+
+    def get(self, rating_key) -> Optional[PlayStats]:
+        """Play stats of an item, or None if nobody has played it"""
+        return self._stats.get(str(rating_key))
+
+    def _migrate(self):
+        """Drop caches that kept per-item counters instead of plays; the next refresh rebuilds them"""
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'items' in tables:
+            with self.conn:
+                self.conn.execute("DROP TABLE items")
+                self.conn.execute("DROP TABLE IF EXISTS item_accounts")
+                self.conn.execute("DROP TABLE IF EXISTS state")
+
+    def _add(self, entries):
+        """Fold newly stored plays into the in-memory index"""
+        for _, rating_key, viewed_at, account_id in entries:
+            viewed = datetime.fromtimestamp(viewed_at)
+            stats = self._stats.get(rating_key)
+            if stats is None:
+                self._stats[rating_key] = PlayStats(1, viewed, frozenset((account_id,)))
+            else:
+                self._stats[rating_key] = PlayStats(stats.plays + 1, max(stats.last_viewed, viewed),
+                                                    stats.users | {account_id})
+
+    def _load(self):
+        users = {}
+        for rating_key, account_id in self.conn.execute("SELECT DISTINCT rating_key, account_id FROM plays"):
+            users.setdefault(rating_key, set()).add(account_id)
+        self._stats = {
+            rating_key: PlayStats(plays, datetime.fromtimestamp(last_viewed), frozenset(users.get(rating_key, ())))
+            for rating_key, plays, last_viewed in self.conn.execute(
+                "SELECT rating_key, COUNT(*), MAX(viewed_at) FROM plays GROUP BY rating_key")
+        }
+
+    def _fetch_new(self, plex, last_id: int):
+        """
+        Page through the history newest-first until a whole page is at or below last_id
+
+        Returns:
+            Tuple of (new entries as (id, rating_key, viewed_at, account_id) by ID, newest ID on the server, pages)
+        """
+        entries = {}
+        newest = None
+        start = 0
+        pages = 0
+        seen_known = False
+        while True:
+            # The first page, and the page confirming nothing newer follows, are usually all there is
+            size = min(FIRST_PAGE_SIZE, self.page_size) if start == 0 or seen_known else self.page_size
+            container = plex.query(
+                f"{HISTORY_PATH}?sort=viewedAt:desc"
+                f"&X-Plex-Container-Start={start}&X-Plex-Container-Size={size}"
+            )
+            pages += 1
+            page = list(container)
+            page_new = False
+            for element in page:
+                history_key = element.get('historyKey')
+                if not history_key:
+                    continue
+                history_id = int(history_key.rsplit('/', 1)[-1])
+                newest = history_id if newest is None else max(newest, history_id)
+                if history_id <= last_id:
+                    seen_known = True
+                    continue
+                page_new = True
+                # A play can show up on two pages when new plays shift the list while paging
+                if element.get('ratingKey') and element.get('viewedAt'):
+                    entries[history_id] = (history_id, element.get('ratingKey'), int(element.get('viewedAt')),
+                                           element.get('accountID') or '0')
+
+            start += len(page)
+            total = container.get('totalSize')
+            if not page or (last_id and not page_new) or (total is not None and start >= int(total)):
+                return list(entries.values()), newest, pages
+
+    def refresh(self, plex, full: bool = False) -> Dict:
+        """
+        Bring the index up to date with the server's play history
+
+        Args:
+            plex: Connected PlexServer (as the server owner, to see every account)
+            full: If True, rebuild the index from the whole history
+
+        Returns:
+            Dictionary with new (plays added), pages, items and last_id
+        """
+        with self._lock, span('history.refresh', full=full) as refresh:
+            last_id = 0 if full else self.last_id
+            entries, newest, pages = self._fetch_new(plex, last_id)
+
+            # IDs only grow; a newest ID below ours means the history was cleared or the server replaced
+            if last_id and (newest is None or newest < last_id):
+                logger.info("⚠️  Play history no longer matches the cache, rebuilding it")
+                return self.refresh(plex, full=True)
+
+            with self.conn:
+                if full:
+                    self.conn.execute("DELETE FROM plays")
+                    self.conn.execute("DELETE FROM state")
+                before = self.conn.total_changes
+                # Plays already stored by another refresh of the same cache are skipped
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO plays (history_id, rating_key, viewed_at, account_id) VALUES (?, ?, ?, ?)",
+                    entries
+                )
+                added = self.conn.total_changes - before
+                self.conn.execute(
+                    "INSERT INTO state (key, value) VALUES ('last_id', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                    (max(newest or 0, last_id),)
+                )
+
+            # Another process wrote to the cache since it was read: reread it rather than patch the index
+            if full or last_id != self._synced_id or added != len(entries):
+                self._load()
+            else:
+                self._add(entries)
+            self._synced_id = self.last_id
+
+            refresh.set('pages', pages)
+            refresh.set('new', added)
+            logger.info(f"Watch history: {added} new plays in {pages} page(s), {len(self._stats)} items played")
+            return {'new': added, 'pages': pages, 'items': len(self._stats), 'last_id': self.last_id}
+
+    def refresh_or_warn(self, plex) -> Optional[Dict]:
+        """refresh(), logging failures instead of raising; lookups keep using the cached index"""
+        try:
+            return self.refresh(plex)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not update the watch history ({e}), using the cached plays of {len(self)} items")
+            return None
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def default_history() -> Optional[WatchHistory]:
+    """The process-wide WatchHistory on DEFAULT_CACHE_FILE, or None if WATCH_HISTORY=0"""
+    global _default_history
+    if not WATCH_HISTORY_ENABLED:
+        return None
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = WatchHistory()
+        return _default_history
@@ -4,10 +4,12 @@ Plex Media Manager - Web Application
 Flask web server with API endpoints for live Plex data
 """
 
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, render_template, jsonify, request, send_from_directory, g
 from flask_cors import CORS
 import sys
 import os
+import time
+from datetime import datetime
 
 # Add parent directory to path to import plex modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,6 +17,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from plexapi.server import PlexServer
 from storage_analyzer import StorageAnalyzer
 from disk_utils import DiskUsage
+from cleanup_policy import default_policy, movie_candidate, view_state
+from plex_http_metrics import (
+    plex_http_stats, recent_operations, start_operation, finish_operation, instrumented_session
+)
+from profiling import install_flask_profiling
+from watch_history import default_history
+from prometheus_metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, CLEANUP_CANDIDATES, CLEANUP_CANDIDATE_BYTES, HTTP_REQUEST_SECONDS,
+    SCAN_SECONDS, render as render_metrics
+)
 
 app = Flask(__name__,
             static_folder='.',
@@ -35,11 +47,42 @@ REMOTE_PATH = os.getenv('REMOTE_PATH', '/home32')
 def get_plex_server():
     """Connect to Plex server"""
     try:
-        return PlexServer(PLEX_URL, PLEX_TOKEN)
+        return PlexServer(PLEX_URL, PLEX_TOKEN, session=instrumented_session())
     except Exception as e:
         print(f"Error connecting to Plex: {e}")
         return None
 
+@app.before_request
+def start_plex_operation():
+    """Count the Plex requests each handler makes"""
+    g.request_started = time.perf_counter()
+    rule = request.url_rule.rule if request.url_rule else request.path
+    g.plex_operation = start_operation(f"{request.method} {rule}")
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            app='web',
+            method=request.method,
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            status=response.status_code
+        )
+    return response
+
+@app.teardown_request
+def finish_plex_operation(exc=None):
+    operation = g.pop('plex_operation', None)
+    if operation is not None:
+        finish_operation(operation, log=False)
+        if operation.requests:
+            print(f"📊 {operation.summary()}")
+
+# Requests sent with "X-Profile: $PROFILE_TOKEN" are profiled (see profiling.py)
+install_flask_profiling(app)
+
 @app.route('/')
 def index():
     """Serve the main dashboard"""
@@ -117,6 +160,7 @@ def get_storage():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cleanup-candidates')
+@SCAN_SECONDS.time(scan='cleanup_candidates')
 def get_cleanup_candidates():
     """Get list of movies that can be deleted"""
     try:
@@ -124,40 +168,43 @@ def get_cleanup_candidates():
         if not plex:
             return jsonify({'error': 'Could not connect to Plex server'}), 500
 
-        max_view_count = int(request.args.get('max_view_count', 1))
-        days_not_watched = int(request.args.get('days_not_watched', 30))
+        policy = default_policy().merged(
+            max_views=int(request.args['max_view_count']) if request.args.get('max_view_count') else None,
+            days_not_watched=int(request.args['days_not_watched']) if request.args.get('days_not_watched') else None,
+            days_since_added=int(request.args['days_added']) if request.args.get('days_added') else None
+        )
+        # Every account's plays count, not just the token owner's
+        history = default_history()
+        if history is not None:
+            history.refresh_or_warn(plex)
+        compiled = policy.compile(history=history)
+        now = datetime.now()
 
         candidates = []
         total_size_gb = 0
 
-        # Scan movie libraries
-        for section in plex.library.sections():
-            if section.type != 'movie':
-                continue
-
-            for movie in section.all():
-                if movie.viewCount is None or movie.viewCount <= max_view_count:
-                    # Calculate days since last watched
-                    days_since_watched = None
-                    if movie.lastViewedAt:
-                        from datetime import datetime
-                        days_since_watched = (datetime.now() - movie.lastViewedAt).days
-
-                    # Check if it meets criteria
-                    if days_since_watched is None or days_since_watched >= days_not_watched:
-                        size_gb = sum(part.size for part in movie.media[0].parts if hasattr(part, 'size')) / (1024**3)
-                        candidates.append({
-                            'title': movie.title,
-                            'year': movie.year,
-                            'size_gb': round(size_gb, 1),
-                            'view_count': movie.viewCount or 0,
-                            'last_viewed': movie.lastViewedAt.strftime('%Y-%m-%d') if movie.lastViewedAt else 'Never',
-                            'days_since_watched': days_since_watched
-                        })
-                        total_size_gb += size_gb
+        # Scan the movie libraries the policy covers
+        for section in compiled.sections(plex.library):
+            for movie in compiled.filter(section.all()):
+                candidate = movie_candidate(movie, history)
+                # As listed by Plex; plain attribute access would reload never-watched movies
+                last_viewed_at = view_state(movie, history)[1]
+                size_gb = candidate['file_size_mb'] / 1024
+                candidates.append({
+                    'title': candidate['title'],
+                    'year': candidate['year'],
+                    'size_gb': round(size_gb, 1),
+                    'view_count': candidate['view_count'],
+                    'watched_by': candidate['watched_by'],
+                    'last_viewed': candidate['last_viewed'],
+                    'days_since_watched': (now - last_viewed_at).days if last_viewed_at else None
+                })
+                total_size_gb += size_gb
 
         # Sort by size (largest first)
         candidates.sort(key=lambda x: x['size_gb'], reverse=True)
+        CLEANUP_CANDIDATES.set(len(candidates))
+        CLEANUP_CANDIDATE_BYTES.set(int(total_size_gb * 1024 ** 3))
 
         return jsonify({
             'total_candidates': len(candidates),
@@ -191,9 +238,11 @@ def get_disk_usage():
 def handle_settings():
     """Get or update cleanup settings"""
     if request.method == 'GET':
+        policy = default_policy()
         return jsonify({
-            'max_view_count': 1,
-            'days_not_watched': 30,
+            'max_view_count': policy.max_views,
+            'days_not_watched': policy.days_not_watched,
+            'policy': policy.to_dict(),
             'plex_url': PLEX_URL,
             'capacity_gb': TOTAL_CAPACITY_GB
         })
@@ -201,6 +250,19 @@ def handle_settings():
         # TODO: Implement settings update
         return jsonify({'success': True})
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Plex request statistics per endpoint, and the most recent operations"""
+    return jsonify({
+        'plex': plex_http_stats.snapshot(),
+        'operations': [operation.to_dict() for operation in reversed(recent_operations)]
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus exposition"""
+    return app.response_class(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/styles.css')
 def serve_css():
     """Serve CSS file"""